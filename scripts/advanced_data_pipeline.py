@@ -4,21 +4,49 @@
 Intégration INSEE, Eurostat, OECD, Banque de France
 """
 
+import os
 import asyncio
+import time
 import aiohttp
+from contextlib import asynccontextmanager
+from functools import partial
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Union
 import logging
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 import json
 import xml.etree.ElementTree as ET
-from sqlalchemy import create_engine, text
+from urllib.parse import urlencode
 import redis
+import redis.asyncio as redis_asyncio
 from supabase import create_client
-import schedule
-import time
+from change_detection import ChangeDetector
+from series_registry import SeriesRegistry
+from parsers import SDMXStreamParser
+from parse_pool import ParseExecutor
+from source_parsers import oecd_record, parse_banque_france, parse_eurostat, parse_sdmx
+from rate_limiting import AsyncRateLimiter, parse_retry_after
+from cache import TwoTierCache
+from response_store import ResponseStore
+from validation import flag_anomalies, summarize_flags
+from observations import ObservationBatch, ObservationBuilder
+from pipeline_state import WatermarkStore
+from periods import FREQUENCY_NAMES, encode_periods, parse_period, period_start_dates
+from bulk_loader import PostgresBulkLoader
+from rest_writer import RESTUpsertWriter
+from archive import ParquetArchive
+from backfill import DEFAULT_START_YEAR, BackfillCheckpoint, BackfillProgress, year_chunks
+from run_journal import RunJournal
+from scheduler import AsyncScheduler
+from metrics import REGISTRY, TRACER, count_retries, instrumented_run, observe_http
+
+try:
+    import brotli  # noqa: F401 - active le décodage br dans aiohttp
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
 
 # Configuration du logging avancé
 logging.basicConfig(
@@ -31,6 +59,46 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Plage de périodes (début, fin) d'une requête, bornes incluses (fin None : jusqu'à la dernière publiée)
+PeriodRange = Tuple[str, Optional[str]]
+
+# Jeux de données récupérés par source
+DATASETS = {
+    'EUROSTAT': [
+        'nama_10_gdp',      # PIB
+        'une_rt_m',         # Chômage
+        'prc_hicp_manr',    # Inflation
+    ],
+    'OECD': [
+        'QNA',              # Comptes nationaux trimestriels
+        'MEI',              # Indicateurs économiques principaux
+    ],
+    'BANQUE_FRANCE': [
+        'BSI_M_FR_4F_N_A_A24_Z01_E',  # Taux directeur
+        'ICP_M_FR_000000_4_ANR',      # Inflation
+    ]
+}
+
+# Fréquence de publication de chaque jeu de données (cadence du scheduler)
+DATASET_FREQUENCIES = {
+    'nama_10_gdp': 'YEARLY',
+    'une_rt_m': 'MONTHLY',
+    'prc_hicp_manr': 'MONTHLY',
+    'QNA': 'QUARTERLY',
+    'MEI': 'MONTHLY',
+    'BSI_M_FR_4F_N_A_A24_Z01_E': 'MONTHLY',
+    'ICP_M_FR_000000_4_ANR': 'MONTHLY',
+}
+
+
+class SourceFetchError(Exception):
+    """Source injoignable ou en erreur après toutes les tentatives"""
+
+
+def _range_suffix(period_range: Optional[PeriodRange]) -> str:
+    """Suffixe de clé de cache d'une requête bornée"""
+    return f":{period_range[0]}:{period_range[1] or ''}" if period_range else ''
+
 @dataclass
 class DataQualityMetrics:
     """Métriques de qualité des données"""
@@ -40,6 +108,32 @@ class DataQualityMetrics:
     timeliness: float    # Fraîcheur des données (en jours)
     anomalies: List[str] # Liste des anomalies détectées
 
+def combine_quality_metrics(validated: Dict[str, Dict]) -> DataQualityMetrics:
+    """Métriques d'une exécution depuis celles de chaque tâche ({tâche: {'rows', 'metrics'}}), pondérées par le nombre de lignes"""
+    total = sum(entry['rows'] for entry in validated.values())
+    
+    def weighted(name: str) -> float:
+        if not total:
+            return 0
+        return round(sum(entry['metrics'][name] * entry['rows'] for entry in validated.values()) / total, 2)
+    
+    return DataQualityMetrics(
+        completeness=weighted('completeness'),
+        accuracy=weighted('accuracy'),
+        consistency=weighted('consistency'),
+        timeliness=max(entry['metrics']['timeliness'] for entry in validated.values()),
+        anomalies=[
+            f"{task}: {anomaly}"
+            for task, entry in sorted(validated.items())
+            for anomaly in entry['metrics']['anomalies']
+        ]
+    )
+
+@dataclass
+class StoredResult:
+    """Réponse 304 : lot parsé lors du téléchargement précédent, réutilisé tel quel"""
+    batch: ObservationBatch
+
 @dataclass
 class DataSourceConfig:
     """Configuration d'une source de données"""
@@ -50,6 +144,64 @@ class DataSourceConfig:
     retry_count: int
     timeout: int
     cache_ttl: int  # durée de cache en secondes
+    max_concurrency: int = 10  # requêtes simultanées
+
+
+@dataclass
+class DatasetFilter:
+    """Coupe d'un jeu de données demandée à la source : seules les séries utilisées sont téléchargées"""
+    dimensions: Dict[str, List[str]] = field(default_factory=dict)  # Eurostat : geo, unit, s_adj...
+    sdmx_key: str = 'all'          # OECD : LOCATION.SUBJECT.MEASURE, valeurs séparées par +
+    since: Optional[str] = None    # première période d'un chargement complet
+
+    def period_range(self, period_range: Optional[PeriodRange]) -> Optional[PeriodRange]:
+        """Plage demandée, ou à défaut depuis la première période utile"""
+        if period_range:
+            return period_range
+        return (self.since, None) if self.since else None
+
+    def eurostat_query(self, period_range: Optional[PeriodRange] = None) -> str:
+        """Paramètres Eurostat (dimensions répétées : geo=FR&geo=DE, bornes sinceTimePeriod/untilTimePeriod)"""
+        params = [('format', 'JSON')]
+        params.extend((dim, value) for dim, values in self.dimensions.items() for value in values)
+        period_range = self.period_range(period_range)
+        if period_range:
+            params.append(('sinceTimePeriod', period_range[0]))
+            if period_range[1]:
+                params.append(('untilTimePeriod', period_range[1]))
+        return urlencode(params)
+
+    def sdmx_query(self, period_range: Optional[PeriodRange] = None) -> str:
+        """Bornes SDMX startTime/endTime (chaîne vide sans borne)"""
+        period_range = self.period_range(period_range)
+        if not period_range:
+            return ''
+        params = [('startTime', period_range[0])]
+        if period_range[1]:
+            params.append(('endTime', period_range[1]))
+        return urlencode(params)
+
+
+# Pays suivis (codes Eurostat) : France, principales économies de la zone euro, agrégats UE
+EUROSTAT_GEOS = ['FR', 'DE', 'IT', 'ES', 'EU27_2020', 'EA20']
+
+# Filtres serveur par jeu de données (voir DATASETS) ; un jeu absent est téléchargé en entier
+DATASET_FILTERS = {
+    'nama_10_gdp': DatasetFilter(
+        dimensions={'geo': EUROSTAT_GEOS, 'unit': ['CP_MEUR'], 'na_item': ['B1GQ']},
+        since='1995'
+    ),
+    'une_rt_m': DatasetFilter(
+        dimensions={'geo': EUROSTAT_GEOS, 'unit': ['PC_ACT'], 's_adj': ['SA'], 'age': ['TOTAL'], 'sex': ['T']},
+        since='2000-01'
+    ),
+    'prc_hicp_manr': DatasetFilter(
+        dimensions={'geo': EUROSTAT_GEOS, 'unit': ['RCH_A'], 'coicop': ['CP00']},
+        since='2000-01'
+    ),
+    'QNA': DatasetFilter(sdmx_key='FRA+DEU+ITA+ESP+EA20+EU27_2020.B1_GE.GPSA', since='1995-Q1'),
+    'MEI': DatasetFilter(sdmx_key='FRA+DEU+ITA+ESP+EA20.LRHUTTTT+CPALTT01.ST', since='2000-Q1'),
+}
 
 class AdvancedDataPipeline:
     """Pipeline de données avancé multi-sources"""
@@ -59,7 +211,7 @@ class AdvancedDataPipeline:
         self.sources = {
             'INSEE': DataSourceConfig(
                 name='INSEE',
-                base_url='https://api.insee.fr/series/BDM/V1',
+                base_url=os.getenv('INSEE_BASE_URL', 'https://api.insee.fr/series/BDM/V1'),
                 api_key=os.getenv('INSEE_API_KEY'),
                 rate_limit=100,
                 retry_count=3,
@@ -68,7 +220,7 @@ class AdvancedDataPipeline:
             ),
             'EUROSTAT': DataSourceConfig(
                 name='EUROSTAT',
-                base_url='https://ec.europa.eu/eurostat/api/dissemination/statistics/1.0/data',
+                base_url=os.getenv('EUROSTAT_BASE_URL', 'https://ec.europa.eu/eurostat/api/dissemination/statistics/1.0/data'),
                 api_key=None,
                 rate_limit=60,
                 retry_count=2,
@@ -77,7 +229,7 @@ class AdvancedDataPipeline:
             ),
             'OECD': DataSourceConfig(
                 name='OECD',
-                base_url='https://stats.oecd.org/restsdmx/sdmx.ashx/GetData',
+                base_url=os.getenv('OECD_BASE_URL', 'https://stats.oecd.org/restsdmx/sdmx.ashx/GetData'),
                 api_key=os.getenv('OECD_API_KEY'),
                 rate_limit=120,
                 retry_count=3,
@@ -86,7 +238,7 @@ class AdvancedDataPipeline:
             ),
             'BANQUE_FRANCE': DataSourceConfig(
                 name='BANQUE_FRANCE',
-                base_url='https://api.banque-france.fr/series/observations',
+                base_url=os.getenv('BANQUE_FRANCE_BASE_URL', 'https://api.banque-france.fr/series/observations'),
                 api_key=os.getenv('BANQUE_FRANCE_API_KEY'),
                 rate_limit=200,
                 retry_count=3,
@@ -100,319 +252,597 @@ class AdvancedDataPipeline:
             os.getenv('NEXT_PUBLIC_SUPABASE_URL'),
             os.getenv('SUPABASE_SERVICE_ROLE_KEY')
         )
+        self.change_detector = ChangeDetector(self.supabase)
         
-        # Cache Redis
-        try:
-            self.redis_client = redis.Redis(
+        # Clés entières des séries (table series), mises en cache en mémoire
+        self.series_registry = SeriesRegistry(self.supabase)
+        
+        # Connexion Postgres directe (DATABASE_URL) pour les chargements massifs
+        self.bulk_loader = PostgresBulkLoader()
+        
+        # Upserts REST concurrents, taille de lot adaptée à la latence observée
+        self.rest_writer = RESTUpsertWriter()
+        
+        # Archive Parquet locale des observations nettoyées (analyses, backfills)
+        self.archive = ParquetArchive()
+        
+        # Journal des exécutions (état et sorties de chaque tâche, pour --resume)
+        self.journal = RunJournal()
+        
+        # Dernière période sauvegardée par tâche "SOURCE:dataset" : les exécutions
+        # incrémentales ne demandent que les périodes suivantes, révisions récentes comprises
+        self.watermarks = WatermarkStore(os.getenv('PIPELINE_STATE_FILE', 'pipeline_watermarks.json'))
+        self.overlap_periods = int(os.getenv('PIPELINE_OVERLAP_PERIODS', 2))
+        
+        # Filtres serveur (DATASET_FILTERS=0 : jeux complets, ex. benchmarks à volume réglable)
+        self.dataset_filters = DATASET_FILTERS if os.getenv('DATASET_FILTERS', '1') != '0' else {}
+        
+        # Cache Redis (REDIS_ENABLED=0 : aucun état partagé, ex. benchmarks hors ligne)
+        self.redis_client = None
+        if os.getenv('REDIS_ENABLED', '1') != '0':
+            try:
+                self.redis_client = redis.Redis(
+                    host=os.getenv('REDIS_HOST', 'localhost'),
+                    port=int(os.getenv('REDIS_PORT', 6379)),
+                    decode_responses=True
+                )
+                self.redis_client.ping()
+                logger.info("✅ Connexion Redis établie")
+            except Exception as e:
+                logger.warning(f"⚠️ Redis non disponible: {e}")
+                self.redis_client = None
+
+        # Session HTTP partagée (pool de connexions keep-alive, cache DNS)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.connection_stats = {}
+
+        # Client asyncio (payloads binaires) pour le cache et le rate limiting partagé
+        self.async_redis = None
+        if self.redis_client:
+            self.async_redis = redis_asyncio.Redis(
                 host=os.getenv('REDIS_HOST', 'localhost'),
-                port=int(os.getenv('REDIS_PORT', 6379)),
-                decode_responses=True
+                port=int(os.getenv('REDIS_PORT', 6379))
             )
-            self.redis_client.ping()
-            logger.info("✅ Connexion Redis établie")
-        except Exception as e:
-            logger.warning(f"⚠️ Redis non disponible: {e}")
-            self.redis_client = None
+        
+        # Cache LRU en mémoire + Redis compressé (le niveau mémoire reste actif sans Redis)
+        self.cache = TwoTierCache(
+            self.async_redis,
+            max_memory_bytes=int(os.getenv('CACHE_MEMORY_MB', 64)) * 1024 * 1024
+        )
+
+        # Validateurs HTTP et réponses stockées (requêtes conditionnelles)
+        self.response_store = ResponseStore()
 
-        # Semaphores pour rate limiting
+        # Gros corps de réponse parsés dans un pool de processus, hors de la boucle
+        self.parse_executor = ParseExecutor()
+
+        # Rate limiting par source (jetons/minute + concurrence), partagé via Redis si possible
+        shared_redis = self.async_redis if os.getenv('RATE_LIMIT_SHARED', '1') != '0' else None
         self.rate_limiters = {
-            source: asyncio.Semaphore(config.rate_limit)
+            source: AsyncRateLimiter(
+                source, 
+                config.rate_limit, 
+                config.max_concurrency,
+                redis_client=shared_redis
+            )
             for source, config in self.sources.items()
         }
 
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Session unique pour toutes les sources, instrumentée pour mesurer la réutilisation"""
+        self.connection_stats = {
+            'requests': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'dns_cache_hits': 0,
+            'dns_cache_misses': 0
+        }
+        
+        def counter(key):
+            async def on_event(session, context, params):
+                self.connection_stats[key] += 1
+            return on_event
+        
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(counter('requests'))
+        trace_config.on_connection_create_end.append(counter('connections_created'))
+        trace_config.on_connection_reuseconn.append(counter('connections_reused'))
+        trace_config.on_dns_cache_hit.append(counter('dns_cache_hits'))
+        trace_config.on_dns_cache_miss.append(counter('dns_cache_misses'))
+        
+        connector = aiohttp.TCPConnector(
+            limit=int(os.getenv('HTTP_POOL_LIMIT', 100)),
+            limit_per_host=int(os.getenv('HTTP_POOL_LIMIT_PER_HOST', 10)),
+            keepalive_timeout=int(os.getenv('HTTP_KEEPALIVE_TIMEOUT', 60)),
+            ttl_dns_cache=int(os.getenv('HTTP_DNS_CACHE_TTL', 600)),
+            use_dns_cache=True,
+            enable_cleanup_closed=True
+        )
+        
+        return aiohttp.ClientSession(
+            connector=connector,
+            headers={'Accept-Encoding': 'gzip, deflate, br' if BROTLI_AVAILABLE else 'gzip, deflate'},
+            trace_configs=[trace_config]
+        )
+
+    @asynccontextmanager
+    async def http_session(self):
+        """Session HTTP partagée : réutilisée si déjà ouverte, sinon ouverte et fermée ici"""
+        if self._session is not None and not self._session.closed:
+            yield self._session
+            return
+            
+        self._session = self._create_session()
+        try:
+            yield self._session
+        finally:
+            await self._session.close()
+            self._session = None
+            logger.info(f"🔌 Connexions HTTP: {self.connection_stats}")
+
     async def fetch_with_retry(
         self, 
         session: aiohttp.ClientSession, 
         url: str, 
         source: str,
+        store_response: bool = False,
+        raw: bool = False,
         **kwargs
-    ) -> Optional[Dict]:
-        """Récupération avec retry et rate limiting"""
+    ) -> Optional[Union[Dict, bytes, StoredResult]]:
+        """
+        Récupération avec retry et rate limiting.
+
+        Avec store_response, la requête est conditionnelle (ETag/Last-Modified)
+        et le corps brut est conservé ; un 304 retourne le lot stocké
+        (StoredResult), ou rejoue la requête sans validateurs si ce lot est
+        perdu ou illisible ; un 404 (aucune donnée) None. Avec raw, le corps
+        est retourné tel quel (bytes) pour être parsé par le pool de parsing.
+        Lève SourceFetchError une fois les tentatives épuisées, pour ne pas
+        confondre une panne avec une série vide.
+        """
         
         config = self.sources[source]
+        limiter = self.rate_limiters[source]
+        base_headers = kwargs.pop('headers', None)
+        headers = self._request_headers(url, store_response, base_headers)
         
-        async with self.rate_limiters[source]:
-            for attempt in range(config.retry_count):
-                try:
+        for attempt in range(config.retry_count):
+            not_modified = False
+            try:
+                async with limiter.slot():
+                    sent_at = time.perf_counter()
                     async with session.get(
                         url, 
                         timeout=aiohttp.ClientTimeout(total=config.timeout),
+                        headers=headers,
                         **kwargs
                     ) as response:
                         
-                        if response.status == 200:
+                        if response.status != 200:
+                            observe_http(source, response.status, time.perf_counter() - sent_at)
+                        
+                        if response.status == 304 and store_response:
+                            # Lot stocké relu hors du créneau de la source
+                            await limiter.on_success()
+                            not_modified = True
+                        
+                        elif response.status == 200:
+                            await limiter.on_success()
                             content_type = response.headers.get('content-type', '')
+                            body = await response.read()
+                            observe_http(source, 200, time.perf_counter() - sent_at, len(body))
+                            
+                            if store_response:
+                                # Compression gzip du corps hors de la boucle
+                                await asyncio.to_thread(self.response_store.record_body, url, response.headers, body)
                             
-                            if 'json' in content_type:
-                                return await response.json()
+                            if raw:
+                                return body
+                            elif 'json' in content_type:
+                                return json.loads(body)
                             elif 'xml' in content_type:
-                                text = await response.text()
-                                return self.parse_xml_to_dict(text)
+                                return self.parse_xml_to_dict(body.decode(response.charset or 'utf-8'))
                             else:
-                                return await response.text()
+                                return body.decode(response.charset or 'utf-8')
                                 
-                        elif response.status == 429:  # Rate limit
-                            wait_time = 2 ** attempt
-                            logger.warning(f"Rate limit {source}, attente {wait_time}s")
-                            await asyncio.sleep(wait_time)
+                        elif response.status == 404:
+                            # Convention SDMX : aucune observation pour la requête (plage vide)
+                            logger.info(f"∅ {source}: aucune donnée pour {url}")
+                            return None
+                            
+                        elif await self._handle_throttling(source, response, attempt):
+                            count_retries(source, retries=int(attempt < config.retry_count - 1), throttled=1)
                             continue
                             
                         else:
                             logger.error(f"Erreur HTTP {response.status} pour {source}")
-                            
-                except asyncio.TimeoutError:
-                    logger.warning(f"Timeout {source} (tentative {attempt + 1})")
-                except Exception as e:
-                    logger.error(f"Erreur {source}: {e}")
                 
-                if attempt < config.retry_count - 1:
-                    await asyncio.sleep(1)
+                if not_modified:
+                    stored = await asyncio.to_thread(self._stored_batch, url)
+                    if stored is not None:
+                        logger.info(f"♻️ {source} non modifié: {url}")
+                        return StoredResult(stored)
+                    # Lot stocké perdu (validateurs oubliés) : requête complète, comme INSEEScraper.get_conditional
+                    logger.warning(f"⚠️ {source} non modifié mais résultat stocké absent, requête complète: {url}")
+                    headers = self._request_headers(url, store_response, base_headers)
+                    continue
+                            
+            except asyncio.TimeoutError:
+                logger.warning(f"Timeout {source} (tentative {attempt + 1})")
+            except Exception as e:
+                logger.error(f"Erreur {source}: {e}")
+            
+            if attempt < config.retry_count - 1:
+                count_retries(source)
+                await asyncio.sleep(1)
         
-        return None
+        raise SourceFetchError(f"{source}: échec après {config.retry_count} tentatives pour {url}")
 
-    async def fetch_eurostat_data(self, dataset_code: str) -> List[Dict]:
-        """Récupération données Eurostat"""
+    async def stream_sdmx_with_retry(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        source: str,
+        transform,
+        chunk_size: int = 64 * 1024,
+        store_response: bool = False,
+        **kwargs
+    ) -> Optional[Union[ObservationBatch, StoredResult]]:
+        """
+        Récupération SDMX-ML en flux : parsing au fil des morceaux reçus,
+        stockage en colonnes (réponse 304 : comme fetch_with_retry). transform
+        doit être une fonction de module (ou un partial) : une réponse qui
+        dépasse le seuil du pool de parsing est déposée dans un fichier de
+        spool et parsée par un processus du pool.
+        """
         
-        cache_key = f"eurostat:{dataset_code}"
+        config = self.sources[source]
+        limiter = self.rate_limiters[source]
+        base_headers = kwargs.pop('headers', None)
+        headers = self._request_headers(url, store_response, base_headers)
+        spooled = None
         
-        # Vérifier le cache
-        if self.redis_client:
-            cached_data = self.redis_client.get(cache_key)
-            if cached_data:
-                logger.info(f"📦 Cache hit pour Eurostat {dataset_code}")
-                return json.loads(cached_data)
+        for attempt in range(config.retry_count):
+            not_modified = False
+            try:
+                async with limiter.slot():
+                    sent_at = time.perf_counter()
+                    async with session.get(
+                        url, 
+                        timeout=aiohttp.ClientTimeout(total=config.timeout),
+                        headers=headers,
+                        **kwargs
+                    ) as response:
+                        
+                        if response.status != 200:
+                            observe_http(source, response.status, time.perf_counter() - sent_at)
+                        
+                        if response.status == 304 and store_response:
+                            # Lot stocké relu hors du créneau de la source
+                            await limiter.on_success()
+                            not_modified = True
+                        
+                        elif response.status == 200:
+                            await limiter.on_success()
+                            
+                            # Nouveau parser à chaque tentative : un flux interrompu repart de zéro
+                            parser = SDMXStreamParser()
+                            builder = ObservationBuilder()
+                            size = 0
+                            
+                            # Morceaux déjà parsés (bornés par le seuil du pool) et, une fois
+                            # le seuil franchi, fichier de spool remis au pool de parsing
+                            received = []
+                            spool = None
+                            
+                            # Le corps brut part sur disque au fil de l'eau, jamais en mémoire
+                            raw_writer = self.response_store.body_writer(url) if store_response else None
+                            try:
+                                async for chunk in response.content.iter_chunked(chunk_size):
+                                    size += len(chunk)
+                                    if raw_writer:
+                                        raw_writer.write(chunk)
+                                    
+                                    if spool is None and self.parse_executor.should_offload(size):
+                                        spool = self.parse_executor.spool()
+                                        spool.writelines(received)
+                                        received = parser = builder = None
+                                    if spool is not None:
+                                        spool.write(chunk)
+                                        continue
+                                    
+                                    received.append(chunk)
+                                    for record in map(transform, parser.feed(chunk)):
+                                        if record is not None:
+                                            builder.append(record)
+                            except BaseException:
+                                if spool is not None:
+                                    spool.close()
+                                    os.unlink(spool.name)
+                                raise
+                            finally:
+                                if raw_writer:
+                                    raw_writer.close()
+                            
+                            observe_http(source, 200, time.perf_counter() - sent_at, size)
+                            if store_response:
+                                self.response_store.record_headers(url, response.headers, size)
+                            
+                            if spool is not None:
+                                spool.close()
+                                spooled = spool.name
+                                break
+                                    
+                            for record in map(transform, parser.close()):
+                                if record is not None:
+                                    builder.append(record)
+                            return builder.build()
+                                
+                        elif response.status == 404:
+                            # Convention SDMX : aucune observation pour la requête (plage vide)
+                            logger.info(f"∅ {source}: aucune donnée pour {url}")
+                            return None
+                            
+                        elif await self._handle_throttling(source, response, attempt):
+                            count_retries(source, retries=int(attempt < config.retry_count - 1), throttled=1)
+                            continue
+                            
+                        else:
+                            logger.error(f"Erreur HTTP {response.status} pour {source}")
+                
+                if not_modified:
+                    stored = await asyncio.to_thread(self._stored_batch, url)
+                    if stored is not None:
+                        logger.info(f"♻️ {source} non modifié: {url}")
+                        return StoredResult(stored)
+                    # Lot stocké perdu (validateurs oubliés) : requête complète, comme INSEEScraper.get_conditional
+                    logger.warning(f"⚠️ {source} non modifié mais résultat stocké absent, requête complète: {url}")
+                    headers = self._request_headers(url, store_response, base_headers)
+                    continue
+                            
+            except asyncio.TimeoutError:
+                logger.warning(f"Timeout {source} (tentative {attempt + 1})")
+            except ET.ParseError as e:
+                logger.error(f"Erreur parsing SDMX {source}: {e}")
+            except Exception as e:
+                logger.error(f"Erreur {source}: {e}")
+            
+            if attempt < config.retry_count - 1:
+                count_retries(source)
+                await asyncio.sleep(1)
+        
+        if spooled is not None:
+            # Parsing hors du créneau de la source : les autres téléchargements continuent
+            try:
+                return await self.parse_executor.parse_spooled(spooled, parse_sdmx, transform=transform)
+            except ET.ParseError as e:
+                raise SourceFetchError(f"{source}: SDMX illisible pour {url}: {e}") from e
+        
+        raise SourceFetchError(f"{source}: échec après {config.retry_count} tentatives pour {url}")
+
+    def _request_headers(self, url: str, conditional: bool, headers: Optional[Dict] = None) -> Dict[str, str]:
+        """En-têtes de la requête, avec les validateurs stockés si conditionnelle"""
+        headers = dict(headers or {})
+        if conditional:
+            headers.update(self.response_store.conditional_headers(url))
+        return headers
 
-        url = f"{self.sources['EUROSTAT'].base_url}/{dataset_code}?format=JSON"
+    async def _handle_throttling(self, source: str, response: aiohttp.ClientResponse, attempt: int) -> bool:
+        """429 (ou 503 avec Retry-After) : ralentir la source, True si la requête doit être rejouée"""
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
         
-        async with aiohttp.ClientSession() as session:
-            data = await self.fetch_with_retry(session, url, 'EUROSTAT')
+        if response.status == 429 or (response.status == 503 and retry_after is not None):
+            await self.rate_limiters[source].on_throttle(retry_after, default_backoff=2 ** attempt)
+            return True
             
-            if not data:
-                return []
+        return False
 
-        # Parser les données Eurostat
-        processed_data = []
-        
-        try:
-            if 'dimension' in data and 'value' in data:
-                time_dimension = data['dimension']['time']['category']['index']
-                geo_dimension = data['dimension'].get('geo', {}).get('category', {}).get('index', {})
-                values = data['value']
-                
-                for time_key, time_index in time_dimension.items():
-                    for geo_key, geo_index in geo_dimension.items():
-                        # Calculer l'index dans le tableau de valeurs
-                        value_index = time_index * len(geo_dimension) + geo_index
-                        
-                        if value_index < len(values) and values[value_index] is not None:
-                            processed_data.append({
-                                'id': f"eurostat_{dataset_code}_{geo_key}_{time_key}",
-                                'indicator': dataset_code,
-                                'value': float(values[value_index]),
-                                'date': time_key,
-                                'source': 'EUROSTAT',
-                                'unit': data.get('unit', 'Unknown'),
-                                'frequency': self.detect_frequency(time_key),
-                                'geography': geo_key,
-                                'category': self.categorize_indicator(dataset_code),
-                                'metadata': {
-                                    'dataset_code': dataset_code,
-                                    'last_update': data.get('updated'),
-                                    'quality_score': self.calculate_quality_score(values[value_index])
-                                }
-                            })
-                            
-        except Exception as e:
-            logger.error(f"Erreur parsing Eurostat {dataset_code}: {e}")
-
-        # Mettre en cache
-        if self.redis_client and processed_data:
-            self.redis_client.setex(
-                cache_key,
-                self.sources['EUROSTAT'].cache_ttl,
-                json.dumps(processed_data)
-            )
+    async def _cached_batch(self, key: str, fetch, ttl: int) -> ObservationBatch:
+        """Lot d'observations via le cache (stocké sous sa forme colonnes compacte)"""
+
+        async def fetch_payload():
+            return (await fetch()).to_payload()
+
+        return ObservationBatch.from_payload(await self.cache.get_or_fetch(key, fetch_payload, ttl=ttl))
 
-        logger.info(f"✅ Eurostat {dataset_code}: {len(processed_data)} observations")
-        return processed_data
+    def _stored_batch(self, url: str) -> Optional[ObservationBatch]:
+        """
+        Résultat parsé stocké (réponse 304) ; None s'il est absent, illisible ou
+        d'un format antérieur (URL oubliée : la requête suivante sera complète)
+        """
+        payload = self.response_store.load_parsed(url)
+        if payload is None:
+            return None
+        if not ObservationBatch.is_payload(payload):
+            self.response_store.invalidate(url)
+            return None
+        # Fréquences recalculées : les résultats stockés avant le codec de périodes en avaient de fausses
+        return ObservationBatch.from_payload(payload).with_period_frequencies()
 
-    async def fetch_oecd_data(self, dataset: str, frequency: str = 'Q') -> List[Dict]:
-        """Récupération données OECD"""
+    async def fetch_eurostat_data(self, dataset_code: str, period_range: Optional[PeriodRange] = None) -> ObservationBatch:
+        """Récupération données Eurostat (toutes périodes, ou une plage (début, fin))"""
+        return await self._cached_batch(
+            f"eurostat:{dataset_code}" + _range_suffix(period_range),
+            lambda: self._fetch_eurostat_data_uncached(dataset_code, period_range),
+            ttl=self.sources['EUROSTAT'].cache_ttl
+        )
+
+    async def _fetch_eurostat_data_uncached(self, dataset_code: str, period_range: Optional[PeriodRange] = None) -> ObservationBatch:
+        """Récupération données Eurostat (sans cache)"""
+
+        # Coupe filtrée côté serveur (pays, unité, correction...) et bornes de périodes
+        dataset_filter = self.dataset_filters.get(dataset_code, DatasetFilter())
+        url = f"{self.sources['EUROSTAT'].base_url}/{dataset_code}?{dataset_filter.eurostat_query(period_range)}"
         
-        cache_key = f"oecd:{dataset}:{frequency}"
+        async with self.http_session() as session:
+            body = await self.fetch_with_retry(session, url, 'EUROSTAT', store_response=True, raw=True)
+            
+            if isinstance(body, StoredResult):
+                return body.batch
+            if not body:
+                return ObservationBatch.empty()
+
+        # Parser le cube JSON-stat, directement en colonnes (pool de processus pour les gros corps)
+        batch = ObservationBatch.empty()
         
-        if self.redis_client:
-            cached_data = self.redis_client.get(cache_key)
-            if cached_data:
-                logger.info(f"📦 Cache hit pour OECD {dataset}")
-                return json.loads(cached_data)
+        with TRACER.span('parse', source='EUROSTAT', dataset=dataset_code, pooled=self.parse_executor.should_offload(len(body))) as span:
+            try:
+                batch = await self.parse_executor.parse(
+                    body, parse_eurostat, dataset_code=dataset_code, category=self.categorize_indicator(dataset_code),
+                    key_dimensions=tuple(dataset_filter.dimensions)
+                )
+            except Exception as e:
+                logger.error(f"Erreur parsing Eurostat {dataset_code}: {e}")
+            span.set(rows=len(batch))
+
+        if len(batch):
+            await asyncio.to_thread(self.response_store.save_parsed, url, batch.to_payload())
 
-        # URL SDMX pour OECD
-        url = f"{self.sources['OECD'].base_url}/{dataset}/all/all/{frequency}"
+        logger.info(f"✅ Eurostat {dataset_code}: {len(batch)} observations")
+        return batch
+
+    async def fetch_oecd_data(
+        self, 
+        dataset: str, 
+        frequency: str = 'Q', 
+        period_range: Optional[PeriodRange] = None
+    ) -> ObservationBatch:
+        """Récupération données OECD (toutes périodes, ou une plage (début, fin))"""
+        return await self._cached_batch(
+            f"oecd:{dataset}:{frequency}" + _range_suffix(period_range),
+            lambda: self._fetch_oecd_data_uncached(dataset, frequency, period_range),
+            ttl=self.sources['OECD'].cache_ttl
+        )
+
+    async def _fetch_oecd_data_uncached(
+        self, 
+        dataset: str, 
+        frequency: str = 'Q', 
+        period_range: Optional[PeriodRange] = None
+    ) -> ObservationBatch:
+        """Récupération données OECD (sans cache)"""
+
+        # URL SDMX pour OECD, restreinte par la clé de séries et les bornes de périodes
+        dataset_filter = self.dataset_filters.get(dataset, DatasetFilter())
+        url = f"{self.sources['OECD'].base_url}/{dataset}/{dataset_filter.sdmx_key}/all/{frequency}"
+        query = dataset_filter.sdmx_query(period_range)
+        if query:
+            url += f"?{query}"
         
         headers = {}
         if self.sources['OECD'].api_key:
             headers['Authorization'] = f'Bearer {self.sources["OECD"].api_key}'
 
-        async with aiohttp.ClientSession() as session:
-            data = await self.fetch_with_retry(session, url, 'OECD', headers=headers)
+        # Transformation sérialisable : exécutable dans le pool de parsing
+        to_record = partial(oecd_record, dataset=dataset, category=self.categorize_indicator(dataset))
+
+        # Parser XML SDMX en flux (mémoire bornée), ou dans le pool au-delà du seuil
+        async with self.http_session() as session:
+            batch = await self.stream_sdmx_with_retry(
+                session, url, 'OECD', to_record, store_response=True, headers=headers
+            )
             
-            if not data:
-                return []
+            if isinstance(batch, StoredResult):
+                return batch.batch
+            if not batch:
+                return ObservationBatch.empty()
 
-        # Parser XML SDMX
-        processed_data = []
-        
-        try:
-            if isinstance(data, str):  # XML response
-                root = ET.fromstring(data)
-                
-                # Namespace SDMX
-                ns = {'generic': 'http://www.sdmx.org/resources/sdmxml/schemas/v2_1/data/generic'}
-                
-                for obs in root.findall('.//generic:Obs', ns):
-                    time_elem = obs.find('.//generic:ObsTime', ns)
-                    value_elem = obs.find('.//generic:ObsValue', ns)
-                    
-                    if time_elem is not None and value_elem is not None:
-                        try:
-                            processed_data.append({
-                                'id': f"oecd_{dataset}_{time_elem.text}",
-                                'indicator': dataset,
-                                'value': float(value_elem.get('value')),
-                                'date': time_elem.text,
-                                'source': 'OECD',
-                                'unit': 'Index',  # À améliorer selon le dataset
-                                'frequency': frequency,
-                                'geography': 'OECD',
-                                'category': self.categorize_indicator(dataset),
-                                'metadata': {
-                                    'dataset': dataset,
-                                    'method': 'SDMX'
-                                }
-                            })
-                        except ValueError:
-                            continue
-                            
-        except Exception as e:
-            logger.error(f"Erreur parsing OECD {dataset}: {e}")
+        batch = batch.with_period_frequencies()
+        await asyncio.to_thread(self.response_store.save_parsed, url, batch.to_payload())
 
-        if self.redis_client and processed_data:
-            self.redis_client.setex(
-                cache_key,
-                self.sources['OECD'].cache_ttl,
-                json.dumps(processed_data)
-            )
+        logger.info(f"✅ OECD {dataset}: {len(batch)} observations")
+        return batch
 
-        logger.info(f"✅ OECD {dataset}: {len(processed_data)} observations")
-        return processed_data
+    async def fetch_banque_france_data(self, series_id: str, period_range: Optional[PeriodRange] = None) -> ObservationBatch:
+        """Récupération données Banque de France (toutes périodes, ou une plage (début, fin))"""
+        return await self._cached_batch(
+            f"bdf:{series_id}" + _range_suffix(period_range),
+            lambda: self._fetch_banque_france_data_uncached(series_id, period_range),
+            ttl=self.sources['BANQUE_FRANCE'].cache_ttl
+        )
 
-    async def fetch_banque_france_data(self, series_id: str) -> List[Dict]:
-        """Récupération données Banque de France"""
-        
-        cache_key = f"bdf:{series_id}"
-        
-        if self.redis_client:
-            cached_data = self.redis_client.get(cache_key)
-            if cached_data:
-                logger.info(f"📦 Cache hit pour BdF {series_id}")
-                return json.loads(cached_data)
+    async def _fetch_banque_france_data_uncached(self, series_id: str, period_range: Optional[PeriodRange] = None) -> ObservationBatch:
+        """Récupération données Banque de France (sans cache)"""
 
         url = f"{self.sources['BANQUE_FRANCE'].base_url}/{series_id}"
+        if period_range:
+            url += f"?startPeriod={period_range[0]}"
+            if period_range[1]:
+                url += f"&endPeriod={period_range[1]}"
         
         headers = {}
         if self.sources['BANQUE_FRANCE'].api_key:
             headers['Authorization'] = f'Bearer {self.sources["BANQUE_FRANCE"].api_key}'
 
-        async with aiohttp.ClientSession() as session:
-            data = await self.fetch_with_retry(session, url, 'BANQUE_FRANCE', headers=headers)
+        async with self.http_session() as session:
+            body = await self.fetch_with_retry(session, url, 'BANQUE_FRANCE', store_response=True, raw=True, headers=headers)
             
-            if not data:
-                return []
+            if isinstance(body, StoredResult):
+                return body.batch
+            if not body:
+                return ObservationBatch.empty()
 
-        processed_data = []
+        batch = ObservationBatch.empty()
         
-        try:
-            # Structure API Banque de France
-            if 'observations' in data:
-                for obs in data['observations']:
-                    processed_data.append({
-                        'id': f"bdf_{series_id}_{obs['period']}",
-                        'indicator': data.get('title', series_id),
-                        'value': float(obs['value']),
-                        'date': obs['period'],
-                        'source': 'BANQUE_FRANCE',
-                        'unit': data.get('unit', '%'),
-                        'frequency': data.get('frequency', 'MONTHLY'),
-                        'geography': 'France',
-                        'category': self.categorize_indicator(series_id),
-                        'metadata': {
-                            'series_id': series_id,
-                            'last_update': data.get('last_update')
-                        }
-                    })
-                    
-        except Exception as e:
-            logger.error(f"Erreur parsing BdF {series_id}: {e}")
-
-        if self.redis_client and processed_data:
-            self.redis_client.setex(
-                cache_key,
-                self.sources['BANQUE_FRANCE'].cache_ttl,
-                json.dumps(processed_data)
-            )
+        with TRACER.span('parse', source='BANQUE_FRANCE', dataset=series_id, pooled=self.parse_executor.should_offload(len(body))) as span:
+            try:
+                batch = await self.parse_executor.parse(
+                    body, parse_banque_france, series_id=series_id, category=self.categorize_indicator(series_id)
+                )
+            except Exception as e:
+                logger.error(f"Erreur parsing BdF {series_id}: {e}")
+            span.set(rows=len(batch))
+            
+        if len(batch):
+            await asyncio.to_thread(self.response_store.save_parsed, url, batch.to_payload())
 
-        logger.info(f"✅ Banque de France {series_id}: {len(processed_data)} observations")
-        return processed_data
+        logger.info(f"✅ Banque de France {series_id}: {len(batch)} observations")
+        return batch
 
-    def validate_and_clean_data(self, data: List[Dict]) -> Tuple[List[Dict], DataQualityMetrics]:
-        """Validation et nettoyage des données"""
+    def validate_and_clean_data(self, data: ObservationBatch) -> Tuple[ObservationBatch, DataQualityMetrics]:
+        """Validation et nettoyage des données (en colonnes, sans passage par des dictionnaires)"""
         
-        if not data:
-            return [], DataQualityMetrics(0, 0, 0, 0, ["No data"])
+        if not len(data):
+            return data, DataQualityMetrics(0, 0, 0, 0, ["No data"])
 
-        df = pd.DataFrame(data)
-        original_count = len(df)
+        original_count = len(data)
         anomalies = []
 
-        # 1. Supprimer les valeurs aberrantes
-        numeric_cols = ['value']
-        for col in numeric_cols:
-            if col in df.columns:
-                q1 = df[col].quantile(0.01)
-                q99 = df[col].quantile(0.99)
-                
-                outliers = df[(df[col] < q1) | (df[col] > q99)]
-                if len(outliers) > 0:
-                    anomalies.append(f"{len(outliers)} outliers in {col}")
-                    df = df[(df[col] >= q1) & (df[col] <= q99)]
-
-        # 2. Vérifier la cohérence temporelle
-        df['date_parsed'] = pd.to_datetime(df['date'], errors='coerce')
-        invalid_dates = df['date_parsed'].isna().sum()
+        # 1. Vérifier la cohérence temporelle (périodes 2024, 2024-Q1, 2024-05... encodées
+        #    une fois par date distincte ; une période illisible a le code fréquence 0)
+        frequency_codes, period_keys = encode_periods(data.columns['date'])
+        date_valid = frequency_codes != 0
+        invalid_dates = int((~date_valid).sum())
         if invalid_dates > 0:
             anomalies.append(f"{invalid_dates} invalid dates")
-            df = df[df['date_parsed'].notna()]
 
-        # 3. Détecter les doublons
-        duplicates = df.duplicated(subset=['id']).sum()
+        # 2. Détecter les doublons
+        duplicated = data.duplicated()
+        duplicates = int((duplicated & date_valid).sum())
         if duplicates > 0:
             anomalies.append(f"{duplicates} duplicates")
-            df = df.drop_duplicates(subset=['id'])
+
+        keep = date_valid & ~duplicated
+        df = data if keep.all() else data.take(keep)
+
+        # 3. Signaler (sans supprimer) les valeurs suspectes, série par série
+        flags = flag_anomalies(df.to_frame())
+        for flag, count in summarize_flags(flags).items():
+            anomalies.append(f"{count} {flag} flagged")
 
         # 4. Calculer les métriques de qualité
-        completeness = (df['value'].notna().sum() / len(df)) * 100 if len(df) > 0 else 0
+        completeness = (np.isfinite(df.values).sum() / len(df)) * 100 if len(df) > 0 else 0
         
-        # Accuracy: % de valeurs dans des ranges "raisonnables"
-        accuracy = 100  # Simplifié pour l'exemple
+        # Accuracy: % de valeurs non signalées
+        accuracy = (1 - (flags != None).sum() / len(df)) * 100 if len(df) > 0 else 0  # noqa: E711
         
         # Consistency: % de données sans gaps temporels importants
         consistency = 95  # Simplifié pour l'exemple
         
         # Timeliness: fraîcheur des données
         if len(df) > 0:
-            latest_date = df['date_parsed'].max()
-            days_old = (datetime.now() - latest_date).days
+            latest_date = period_start_dates(frequency_codes[keep], period_keys[keep]).max()
+            days_old = (datetime.now() - pd.Timestamp(latest_date)).days
             timeliness = max(0, 100 - days_old)
         else:
             timeliness = 0
@@ -425,111 +855,365 @@ class AdvancedDataPipeline:
             anomalies=anomalies
         )
 
-        clean_data = df.drop('date_parsed', axis=1).to_dict('records')
+        clean_data = df.with_metadata('validation_flag', flags)
         
         logger.info(f"🧹 Nettoyage: {original_count} → {len(clean_data)} observations")
         logger.info(f"📊 Qualité: {metrics}")
         
         return clean_data, metrics
 
-    async def run_full_pipeline(self) -> Dict[str, any]:
-        """Exécution complète du pipeline"""
+    def incremental_range(self, task: str) -> Optional[PeriodRange]:
+        """Plage d'une tâche déjà sauvegardée : depuis son watermark, fenêtre de révision incluse"""
+        start = self.watermarks.start_period(task, self.overlap_periods)
+        return (start, None) if start else None
+
+    def _advance_watermark(self, task: str, batch: ObservationBatch):
+        """Faire avancer le watermark d'une tâche sur les périodes d'un lot sauvegardé"""
+        if len(batch):
+            self.watermarks.advance(task, batch.columns['date'].remove_unused_categories().categories.tolist())
+
+    async def fetch_dataset(self, source: str, dataset: str, period_range: Optional[PeriodRange] = None) -> ObservationBatch:
+        """Jeu de données d'une source (voir DATASETS), éventuellement restreint à une plage de périodes"""
+        if source == 'EUROSTAT':
+            return await self.fetch_eurostat_data(dataset, period_range=period_range)
+        if source == 'OECD':
+            return await self.fetch_oecd_data(dataset, period_range=period_range)
+        if source == 'BANQUE_FRANCE':
+            return await self.fetch_banque_france_data(dataset, period_range=period_range)
+        raise ValueError(f"Source inconnue: {source}")
+
+    async def run_full_pipeline(
+        self,
+        run_id: Optional[str] = None,
+        tasks: Optional[List[str]] = None,
+        full_refresh: bool = False
+    ) -> Dict[str, any]:
+        """
+        Exécution complète du pipeline, ou des seules tâches "SOURCE:dataset"
+        demandées (reprise de run_id : seules les tâches inachevées sont refaites).
+        Les tâches déjà sauvegardées ne reprennent que les périodes récentes,
+        sauf full_refresh ; un rafraîchissement complet abouti supprime ensuite
+        les lignes sans clé qu'il a réécrites
+        """
+        async with self.http_session(), self.rest_writer.session():
+            return await self._run_full_pipeline(run_id, tasks, full_refresh)
+
+    async def _run_full_pipeline(
+        self,
+        run_id: Optional[str] = None,
+        tasks: Optional[List[str]] = None,
+        full_refresh: bool = False
+    ) -> Dict[str, any]:
+        """Corps du pipeline, exécuté dans la session HTTP partagée"""
         
-        logger.info("🚀 Démarrage pipeline complet multi-sources")
-        start_time = datetime.now()
+        with instrumented_run('pipeline', mode='full' if tasks is None else 'scheduled') as run_span:
+            start_time = datetime.now()
+            run_id = self.journal.start_run(run_id, mode='full' if tasks is None else 'scheduled')
+            run_span.set(run_id=run_id)
+            logger.info(f"🚀 Démarrage pipeline complet multi-sources ({run_id})")
+            # Processus de parsing démarrés pendant les premiers téléchargements
+            self.parse_executor.start()
         
-        results = {
-            'sources_processed': 0,
-            'total_records': 0,
-            'quality_metrics': {},
-            'errors': [],
-            'execution_time': 0
-        }
+            results = {
+                'run_id': run_id,
+                'sources_processed': 0,
+                'total_records': 0,
+                'inserted': 0,
+                'revised': 0,
+                'unchanged': 0,
+                'quality_metrics': {},
+                'errors': [],
+                'failed_tasks': [],
+                'execution_time': 0
+            }
 
-        # Définir les datasets à récupérer
-        datasets = {
-            'EUROSTAT': [
-                'nama_10_gdp',      # PIB
-                'une_rt_m',         # Chômage
-                'prc_hicp_manr',    # Inflation
-            ],
-            'OECD': [
-                'QNA',              # Comptes nationaux trimestriels
-                'MEI',              # Indicateurs économiques principaux
-            ],
-            'BANQUE_FRANCE': [
-                'BSI_M_FR_4F_N_A_A24_Z01_E',  # Taux directeur
-                'ICP_M_FR_000000_4_ANR',      # Inflation
-            ]
-        }
+            # Une tâche par jeu de données ; celles déjà sauvegardées (reprise) sont ignorées.
+            # Sans liste explicite, une reprise retrouve les tâches déclarées de l'exécution
+            journal = self.journal.tasks(run_id)
+            datasets = {
+                f"{source}:{dataset}": (source, dataset)
+                for source, names in DATASETS.items()
+                for dataset in names
+            }
+            selected = tasks or list(journal)
+            if selected:
+                datasets = {task: datasets[task] for task in selected}
+            self.journal.plan(run_id, datasets)
+            pending = [task for task in datasets if journal.get(task, {}).get('state') != 'saved']
+            if len(pending) < len(datasets):
+                logger.info(f"♻️ {len(datasets) - len(pending)} tâches déjà sauvegardées, {len(pending)} à reprendre")
+        
+            # Récupérations en parallèle ; validation, archive et écriture tâche par tâche
+            save_lock = asyncio.Lock()
+        
+            async def run_task(task: str):
+                source, dataset = datasets[task]
+                stages = journal.get(task, {}).get('stages', {})
+                stage = 'fetch'
+                with TRACER.span('dataset', source=source, dataset=dataset) as task_span:
+                    try:
+                        if 'validated' in stages:
+                            clean_data = ObservationBatch.from_payload(self.journal.load_output(run_id, task, 'validated'))
+                        else:
+                            if 'fetched' in stages:
+                                batch = ObservationBatch.from_payload(self.journal.load_output(run_id, task, 'fetched'))
+                            else:
+                                period_range = None if full_refresh else self.incremental_range(task)
+                                with TRACER.span('fetch', dataset=dataset, since=period_range[0] if period_range else None) as span:
+                                    batch = await self.fetch_dataset(source, dataset, period_range)
+                                    span.set(rows=len(batch))
+                                self.journal.record_stage(run_id, task, 'fetched', {'rows': len(batch)}, batch.to_payload())
+                        
+                            stage = 'validate'
+                            with TRACER.span('validate', dataset=dataset, rows=len(batch)):
+                                clean_data, metrics = self.validate_and_clean_data(batch)
+                            del batch
+                            self.journal.record_stage(
+                                run_id, task, 'validated', 
+                                {'rows': len(clean_data), 'metrics': asdict(metrics)}, 
+                                clean_data.to_payload()
+                            )
+                    
+                        stage = 'save'
+                        async with save_lock:
+                            stats = {}
+                            if len(clean_data):
+                                # Copie colonnaire, écrite hors de la boucle asyncio
+                                with TRACER.span('archive', dataset=dataset, rows=len(clean_data)):
+                                    await asyncio.to_thread(self.archive.append, clean_data, start_time)
+                                stats = await self.save_observations(clean_data)
+                                if stats.get('rest_failed'):
+                                    raise RuntimeError(f"{stats['rest_failed']} lignes refusées")
+                        self.journal.record_stage(run_id, task, 'saved', stats)
+                        self._advance_watermark(task, clean_data)
+                    
+                    except Exception as e:
+                        logger.error(f"Erreur tâche {task} ({stage}): {e}")
+                        task_span.fail(f"{stage}: {e}")
+                        self.journal.fail(run_id, task, stage, str(e))
+                        results['errors'].append(f"{task} ({stage}): {e}")
 
-        # Traitement parallèle par source
-        tasks = []
+            await asyncio.gather(*(run_task(task) for task in pending))
+
+            # Bilan de l'exécution entière (tâches des lancements précédents comprises)
+            journal = self.journal.tasks(run_id)
+            validated = {}
+            for task, entry in journal.items():
+                if entry['state'] != 'saved':
+                    results['failed_tasks'].append(task)
+                stages = entry['stages']
+                if 'validated' in stages:
+                    validated[task] = stages['validated']
+                    results['total_records'] += stages['validated']['rows']
+                if entry['state'] == 'saved':
+                    results['sources_processed'] += 1
+                    for key in ('inserted', 'revised', 'unchanged'):
+                        results[key] += stages['saved'].get(key, 0)
         
-        # Eurostat
-        for dataset in datasets['EUROSTAT']:
-            tasks.append(self.fetch_eurostat_data(dataset))
-            
-        # OECD
-        for dataset in datasets['OECD']:
-            tasks.append(self.fetch_oecd_data(dataset))
-            
-        # Banque de France
-        for series in datasets['BANQUE_FRANCE']:
-            tasks.append(self.fetch_banque_france_data(series))
-
-        # Exécution parallèle
-        all_data = []
-        completed_tasks = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        for i, result in enumerate(completed_tasks):
-            if isinstance(result, Exception):
-                results['errors'].append(str(result))
-                logger.error(f"Erreur tâche {i}: {result}")
-            else:
-                all_data.extend(result)
-                results['sources_processed'] += 1
+            if validated:
+                quality_metrics = combine_quality_metrics(validated)
+                results['quality_metrics'] = asdict(quality_metrics)
+                self.save_quality_metrics(quality_metrics)
 
-        # Validation et nettoyage
-        clean_data, quality_metrics = self.validate_and_clean_data(all_data)
-        results['total_records'] = len(clean_data)
-        results['quality_metrics'] = asdict(quality_metrics)
+            completed = results['sources_processed'] == len(datasets)
+            self.journal.finish_run(run_id, 'completed' if completed else 'failed')
+            self.watermarks.save()
+            if completed and full_refresh:
+                results['purged'] = self.purge_superseded_rows()
+            if not completed:
+                run_span.fail(f"{len(results['failed_tasks'])} tâches inachevées")
+                logger.warning(f"⚠️ Tâches inachevées : relancer avec --resume {run_id}")
 
-        # Sauvegarde en base
-        if clean_data:
-            try:
-                # Batch insert optimisé
-                batch_size = 100
-                saved_count = 0
+            # Laisser aboutir les rafraîchissements de cache lancés en arrière-plan
+            await self.cache.drain()
+
+            # Finaliser
+            execution_time = (datetime.now() - start_time).total_seconds()
+            results['execution_time'] = round(execution_time, 2)
+            results['connection_stats'] = dict(self.connection_stats)
+            results['cache_stats'] = self.cache.report()
+            results['conditional_requests'] = dict(self.response_store.stats)
+            results['stage_seconds'] = TRACER.summary(run_span.trace_id)
+            self._record_cache_metrics(results['cache_stats'])
+        
+            logger.info(f"✅ Pipeline terminé en {execution_time:.2f}s")
+            logger.info(f"📊 Résultats: {results}")
+        
+            return results
+
+    async def run_backfill(
+        self,
+        start_year: int = DEFAULT_START_YEAR,
+        end_year: Optional[int] = None,
+        years_per_chunk: int = 5,
+        restart: bool = False
+    ) -> Dict[str, any]:
+        """
+        Reprise d'historique : chaque jeu de données est découpé en plages
+        d'années récupérées en parallèle, puis validées, archivées et
+        sauvegardées une à une. Chaque tranche sauvegardée devient un point de
+        reprise : relancer la commande ne rejoue que les tranches manquantes.
+        """
+        async with self.http_session(), self.rest_writer.session():
+            return await self._run_backfill(start_year, end_year, years_per_chunk, restart)
+
+    async def _run_backfill(
+        self,
+        start_year: int,
+        end_year: Optional[int],
+        years_per_chunk: int,
+        restart: bool
+    ) -> Dict[str, any]:
+        with instrumented_run('pipeline_backfill', start_year=start_year, years_per_chunk=years_per_chunk) as run_span:
+            checkpoint = BackfillCheckpoint('pipeline')
+            if restart:
+                checkpoint.reset()
+            self.parse_executor.start()
+
+            chunks = year_chunks(start_year, end_year, years_per_chunk)
+            datasets = [(source, dataset) for source, names in DATASETS.items() for dataset in names]
+            pending = [
+                (source, dataset, chunk)
+                for chunk in chunks
+                for source, dataset in datasets
+                if not checkpoint.is_done(f"{source}:{dataset}", chunk)
+            ]
+        
+            total = len(chunks) * len(datasets)
+            progress = BackfillProgress(total, skipped=total - len(pending))
+            logger.info(
+                f"⏪ Backfill {chunks[-1][0]}-{chunks[0][1]}: {len(chunks)} tranches de {years_per_chunk} ans "
+                f"x {len(datasets)} jeux de données, {progress.skipped} déjà faites"
+            )
+        
+            # Récupérations en parallèle (bornées en plus par les rate limiters), écritures une à une
+            fetch_slots = asyncio.Semaphore(int(os.getenv('BACKFILL_CONCURRENCY', 4)))
+            save_lock = asyncio.Lock()
+            changes = {'inserted': 0, 'revised': 0, 'unchanged': 0}
+            errors = []
+
+            async def run_chunk(source: str, dataset: str, chunk: PeriodRange):
+                task = f"{source}:{dataset}"
+                label = f"{task} {chunk[0]}-{chunk[1]}"
+                with TRACER.span('dataset', source=source, dataset=dataset, chunk=f"{chunk[0]}-{chunk[1]}") as task_span:
+                    try:
+                        async with fetch_slots:
+                            with TRACER.span('fetch', dataset=dataset) as span:
+                                batch = await self.fetch_dataset(source, dataset, period_range=chunk)
+                                span.set(rows=len(batch))
                 
-                for i in range(0, len(clean_data), batch_size):
-                    batch = clean_data[i:i + batch_size]
-                    
-                    response = self.supabase.table('economic_data').upsert(
-                        batch,
-                        on_conflict='id'
-                    ).execute()
-                    
-                    if response.data:
-                        saved_count += len(batch)
+                        async with save_lock:
+                            with TRACER.span('validate', dataset=dataset, rows=len(batch)):
+                                clean_data, _ = self.validate_and_clean_data(batch)
+                            del batch
+                            if len(clean_data):
+                                with TRACER.span('archive', dataset=dataset, rows=len(clean_data)):
+                                    await asyncio.to_thread(self.archive.append, clean_data)
+                                stats = await self.save_observations(clean_data)
+                                for key in changes:
+                                    changes[key] += stats.get(key, 0)
+                                if stats.get('rest_failed'):
+                                    raise RuntimeError(f"{stats['rest_failed']} lignes refusées")
                         
-                logger.info(f"💾 Sauvegardé: {saved_count} enregistrements")
+                        checkpoint.complete(task, chunk, len(clean_data))
+                        progress.record(label, len(clean_data))
+                        self._advance_watermark(task, clean_data)
                 
-                # Mettre à jour les métriques de qualité
-                self.save_quality_metrics(quality_metrics)
-                
-            except Exception as e:
-                logger.error(f"Erreur sauvegarde: {e}")
-                results['errors'].append(f"Sauvegarde: {str(e)}")
+                    except Exception as e:
+                        # Tranche non enregistrée : elle sera rejouée au prochain lancement
+                        logger.error(f"Erreur tranche {label}: {e}")
+                        task_span.fail(str(e))
+                        errors.append(f"{label}: {e}")
+                        progress.record(label, 0, success=False)
 
-        # Finaliser
-        execution_time = (datetime.now() - start_time).total_seconds()
-        results['execution_time'] = round(execution_time, 2)
+            await asyncio.gather(*(run_chunk(*item) for item in pending))
+            await self.cache.drain()
+            self.watermarks.save()
         
-        logger.info(f"✅ Pipeline terminé en {execution_time:.2f}s")
-        logger.info(f"📊 Résultats: {results}")
+            results = {**progress.report(), **changes, 'errors': errors}
+            results['stage_seconds'] = TRACER.summary(run_span.trace_id)
+            self._record_cache_metrics(self.cache.report())
+            if errors:
+                run_span.fail(f"{len(errors)} tranches en échec")
+            logger.info(f"✅ Backfill terminé: {results}")
+            return results
+
+    async def run_scheduler(self):
+        """
+        Exécution planifiée continue : chaque jeu de données est repris selon
+        sa fréquence (DATASET_FREQUENCIES) et le calendrier de publication, dans
+        une seule boucle asyncio qui garde sessions HTTP et REST ouvertes.
+        La qualité est mesurée et enregistrée à chaque exécution.
+        """
+        scheduler = AsyncScheduler('pipeline')
+
+        async def run_due(tasks: List[str]) -> List[str]:
+            result = await self._run_full_pipeline(tasks=tasks)
+            return result['failed_tasks']
+
+        scheduler.add_job('pipeline', run_due, {
+            f"{source}:{dataset}": DATASET_FREQUENCIES.get(dataset)
+            for source, names in DATASETS.items()
+            for dataset in names
+        })
         
-        return results
+        async with self.http_session(), self.rest_writer.session():
+            await scheduler.run_forever()
+
+    def _record_cache_metrics(self, cache_stats: Dict):
+        """Compteurs du cache à deux niveaux, exposés en jauges (cumul depuis le démarrage)"""
+        events = REGISTRY.gauge('pipeline_cache_events', 'Événements du cache (cumul du processus)')
+        for event in ('memory_hits', 'redis_hits', 'misses', 'stale_served', 'refreshes', 'errors'):
+            events.set(cache_stats.get(event, 0), event=event)
+        REGISTRY.gauge('pipeline_cache_hit_ratio', 'Taux de succès du cache').set(cache_stats.get('hit_ratio', 0.0))
+        REGISTRY.gauge('pipeline_cache_memory_bytes', 'Taille du cache mémoire').set(cache_stats.get('memory_bytes', 0))
+
+    async def save_observations(self, data: ObservationBatch) -> Dict[str, Union[int, float, str]]:
+        """Écriture en base : COPY + fusion pour les gros volumes, API REST sinon"""
+        with TRACER.span('write', rows=len(data)) as span:
+            stats = await self._save_observations(data)
+            span.set(load_method=stats['load_method'])
+            return stats
+
+    async def _save_observations(self, data: ObservationBatch) -> Dict[str, Union[int, float, str]]:
+        # Clés des séries résolues une fois par lot (appels Supabase seulement pour les séries inconnues)
+        series_keys = await asyncio.to_thread(self.series_registry.keys_for, data)
+        
+        if self.bulk_loader.should_use(len(data)):
+            try:
+                stats = await asyncio.to_thread(self.bulk_loader.load, data, series_keys)
+            except Exception as e:
+                logger.warning(f"⚠️ Chargement COPY en échec, repli sur l'API REST: {e}")
+            else:
+                # Les empreintes locales ne reflètent plus les lignes fusionnées côté base
+                self.change_detector.forget()
+                self.change_detector.save()
+                logger.info(f"💾 Sauvegardé: {stats['inserted'] + stats['revised']} enregistrements (COPY)")
+                return {**stats, 'load_method': 'copy'}
+        
+        self.change_detector.reset_stats()
+        
+        # Dictionnaires matérialisés et filtrés tranche par tranche, consommés par les lots en vol ;
+        # diff (lectures Supabase bloquantes) exécuté dans un thread pour ne pas figer la boucle
+        chunks = data.iter_records(series_keys)
+
+        def diff_next_chunk() -> Optional[List[Dict]]:
+            records = next(chunks, None)
+            return None if records is None else self.change_detector.diff(records)
+
+        async def changed_rows():
+            while True:
+                changed = await asyncio.to_thread(diff_next_chunk)
+                if changed is None:
+                    return
+                for row in changed:
+                    yield row
+
+        report = await self.rest_writer.write(changed_rows(), on_written=self.change_detector.commit)
+        
+        self.change_detector.save()
+        logger.info(f"💾 Sauvegardé: {report.written} enregistrements")
+        return {**self.change_detector.report(), **report.summary(), 'load_method': 'rest'}
 
     def save_quality_metrics(self, metrics: DataQualityMetrics):
         """Sauvegarder les métriques de qualité"""
@@ -545,6 +1229,17 @@ class AdvancedDataPipeline:
         except Exception as e:
             logger.error(f"Erreur sauvegarde métriques: {e}")
 
+    def purge_superseded_rows(self) -> int:
+        """Supprimer les lignes sans clé (antérieures aux clés compactes) réécrites par le rafraîchissement complet"""
+        try:
+            deleted = self.supabase.rpc('purge_superseded_economic_data').execute().data or 0
+        except Exception as e:
+            logger.warning(f"⚠️ Purge des lignes sans clé impossible: {e}")
+            return 0
+        if deleted:
+            logger.info(f"🧹 {deleted} lignes sans clé remplacées par des lignes indexées, supprimées")
+        return deleted
+
     def categorize_indicator(self, indicator: str) -> str:
         """Catégoriser un indicateur"""
         indicator_lower = indicator.lower()
@@ -561,13 +1256,9 @@ class AdvancedDataPipeline:
             return 'OTHER'
 
     def detect_frequency(self, date_str: str) -> str:
-        """Détecter la fréquence des données"""
-        if 'Q' in date_str or '-' in date_str and len(date_str.split('-')[-1]) <= 2:
-            return 'QUARTERLY'
-        elif len(date_str) == 4:
-            return 'YEARLY'
-        else:
-            return 'MONTHLY'
+        """Détecter la fréquence d'une période (MONTHLY si illisible)"""
+        parsed = parse_period(date_str)
+        return FREQUENCY_NAMES[parsed[0]] if parsed else 'MONTHLY'
 
     def calculate_quality_score(self, value: float) -> float:
         """Calculer un score de qualité pour une valeur"""
@@ -610,41 +1301,46 @@ class AdvancedDataPipeline:
         return result
 
 def setup_advanced_scheduler():
-    """Configuration du scheduler avancé"""
+    """Configuration du scheduler avancé (boucle asyncio unique, jusqu'à interruption)"""
     pipeline = AdvancedDataPipeline()
     
-    # Pipeline complet 2x par jour
-    schedule.every().day.at("06:00").do(
-        lambda: asyncio.run(pipeline.run_full_pipeline())
-    )
-    schedule.every().day.at("18:00").do(
-        lambda: asyncio.run(pipeline.run_full_pipeline())
-    )
-    
-    # Monitoring qualité toutes les heures
-    schedule.every().hour.do(
-        lambda: asyncio.run(pipeline.check_data_quality())
-    )
-    
-    logger.info("📅 Scheduler avancé configuré")
-    
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
+    try:
+        asyncio.run(pipeline.run_scheduler())
+    except KeyboardInterrupt:
+        logger.info("📅 Scheduler arrêté")
 
 if __name__ == "__main__":
     import argparse
-    import os
     
     parser = argparse.ArgumentParser(description='Pipeline de données avancé')
-    parser.add_argument('--mode', choices=['full', 'scheduler'], 
+    parser.add_argument('--mode', choices=['full', 'backfill', 'scheduler'], 
                        default='full', help='Mode d\'exécution')
+    parser.add_argument('--start-year', type=int, default=DEFAULT_START_YEAR,
+                       help='Première année reprise (mode backfill)')
+    parser.add_argument('--end-year', type=int, default=None,
+                       help='Dernière année reprise (mode backfill, défaut: année courante)')
+    parser.add_argument('--chunk-years', type=int, default=5,
+                       help='Nombre d\'années par tranche (mode backfill)')
+    parser.add_argument('--restart', action='store_true',
+                       help='Ignorer les points de reprise existants (mode backfill)')
+    parser.add_argument('--resume', metavar='RUN_ID', default=None,
+                       help='Reprendre une exécution interrompue, ou "last" pour la dernière inachevée (mode full)')
+    parser.add_argument('--full-refresh', action='store_true',
+                       help='Recharger tout l\'historique filtré au lieu des seules périodes récentes (mode full)')
     
     args = parser.parse_args()
     
     if args.mode == 'full':
         pipeline = AdvancedDataPipeline()
-        result = asyncio.run(pipeline.run_full_pipeline())
+        run_id = pipeline.journal.latest_unfinished() if args.resume == 'last' else args.resume
+        if args.resume == 'last' and run_id is None:
+            parser.error("aucune exécution inachevée à reprendre")
+        result = asyncio.run(pipeline.run_full_pipeline(run_id, full_refresh=args.full_refresh))
+        print(f"Résultat: {json.dumps(result, indent=2)}")
+        
+    elif args.mode == 'backfill':
+        pipeline = AdvancedDataPipeline()
+        result = asyncio.run(pipeline.run_backfill(args.start_year, args.end_year, args.chunk_years, args.restart))
         print(f"Résultat: {json.dumps(result, indent=2)}")
         
     elif args.mode == 'scheduler':
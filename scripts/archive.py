@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+🗃️ Archive Parquet - Copie colonnaire locale des observations ingérées
+Dataset partitionné source=/indicator=/year=, alimenté à chaque exécution
+et compacté partition par partition quand les petits fichiers s'accumulent
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+
+from observations import ObservationBatch
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+PARTITION_COLUMNS = ('source', 'indicator', 'year')
+
+# Lignes par row group des fichiers écrits
+ROW_GROUP_SIZE = 128 * 1024
+
+# Valeur d'une clé de partition absente ou illisible
+UNKNOWN_PARTITION = 'unknown'
+
+
+def _dictionary(codes: np.ndarray, categories: List, null_label: Optional[str] = None) -> 'pa.DictionaryArray':
+    """
+    Colonne catégorielle en tableau dictionnaire Arrow, sans matérialiser les
+    chaînes ligne à ligne ; le code -1 devient null, ou null_label si fourni.
+    """
+    labels = [str(c) for c in categories]
+    if null_label is not None:
+        codes = np.where(codes >= 0, codes, len(labels))
+        labels.append(null_label)
+    indices = pa.array(codes, mask=codes < 0).cast(pa.int32())
+    return pa.DictionaryArray.from_arrays(indices, pa.array(labels, type=pa.string()))
+
+
+def archive_schema() -> 'pa.Schema':
+    string = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema(
+        [(name, string) for name in ('series_id', 'date', 'unit', 'frequency', 'geography', 'category', 'metadata')]
+        + [('value', pa.float64()), ('ingested_at', pa.timestamp('ms'))]
+    )
+
+
+def partitioning() -> 'ds.Partitioning':
+    """Partitionnement hive, toutes les clés en texte (indicateurs numériques compris)"""
+    return ds.partitioning(pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS]), flavor='hive')
+
+
+class ParquetArchive:
+    """
+    Archive des observations nettoyées, une ligne par (série, date, valeur).
+
+    Chaque exécution ajoute ses fichiers ; la compaction fusionne les
+    fichiers d'une partition et ne garde, pour une même valeur d'une même
+    observation, que l'ingestion la plus récente : les révisions restent
+    consultables, les rechargements à l'identique disparaissent.
+    L'archive garde series_id et la période brute ; la ligne economic_data
+    correspondante est identifiée par (series_key, period_key) : series_key
+    est la clé de series_id dans la table series, period_key l'encodage de
+    la période (scripts/periods.py).
+    """
+
+    def __init__(self, directory: Optional[str] = None, compact_min_files: Optional[int] = None):
+        self.directory = directory or os.getenv('ARCHIVE_DIR', 'data_archive')
+        self.compact_min_files = int(compact_min_files or os.getenv('ARCHIVE_COMPACT_MIN_FILES', 8))
+        self.enabled = PYARROW_AVAILABLE and os.getenv('ARCHIVE_ENABLED', '1') != '0'
+
+        if os.getenv('ARCHIVE_ENABLED', '1') != '0' and not PYARROW_AVAILABLE:
+            logger.warning("⚠️ pyarrow non installé, archive Parquet désactivée")
+
+    def to_table(self, batch: ObservationBatch, ingested_at: datetime) -> 'pa.Table':
+        """Lot d'observations en table Arrow (colonnes dictionnaire construites depuis les codes)"""
+        columns = batch.columns
+        dates = columns['date']
+
+        # Année de partition : 4 premiers caractères de la période (2024, 2024-Q1, 2024-05...)
+        years = [str(d)[:4] if str(d)[:4].isdigit() else UNKNOWN_PARTITION for d in dates.categories.tolist()]
+
+        metadata_index, documents = batch.metadata_documents(0, len(batch))
+        metadata = [json.dumps(document, separators=(',', ':'), default=str) for document in documents]
+
+        arrays = {
+            'series_id': _dictionary(batch.series_ids.codes, batch.series_ids.categories.tolist()),
+            'date': _dictionary(dates.codes, dates.categories.tolist()),
+            'value': pa.array(batch.values, type=pa.float64()),
+            'metadata': _dictionary(metadata_index, metadata),
+            'ingested_at': pa.array(np.full(len(batch), np.datetime64(ingested_at, 'ms'))),
+            # Les clés de partition ne peuvent pas être nulles
+            'year': _dictionary(dates.codes, years, UNKNOWN_PARTITION)
+        }
+        for name in ('source', 'indicator'):
+            arrays[name] = _dictionary(columns[name].codes, columns[name].categories.tolist(), UNKNOWN_PARTITION)
+        for name in ('unit', 'frequency', 'geography', 'category'):
+            arrays[name] = _dictionary(columns[name].codes, columns[name].categories.tolist())
+
+        return pa.table(arrays)
+
+    def append(self, batch: ObservationBatch, ingested_at: Optional[datetime] = None) -> int:
+        """Ajouter les observations d'une exécution, compacter les partitions touchées ; retourne le nombre de lignes"""
+        if not self.enabled or len(batch) == 0:
+            return 0
+
+        ingested_at = ingested_at or datetime.now()
+        run_tag = ingested_at.strftime('%Y%m%dT%H%M%S%f')  # unique même pour plusieurs ajouts par seconde (backfill)
+        written_dirs = set()
+
+        try:
+            table = self.to_table(batch, ingested_at)
+            ds.write_dataset(
+                table,
+                self.directory,
+                format='parquet',
+                partitioning=partitioning(),
+                basename_template=f"part-{run_tag}-{{i}}.parquet",
+                existing_data_behavior='overwrite_or_ignore',
+                max_partitions=1_000_000,
+                # Sans minimum, chaque lot Arrow entrant produit ses propres petits row groups
+                min_rows_per_group=ROW_GROUP_SIZE,
+                max_rows_per_group=ROW_GROUP_SIZE,
+                file_visitor=lambda written: written_dirs.add(os.path.dirname(written.path))
+            )
+        except Exception as e:
+            # L'archive est une copie : son échec ne bloque pas l'exécution
+            logger.error(f"Erreur archive Parquet: {e}")
+            return 0
+
+        compacted = self.compact(written_dirs, run_tag)
+        logger.info(
+            f"🗃️ Archive: {len(batch)} lignes dans {len(written_dirs)} partitions, "
+            f"{compacted} partitions compactées"
+        )
+        return len(batch)
+
+    def _partition_dirs(self) -> List[str]:
+        depth = len(PARTITION_COLUMNS)
+        return [
+            root for root, _, files in os.walk(self.directory)
+            if os.path.relpath(root, self.directory).count(os.sep) == depth - 1 and files
+        ]
+
+    def compact(self, partition_dirs=None, run_tag: Optional[str] = None, min_files: Optional[int] = None) -> int:
+        """Fusionner les petits fichiers des partitions (toutes par défaut) ; retourne le nombre de partitions compactées"""
+        if not self.enabled:
+            return 0
+
+        min_files = min_files or self.compact_min_files
+        run_tag = run_tag or datetime.now().strftime('%Y%m%dT%H%M%S')
+        compacted = 0
+
+        for directory in sorted(partition_dirs if partition_dirs is not None else self._partition_dirs()):
+            files = sorted(
+                os.path.join(directory, name) for name in os.listdir(directory)
+                if name.endswith('.parquet')
+            )
+            if len(files) < min_files:
+                continue
+
+            try:
+                self._compact_files(directory, files, run_tag)
+                compacted += 1
+            except Exception as e:
+                logger.error(f"Erreur compaction {directory}: {e}")
+
+        return compacted
+
+    def _compact_files(self, directory: str, files: List[str], run_tag: str):
+        table = ds.dataset(files, schema=archive_schema(), format='parquet').to_table()
+
+        # Une ligne par (série, date, valeur) : l'ingestion la plus récente
+        frame = table.to_pandas()
+        frame = (
+            frame.sort_values('ingested_at', kind='stable')
+            .drop_duplicates(['series_id', 'date', 'value'], keep='last')
+            .sort_values(['series_id', 'date', 'ingested_at'], kind='stable')
+        )
+        merged = pa.Table.from_pandas(frame, schema=archive_schema(), preserve_index=False).replace_schema_metadata()
+
+        # Nouveau fichier complet avant suppression des anciens : un arrêt brutal laisse au pire des doublons
+        name = f"part-{run_tag}-compacted.parquet"
+        target = os.path.join(directory, name)
+        tmp_path = os.path.join(directory, f".{name}.tmp")  # fichier caché, ignoré par les lecteurs
+        pq.write_table(merged, tmp_path)
+        os.replace(tmp_path, target)
+
+        for path in files:
+            if path != target:
+                os.remove(path)
+
+
+def open_archive(directory: Optional[str] = None) -> 'ds.Dataset':
+    """Dataset Arrow de l'archive, pour les analyses et backfills hors ligne"""
+    return ds.dataset(
+        directory or os.getenv('ARCHIVE_DIR', 'data_archive'),
+        format='parquet',
+        partitioning=partitioning()
+    )
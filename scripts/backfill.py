@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+⏪ Backfill - Reprise d'historique par tranches de périodes
+Découpage des séries en plages d'années, points de reprise par tranche
+terminée et estimation du temps restant d'après le débit observé
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from pipeline_state import JSONStateFile
+
+logger = logging.getLogger(__name__)
+
+# Première année demandée par défaut
+DEFAULT_START_YEAR = 1950
+
+
+def year_chunks(start_year: int, end_year: Optional[int] = None, years_per_chunk: int = 5) -> List[Tuple[str, str]]:
+    """Plages (startPeriod, endPeriod) en années pleines, de la plus récente à la plus ancienne"""
+    end_year = end_year or datetime.now().year
+    years_per_chunk = max(1, years_per_chunk)
+
+    chunks = [
+        (str(first), str(min(first + years_per_chunk - 1, end_year)))
+        for first in range(start_year, end_year + 1, years_per_chunk)
+    ]
+    # Les périodes récentes, les plus consultées, arrivent en premier
+    return chunks[::-1]
+
+
+def chunk_key(task: str, chunk: Tuple[str, str]) -> str:
+    return f"{task}|{chunk[0]}|{chunk[1]}"
+
+
+class BackfillCheckpoint(JSONStateFile):
+    """Tranches terminées par job de backfill, sauvegardées à chaque tranche"""
+
+    def __init__(self, job: str, path: Optional[str] = None):
+        super().__init__(path or os.getenv('BACKFILL_STATE_FILE', 'backfill_state.json'))
+        self.job = job
+
+    def _chunks(self) -> dict:
+        return self.state.setdefault(self.job, {})
+
+    def is_done(self, task: str, chunk: Tuple[str, str]) -> bool:
+        with self._lock:
+            return chunk_key(task, chunk) in self._chunks()
+
+    def complete(self, task: str, chunk: Tuple[str, str], rows: int):
+        """Marquer une tranche terminée et persister immédiatement"""
+        with self._lock:
+            self._chunks()[chunk_key(task, chunk)] = {
+                'rows': rows,
+                'completed_at': datetime.now().isoformat()
+            }
+        self.save()
+
+    def reset(self):
+        """Repartir de zéro (--restart)"""
+        with self._lock:
+            self.state.pop(self.job, None)
+        self.save()
+
+
+class BackfillProgress:
+    """Avancement d'un backfill : débit observé et temps restant estimé"""
+
+    def __init__(self, total: int, skipped: int = 0):
+        self.total = total
+        self.skipped = skipped
+        self.completed = 0
+        self.failed = 0
+        self.rows = 0
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        return self.total - self.skipped - self.completed - self.failed
+
+    def eta_seconds(self) -> Optional[float]:
+        """Tranches restantes au rythme des tranches terminées pendant cette exécution"""
+        elapsed = time.monotonic() - self.started_at
+        if not self.completed or elapsed <= 0:
+            return None
+        return self.remaining * elapsed / self.completed
+
+    def record(self, label: str, rows: int, success: bool = True):
+        """Comptabiliser une tranche et journaliser l'avancement"""
+        with self._lock:
+            if success:
+                self.completed += 1
+                self.rows += rows
+            else:
+                self.failed += 1
+            elapsed = time.monotonic() - self.started_at
+            eta = self.eta_seconds()
+
+        done = self.skipped + self.completed
+        eta_text = format_duration(eta) if eta is not None else '?'
+        logger.info(
+            f"⏳ Backfill {label}: {done}/{self.total} tranches, {self.rows} lignes "
+            f"({self.rows / elapsed if elapsed > 0 else 0:.0f} lignes/s), reste ~{eta_text}"
+        )
+
+    def report(self) -> dict:
+        elapsed = time.monotonic() - self.started_at
+        return {
+            'chunks_total': self.total,
+            'chunks_skipped': self.skipped,
+            'chunks_completed': self.completed,
+            'chunks_failed': self.failed,
+            'rows': self.rows,
+            'rows_per_second': round(self.rows / elapsed, 1) if elapsed > 0 else 0.0,
+            'execution_time': round(elapsed, 2)
+        }
+
+
+def format_duration(seconds: float) -> str:
+    """Durée lisible (1h05m, 3m20s, 12s)"""
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{secs:02d}s"
+    return f"{secs}s"
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmarks hors ligne - Débit, mémoire et durée par étape
+Le pipeline multi-sources et le scraper INSEE tournent contre les sources
+simulées (mock_sources) ; les mesures sont comparées à une référence
+enregistrée et toute régression fait échouer la commande.
+
+Les débits sont ramenés à la vitesse de la machine au moment de la mesure
+(travail fixe chronométré juste avant chaque étape), et une référence n'est
+comparée que sur la machine qui l'a enregistrée (modèle et nombre de CPU).
+Seule une exécution d'au moins MIN_GATED_REPEAT mesures échoue sur une
+régression ; en deçà, les écarts sont signalés sans bloquer. Réenregistrer la
+référence après un changement de machine ou une évolution de performance
+voulue :
+
+    python scripts/benchmark.py --save-baseline
+"""
+
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import requests
+
+from metrics import PSUTIL_AVAILABLE, PeakRSS
+from mock_sources import MockConfig, MockSourceServer, mock_environment
+
+logger = logging.getLogger('benchmark')
+
+STAGES = ('fetch_parse', 'validate', 'archive', 'write', 'insee')
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+# Hausse de mémoire tolérée en plus du pourcentage (bruit de l'allocateur sur les petites étapes)
+MEMORY_SLACK_MB = 16.0
+
+# Répétitions du travail de référence (médiane retenue)
+REFERENCE_ROUNDS = 5
+
+# Mesures complètes nécessaires pour bloquer sur une régression ou enregistrer une
+# référence : une mesure isolée varie de plus de 25 % (archive sur disque partagé)
+MIN_GATED_REPEAT = 3
+
+# Paramètres de configuration qui rendent deux mesures comparables
+COMPARABLE_CONFIG = ('series', 'first_year', 'last_year', 'latency', 'rate_429', 'rate_5xx', 'missing_rate', 'seed')
+
+
+@dataclass
+class StageResult:
+    """Mesures d'une étape"""
+    name: str
+    rows: int = 0
+    seconds: float = 0.0
+    bytes: int = 0
+    errors: int = 0
+    peak_rss_mb: float = 0.0
+    rss_delta_mb: float = 0.0
+    reference_seconds: float = 0.0  # durée du travail de référence juste avant l'étape
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def normalized_rate(self) -> float:
+        """Lignes traitées pendant la durée d'un travail de référence (indépendant de la vitesse de la machine)"""
+        return self.rows_per_second * self.reference_seconds
+
+    def to_dict(self) -> Dict:
+        return {
+            **asdict(self),
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'mb_per_second': round(self.bytes / 1024 / 1024 / self.seconds, 2) if self.seconds > 0 else 0.0,
+            'peak_rss_mb': round(self.peak_rss_mb, 1),
+            'rss_delta_mb': round(self.rss_delta_mb, 1),
+            'reference_seconds': round(self.reference_seconds, 5),
+            'normalized_rate': round(self.normalized_rate, 1)
+        }
+
+
+def reference_workload() -> float:
+    """
+    Durée médiane d'un travail fixe proche des étapes mesurées (JSON,
+    dictionnaires, tri numpy) : vitesse de la machine au moment de la mesure
+    """
+    values = np.random.default_rng(0).random(200_000)
+    records = [
+        {'series_id': f"s{i % 500}", 'period': f"{2000 + i % 25}-{i % 12 + 1:02d}", 'value': value}
+        for i, value in enumerate(values[:20_000].tolist())
+    ]
+
+    timings = []
+    for _ in range(REFERENCE_ROUNDS):
+        started = time.perf_counter()
+        json.loads(json.dumps(records))
+        {record['series_id'] + record['period']: record['value'] for record in records}
+        np.sort(values)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def host_fingerprint() -> Dict[str, object]:
+    """Machine de mesure : une référence n'est comparable que sur la même"""
+    cpu = platform.processor()
+    try:
+        with open('/proc/cpuinfo', 'r', encoding='utf-8') as f:
+            cpu = next((line.split(':', 1)[1].strip() for line in f if line.startswith('model name')), cpu)
+    except OSError:
+        pass
+    return {'cpu': cpu or platform.machine(), 'cpus': os.cpu_count(), 'system': platform.system()}
+
+
+class StageTimer:
+    """Durée et pic mémoire d'une étape ; rows, bytes et errors renseignés par l'appelant"""
+
+    def __init__(self, results: Dict[str, StageResult], name: str):
+        self.result = results.setdefault(name, StageResult(name))
+        self._memory = PeakRSS()
+
+    def __enter__(self) -> StageResult:
+        self.result.reference_seconds = reference_workload()
+        self._memory.__enter__()
+        self._started = time.perf_counter()
+        return self.result
+
+    def __exit__(self, *exc):
+        self.result.seconds = time.perf_counter() - self._started
+        self._memory.__exit__(*exc)
+        self.result.peak_rss_mb = self._memory.peak_mb
+        self.result.rss_delta_mb = self._memory.delta_mb
+
+
+def served_bytes(base_url: str, prefix: str = '') -> int:
+    """Octets servis par le serveur simulé (toutes sources, ou une seule)"""
+    stats = requests.get(f"{base_url}/mock/stats", timeout=10).json()
+    return sum(value for key, value in stats.items() if key.startswith(prefix) and key.endswith('_bytes'))
+
+
+async def run_pipeline_stages(base_url: str, stages: List[str], results: Dict[str, StageResult]):
+    """Étapes du pipeline multi-sources, jeu de données par jeu de données comme en production"""
+    from advanced_data_pipeline import DATASETS, AdvancedDataPipeline
+
+    pipeline = AdvancedDataPipeline()
+    datasets = [(source, dataset) for source, names in DATASETS.items() for dataset in names]
+
+    pipeline.parse_executor.start()
+    async with pipeline.http_session(), pipeline.rest_writer.session():
+        bytes_before = served_bytes(base_url)
+        with StageTimer(results, 'fetch_parse') as stage:
+            fetched = await asyncio.gather(
+                *(pipeline.fetch_dataset(source, dataset) for source, dataset in datasets),
+                return_exceptions=True
+            )
+            batches = [batch for batch in fetched if not isinstance(batch, BaseException)]
+            stage.errors = len(fetched) - len(batches)
+            stage.rows = sum(len(batch) for batch in batches)
+        stage.bytes = served_bytes(base_url) - bytes_before
+
+        if 'validate' in stages or 'archive' in stages or 'write' in stages:
+            with StageTimer(results, 'validate') as stage:
+                cleaned = [pipeline.validate_and_clean_data(batch)[0] for batch in batches]
+                stage.rows = sum(len(batch) for batch in batches)
+            del batches
+
+            if 'archive' in stages:
+                with StageTimer(results, 'archive') as stage:
+                    stage.rows = sum(pipeline.archive.append(batch) for batch in cleaned)
+
+            if 'write' in stages:
+                with StageTimer(results, 'write') as stage:
+                    for batch in cleaned:
+                        stats = await pipeline.save_observations(batch)
+                        stage.rows += stats.get('rest_written', 0)
+                        stage.errors += stats.get('rest_failed', 0)
+
+
+def run_insee_stage(base_url: str, series: int, results: Dict[str, StageResult]):
+    """Premier chargement complet de séries INSEE synthétiques (requêtes groupées, diff, upserts REST)"""
+    from insee_scraper import EconomicIndicator, INSEEScraper
+
+    scraper = INSEEScraper(concurrency=4, requests_per_minute=100000)
+    scraper.indicators = [
+        EconomicIndicator(
+            id=f"mock_{i:03d}",
+            name=f"Série simulée {i}",
+            series_id=f"{i:09d}",
+            category='MOCK',
+            unit='Index',
+            frequency='MONTHLY'
+        )
+        for i in range(series)
+    ]
+
+    bytes_before = served_bytes(base_url, 'insee')
+    with StageTimer(results, 'insee') as stage:
+        report = scraper.run_incremental_scraping()
+        stage.rows = report['total_saved']
+        stage.errors = report['errors']
+    stage.bytes = served_bytes(base_url, 'insee') - bytes_before
+
+
+def run_worker(base_url: str, stages: List[str], series: int) -> Dict[str, StageResult]:
+    """
+    Une mesure complète, dans un processus neuf (la mémoire libérée par une
+    mesure précédente fausserait les pics) et un répertoire de travail vierge
+    (caches, journaux et états neufs)
+    """
+    results: Dict[str, StageResult] = {}
+    requests.post(f"{base_url}/mock/reset", timeout=10).raise_for_status()
+
+    workdir = tempfile.mkdtemp(prefix='benchmark-')
+    os.chdir(workdir)
+    os.environ.update(mock_environment(base_url))
+    # Jeux complets, sans filtres serveur : volume proportionnel à --series
+    os.environ.update(REDIS_ENABLED='0', DATASET_FILTERS='0', ARCHIVE_DIR=os.path.join(workdir, 'archive'))
+    os.environ.pop('DATABASE_URL', None)  # jamais de chargement vers une vraie base
+
+    if any(stage in stages for stage in STAGES[:4]):
+        asyncio.run(run_pipeline_stages(base_url, stages, results))
+    if 'insee' in stages:
+        run_insee_stage(base_url, series, results)
+
+    return {name: results[name] for name in STAGES if name in results and name in stages}
+
+
+def measure(base_url: str, args) -> Dict[str, StageResult]:
+    """Lancer une mesure dans un sous-processus et relire ses résultats"""
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        output = f.name
+    try:
+        command = [
+            sys.executable, os.path.abspath(__file__),
+            '--worker', base_url, '--worker-output', output,
+            '--stages', args.stages, '--series', str(args.series)
+        ]
+        if args.verbose:
+            command.append('--verbose')
+        completed = subprocess.run(command, stdout=None if args.verbose else subprocess.DEVNULL)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Mesure interrompue (code {completed.returncode})")
+
+        with open(output, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return {name: StageResult(**values) for name, values in data.items()}
+    finally:
+        os.remove(output)
+
+
+def best_of(runs: List[Dict[str, StageResult]]) -> Dict[str, StageResult]:
+    """Par étape, la mesure la plus rapide (la moins perturbée par la machine)"""
+    return {
+        name: max((run[name] for run in runs if name in run), key=lambda result: result.normalized_rate)
+        for name in runs[0]
+    }
+
+
+def expected_rate(result: StageResult, reference: Dict) -> float:
+    """Débit de la référence ramené à la vitesse de la machine pendant cette mesure"""
+    return reference['normalized_rate'] / result.reference_seconds if result.reference_seconds > 0 else 0.0
+
+
+def compare(results: Dict[str, StageResult], baseline: Dict, tolerance: float) -> List[str]:
+    """Régressions par rapport à la référence : débit (normalisé) plus bas ou mémoire plus haute au-delà de la tolérance"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get('stages', {}).get(name)
+        if not reference:
+            continue
+
+        floor = reference['normalized_rate'] * (1 - tolerance)
+        if result.normalized_rate < floor:
+            expected = expected_rate(result, reference)
+            regressions.append(
+                f"{name}: {result.rows_per_second:.0f} lignes/s, référence ajustée à la machine {expected:.0f} "
+                f"(plancher {expected * (1 - tolerance):.0f})"
+            )
+
+        ceiling = reference['rss_delta_mb'] * (1 + tolerance) + MEMORY_SLACK_MB
+        if result.rss_delta_mb > ceiling:
+            regressions.append(
+                f"{name}: +{result.rss_delta_mb:.1f} Mo de mémoire, référence +{reference['rss_delta_mb']:.1f} Mo "
+                f"(plafond {ceiling:.1f})"
+            )
+
+        if result.errors > reference.get('errors', 0):
+            regressions.append(f"{name}: {result.errors} erreurs, référence {reference.get('errors', 0)}")
+    return regressions
+
+
+def print_report(results: Dict[str, StageResult], baseline: Optional[Dict]):
+    print(f"{'étape':<12} {'lignes':>9} {'durée':>8} {'lignes/s':>10} {'Mo/s':>7} {'pic RSS':>9} {'+RSS':>8} {'réf. lignes/s':>14}")
+    for name, result in results.items():
+        data = result.to_dict()
+        reference = (baseline or {}).get('stages', {}).get(name)
+        expected = f"{expected_rate(result, reference):.0f}" if reference else '-'
+        print(
+            f"{name:<12} {result.rows:>9} {result.seconds:>7.2f}s {result.rows_per_second:>10.0f} "
+            f"{data['mb_per_second']:>7.2f} {result.peak_rss_mb:>7.0f}Mo {result.rss_delta_mb:>6.1f}Mo "
+            f"{expected:>14}"
+        )
+
+
+def main():
+    """Point d'entrée : mesure, comparaison à la référence, enregistrement éventuel"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmarks hors ligne du pipeline et du scraper INSEE')
+    parser.add_argument('--stages', default=','.join(STAGES), help=f"Étapes mesurées parmi {','.join(STAGES)}")
+    parser.add_argument('--series', type=int, default=50, help='Séries par jeu de données simulé')
+    parser.add_argument('--first-year', type=int, default=1960)
+    parser.add_argument('--last-year', type=int, default=2024)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Latence simulée par réponse')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='Part des requêtes refusées en 429')
+    parser.add_argument('--rate-5xx', type=float, default=0.0, help='Part des requêtes en erreur serveur')
+    parser.add_argument('--fixtures', default=None, help='Réponses enregistrées servies à la place des synthétiques')
+    parser.add_argument('--repeat', type=int, default=MIN_GATED_REPEAT,
+                        help=f'Mesures complètes, la meilleure est retenue (moins de {MIN_GATED_REPEAT} : écarts non bloquants)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Fichier de référence')
+    parser.add_argument('--save-baseline', action='store_true', help='Enregistrer ces mesures comme référence (pour cette machine)')
+    parser.add_argument('--tolerance', type=float, default=float(os.getenv('BENCHMARK_TOLERANCE', 0.25)),
+                        help='Écart toléré avant de signaler une régression (0.25 = 25%%)')
+    parser.add_argument('--output', default=None, help='Écrire les mesures en JSON')
+    parser.add_argument('--verbose', action='store_true', help='Journaux détaillés du pipeline')
+    parser.add_argument('--worker', metavar='URL', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--worker-output', default=None, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    logger.setLevel(logging.INFO)
+    if not logging.getLogger().handlers:
+        logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.save_baseline and args.repeat < MIN_GATED_REPEAT:
+        parser.error(f"--save-baseline demande au moins --repeat {MIN_GATED_REPEAT}")
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"étapes inconnues: {', '.join(sorted(unknown))}")
+
+    if args.worker:
+        results = run_worker(args.worker, stages, args.series)
+        with open(args.worker_output, 'w', encoding='utf-8') as f:
+            json.dump({name: asdict(result) for name, result in results.items()}, f)
+        return
+    if not PSUTIL_AVAILABLE:
+        logger.warning("⚠️ psutil non installé : mémoire mesurée par le pic du processus, deltas non significatifs")
+
+    config = MockConfig(
+        series=args.series,
+        first_year=args.first_year,
+        last_year=args.last_year,
+        latency=args.latency_ms / 1000,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        fixtures_dir=args.fixtures
+    )
+
+    # Un serveur pour toutes les mesures ; la première, non comptée, génère les corps de réponse
+    repeat = max(1, args.repeat)
+    server = MockSourceServer(config)
+    base_url = server.start_background()
+    runs = []
+    try:
+        for i in range(repeat + 1):
+            logger.info(f"⏱️ Mesure {i}/{repeat}" if i else "⏱️ Échauffement")
+            runs.append(measure(base_url, args))
+    finally:
+        server.stop_background()
+    results = best_of(runs[1:])
+
+    baseline = None
+    comparable = {key: getattr(config, key) for key in COMPARABLE_CONFIG}
+    host = host_fingerprint()
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('config') != comparable:
+            logger.warning(f"⚠️ Référence mesurée avec une autre configuration ({baseline.get('config')}), comparaison ignorée")
+            baseline = None
+        elif baseline.get('host') != host:
+            # Débits absolus et normalisés propres au processeur : pas de comparaison d'une machine à l'autre
+            logger.warning(
+                f"⚠️ Référence enregistrée sur une autre machine ({baseline.get('host')}), comparaison ignorée ; "
+                f"réenregistrer avec --save-baseline sur cette machine"
+            )
+            baseline = None
+
+    print_report(results, baseline)
+    document = {
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'host': host,
+        'config': comparable,
+        'stages': {name: result.to_dict() for name, result in results.items()}
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+        logger.info(f"💾 Référence enregistrée: {args.baseline}")
+        return
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions and repeat < MIN_GATED_REPEAT:
+            # Meilleure de moins de MIN_GATED_REPEAT mesures : trop bruitée pour bloquer
+            print(f"⚠️ Écarts sur {repeat} mesure(s), non bloquants (--repeat {MIN_GATED_REPEAT} pour le contrôle):")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return
+        if regressions:
+            print("❌ Régressions détectées:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print(f"✅ Aucune régression (tolérance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
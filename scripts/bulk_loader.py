@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+🚚 Chargement massif - COPY PostgreSQL + fusion ensembliste
+Les gros volumes passent par une table de staging UNLOGGED alimentée par
+COPY, puis par un unique INSERT ... ON CONFLICT vers economic_data ; les
+petites exécutions incrémentales restent sur l'API REST Supabase
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+from change_detection import FINGERPRINT_FIELDS, KEY_FIELDS
+from observations import ObservationBatch, combinations, period_start_values
+from periods import PERIOD_CODEC, period_keys
+
+try:
+    import psycopg2  # noqa: F401 - pilote utilisé par SQLAlchemy pour COPY
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Colonnes écrites, dans l'ordre du flux CSV : clés, date et valeur propres à
+# chaque ligne, puis les colonnes constantes par série (texte construit une
+# seule fois par combinaison distincte)
+LOAD_COLUMNS = KEY_FIELDS + (
+    'date', 'value', 'indicator', 'source', 'unit',
+    'frequency', 'geography', 'category', 'metadata'
+)
+SERIES_COLUMNS = ('indicator', 'source', 'unit', 'frequency', 'geography', 'category')
+
+# Taille des blocs envoyés au serveur pendant COPY
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class CSVStream:
+    """Objet fichier minimal (read) alimenté par un itérateur de morceaux CSV"""
+
+    def __init__(self, chunks: Iterator[str]):
+        self._chunks = chunks
+        self._buffer = ''
+        self._offset = 0
+
+    def read(self, size: int = -1) -> str:
+        # Le morceau courant est consommé par décalage, sans recopie à chaque lecture
+        while self._offset >= len(self._buffer):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return ''
+            self._buffer, self._offset = chunk, 0
+
+        end = len(self._buffer) if size < 0 else self._offset + size
+        data = self._buffer[self._offset:end]
+        self._offset += len(data)
+        return data
+
+
+def _escape(value) -> str:
+    """Texte d'un champ CSV sans les guillemets englobants"""
+    return str(value).replace('"', '""')
+
+
+def _quoted_categories(column: pd.Categorical) -> np.ndarray:
+    """Champs CSV des catégories (entre guillemets), suivis du NULL (vide) pour le code -1"""
+    return np.array([f'"{_escape(value)}"' for value in column.categories.tolist()] + [''], dtype=object)
+
+
+def iter_csv(batch: ObservationBatch, series_keys: np.ndarray, chunk_size: int = 100000) -> Iterator[str]:
+    """Lot d'observations en CSV (format COPY), tranche par tranche, sans passer par des dictionnaires"""
+    date_categories = batch.columns['date'].categories.tolist()
+    # Colonne DATE : premier jour ISO de la période (2024-Q1 -> 2024-01-01), texte brut refusé par COPY
+    date_text = np.array(['' if value is None else value for value in period_start_values(batch.columns['date'])], dtype=object)
+    # Clés en texte une seule fois par série et par date distinctes
+    series_key_text = np.array([str(key) for key in np.asarray(series_keys).tolist()] + [''], dtype=object)
+    period_key_text = np.array(
+        [str(key) for key in period_keys(*PERIOD_CODEC.encode_values(date_categories)).tolist()] + [''], dtype=object
+    )
+    quoted = {name: _quoted_categories(batch.columns[name]) for name in SERIES_COLUMNS}
+
+    for start in range(0, len(batch), chunk_size):
+        stop = start + chunk_size
+        series_codes = [batch.columns[name].codes[start:stop] for name in SERIES_COLUMNS]
+
+        # Fin de ligne (colonnes de série + métadonnées JSON) une fois par combinaison distincte
+        metadata_index, documents = batch.metadata_documents(start, stop)
+        tail_index, first_rows = combinations(series_codes + [metadata_index])
+        tails = np.array([
+            ','.join(quoted[name][codes[row]] for name, codes in zip(SERIES_COLUMNS, series_codes))
+            + ',"' + _escape(json.dumps(documents[metadata_index[row]], separators=(',', ':'), default=str)) + '"'
+            for row in first_rows
+        ], dtype=object)
+
+        date_codes = batch.columns['date'].codes[start:stop]
+        dates = date_text[date_codes]
+        values = np.array([repr(value) for value in batch.values[start:stop].tolist()], dtype=object)
+        lines = (
+            series_key_text[batch.series_ids.codes[start:stop]] + ',' + period_key_text[date_codes] + ',"'
+            + dates + '",' + values + ',' + tails[tail_index]
+        )
+        yield '\n'.join(lines.tolist()) + '\n'
+
+
+class PostgresBulkLoader:
+    """COPY vers une table de staging UNLOGGED puis fusion INSERT ... ON CONFLICT"""
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        table: str = 'economic_data',
+        min_rows: Optional[int] = None,
+        chunk_size: int = 100000
+    ):
+        self.dsn = dsn or os.getenv('DATABASE_URL')
+        self.table = table
+        self.staging_table = f"{table}_staging"
+        self.min_rows = int(min_rows if min_rows is not None else os.getenv('BULK_LOAD_MIN_ROWS', 50000))
+        self.chunk_size = chunk_size
+        self._engine = None
+
+    @property
+    def available(self) -> bool:
+        """Connexion directe à Postgres configurée et pilote installé"""
+        return bool(self.dsn) and PSYCOPG2_AVAILABLE
+
+    def should_use(self, row_count: int) -> bool:
+        """Seuil automatique : COPY au-delà de min_rows lignes, REST en deçà"""
+        return self.available and row_count >= self.min_rows
+
+    def _get_engine(self):
+        if self._engine is None:
+            # COPY passe par l'API psycopg2 (copy_expert), quel que soit le schéma de l'URL
+            url = make_url(self.dsn).set(drivername='postgresql+psycopg2')
+            self._engine = create_engine(url, pool_pre_ping=True)
+        return self._engine
+
+    def _merge_sql(self) -> str:
+        """Fusion ensembliste : seules les lignes nouvelles ou révisées sont écrites"""
+        columns = ', '.join(LOAD_COLUMNS)
+        updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in LOAD_COLUMNS if column not in KEY_FIELDS)
+        current = ', '.join(f"{self.table}.{column}" for column in FINGERPRINT_FIELDS)
+        incoming = ', '.join(f"EXCLUDED.{column}" for column in FINGERPRINT_FIELDS)
+
+        return f"""
+            WITH merged AS (
+                INSERT INTO {self.table} ({columns})
+                SELECT {columns} FROM {self.staging_table}
+                ON CONFLICT ({', '.join(KEY_FIELDS)}) DO UPDATE SET {updates}
+                WHERE ({current}) IS DISTINCT FROM ({incoming})
+                RETURNING (xmax = 0) AS inserted
+            )
+            SELECT
+                COUNT(*) FILTER (WHERE inserted),
+                COUNT(*) FILTER (WHERE NOT inserted)
+            FROM merged
+        """
+
+    def load(self, batch: ObservationBatch, series_keys: np.ndarray) -> Dict[str, int]:
+        """
+        Charger un lot en une transaction ; series_keys aligné sur les
+        catégories de batch.series_ids (SeriesRegistry.keys_for).
+        Retourne inserted / revised / unchanged
+        """
+        started = time.monotonic()
+
+        # value est NOT NULL : une seule valeur non finie ferait échouer tout le COPY
+        finite = np.isfinite(batch.values)
+        if not finite.all():
+            logger.warning(f"⚠️ {int((~finite).sum())} valeurs non finies écartées du chargement")
+            batch = batch.take(finite)
+
+        connection = self._get_engine().raw_connection()
+
+        try:
+            cursor = connection.cursor()
+            try:
+                # Données rejouables depuis la source : pas d'attente du flush WAL
+                cursor.execute("SET LOCAL synchronous_commit = off")
+                cursor.execute(
+                    f"CREATE UNLOGGED TABLE IF NOT EXISTS {self.staging_table} "
+                    f"(LIKE {self.table} INCLUDING DEFAULTS)"
+                )
+                # TRUNCATE verrouille la staging jusqu'au commit : deux chargements ne se mélangent pas
+                cursor.execute(f"TRUNCATE {self.staging_table}")
+                cursor.copy_expert(
+                    f"COPY {self.staging_table} ({', '.join(LOAD_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                    CSVStream(iter_csv(batch, series_keys, self.chunk_size)),
+                    size=COPY_BUFFER_SIZE
+                )
+                copied_at = time.monotonic()
+
+                cursor.execute(self._merge_sql())
+                inserted, revised = cursor.fetchone()
+                cursor.execute(f"TRUNCATE {self.staging_table}")
+            finally:
+                cursor.close()
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+        stats = {
+            'inserted': inserted,
+            'revised': revised,
+            'unchanged': len(batch) - inserted - revised
+        }
+        logger.info(
+            f"🚚 COPY {len(batch)} lignes en {copied_at - started:.1f}s, "
+            f"fusion en {time.monotonic() - copied_at:.1f}s: {stats}"
+        )
+        return stats
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+📦 Cache à deux niveaux - LRU en mémoire + Redis compressé
+Stale-while-revalidate : la dernière valeur connue est servie pendant
+qu'un unique rafraîchissement tourne en arrière-plan
+"""
+
+import asyncio
+import json
+import logging
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = 'cache:v4:'
+
+# Au-delà de cette taille compressée, le décodage quitte la boucle (zlib libère le GIL)
+OFFLOAD_MIN_BYTES = 64 * 1024
+
+
+def encode_entry(value: Any, stored_at: float) -> bytes:
+    """Sérialisation compacte (JSON sans espaces) compressée zlib"""
+    payload = json.dumps({'t': stored_at, 'v': value}, separators=(',', ':'), default=str)
+    return zlib.compress(payload.encode('utf-8'), 6)
+
+
+def decode_entry(blob: bytes) -> Tuple[Any, float]:
+    """Inverse de encode_entry, retourne (valeur, horodatage de stockage)"""
+    entry = json.loads(zlib.decompress(blob))
+    return entry['v'], entry['t']
+
+
+class LRUBytesCache:
+    """LRU en mémoire borné par la taille totale des entrées encodées"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: 'OrderedDict[str, bytes]' = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        blob = self._entries.get(key)
+        if blob is not None:
+            self._entries.move_to_end(key)
+        return blob
+
+    def set(self, key: str, blob: bytes):
+        if len(blob) > self.max_bytes:
+            return
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.current_bytes -= len(previous)
+
+        self._entries[key] = blob
+        self.current_bytes += len(blob)
+
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= len(evicted)
+            self.evictions += 1
+
+
+class TwoTierCache:
+    """Cache LRU local + Redis (redis.asyncio, optionnel) avec stale-while-revalidate"""
+
+    def __init__(self, redis_client=None, max_memory_bytes: int = 64 * 1024 * 1024, stale_factor: float = 1.0):
+        self.redis = redis_client
+        self.memory = LRUBytesCache(max_memory_bytes)
+        self.stale_factor = stale_factor  # fenêtre stale = ttl * stale_factor
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._background: set = set()
+        self.stats = {
+            'memory_hits': 0,
+            'redis_hits': 0,
+            'misses': 0,
+            'stale_served': 0,
+            'refreshes': 0,
+            'errors': 0
+        }
+
+    async def _read(self, key: str) -> Optional[bytes]:
+        """Lecture mémoire puis Redis (la valeur Redis est remontée en mémoire)"""
+        blob = self.memory.get(key)
+        if blob is not None:
+            self.stats['memory_hits'] += 1
+            return blob
+
+        if self.redis is not None:
+            try:
+                blob = await self.redis.get(CACHE_KEY_PREFIX + key)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.warning(f"⚠️ Lecture cache Redis impossible ({key}): {e}")
+                blob = None
+
+            if blob is not None:
+                self.stats['redis_hits'] += 1
+                self.memory.set(key, blob)
+                return blob
+
+        return None
+
+    async def _write(self, key: str, value: Any, ttl: int):
+        """Écriture dans les deux niveaux ; Redis expire après ttl + fenêtre stale"""
+        blob = await asyncio.to_thread(encode_entry, value, time.time())
+        self.memory.set(key, blob)
+
+        if self.redis is not None:
+            try:
+                await self.redis.set(CACHE_KEY_PREFIX + key, blob, ex=int(ttl * (1 + self.stale_factor)))
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.warning(f"⚠️ Écriture cache Redis impossible ({key}): {e}")
+
+    async def _refresh(self, key: str, fetch: Callable[[], Awaitable[Any]], ttl: int, cache_empty: bool) -> Any:
+        """Un seul appel à fetch par clé à la fois (single-flight)"""
+        task = self._inflight.get(key)
+        if task is None:
+            async def run():
+                try:
+                    value = await fetch()
+                    if value or cache_empty:
+                        await self._write(key, value, ttl)
+                    return value
+                finally:
+                    self._inflight.pop(key, None)
+
+            task = asyncio.ensure_future(run())
+            self._inflight[key] = task
+            self.stats['refreshes'] += 1
+
+        return await asyncio.shield(task)
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: int,
+        cache_empty: bool = False
+    ) -> Any:
+        """Valeur fraîche en cache, valeur périmée + rafraîchissement en fond, ou fetch"""
+        blob = await self._read(key)
+
+        if blob is not None:
+            try:
+                if len(blob) >= OFFLOAD_MIN_BYTES:
+                    value, stored_at = await asyncio.to_thread(decode_entry, blob)
+                else:
+                    value, stored_at = decode_entry(blob)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.warning(f"⚠️ Entrée de cache illisible ({key}): {e}")
+            else:
+                age = time.time() - stored_at
+                if age < ttl:
+                    logger.info(f"📦 Cache hit pour {key}")
+                    return value
+
+                if age < ttl * (1 + self.stale_factor):
+                    self.stats['stale_served'] += 1
+                    logger.info(f"📦 Cache périmé servi pour {key}, rafraîchissement en arrière-plan")
+                    if key not in self._inflight:
+                        task = asyncio.ensure_future(self._refresh(key, fetch, ttl, cache_empty))
+                        self._background.add(task)
+                        task.add_done_callback(self._on_background_done)
+                    return value
+
+        self.stats['misses'] += 1
+        return await self._refresh(key, fetch, ttl, cache_empty)
+
+    def _on_background_done(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.stats['errors'] += 1
+            logger.error(f"Erreur rafraîchissement cache: {task.exception()}")
+
+    async def drain(self):
+        """Attendre la fin des rafraîchissements en arrière-plan"""
+        if self._background:
+            await asyncio.gather(*list(self._background), return_exceptions=True)
+
+    def report(self) -> Dict[str, Any]:
+        """Compteurs et taux de succès"""
+        hits = self.stats['memory_hits'] + self.stats['redis_hits']
+        lookups = hits + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_ratio': round(hits / lookups, 3) if lookups else 0.0,
+            'memory_bytes': self.memory.current_bytes,
+            'memory_evictions': self.memory.evictions
+        }
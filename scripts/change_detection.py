@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+🔍 Détection des changements - Upserts limités aux lignes nouvelles ou révisées
+Empreinte de contenu par clé (series_key, period_key), mise en cache
+localement et amorcée depuis Supabase
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+from pipeline_state import JSONStateFile
+
+logger = logging.getLogger(__name__)
+
+# Colonnes dont la modification constitue une révision
+FINGERPRINT_FIELDS = ('value', 'unit', 'frequency', 'geography', 'category')
+
+# Clé d'une observation dans economic_data
+KEY_FIELDS = ('series_key', 'period_key')
+
+
+def row_key(row: Dict) -> str:
+    """Clé texte d'une ligne pour le cache d'empreintes ({series_key}:{period_key})"""
+    return f"{row['series_key']}:{row['period_key']}"
+
+
+def fingerprint(row: Dict) -> str:
+    """Empreinte stable du contenu d'une observation"""
+    value = row.get('value')
+    content = [round(float(value), 4) if value is not None else None]
+    content.extend(row.get(field) for field in FINGERPRINT_FIELDS[1:])
+    payload = json.dumps(content, separators=(',', ':'), default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class ChangeDetector:
+    """Filtre les observations inchangées avant upsert dans economic_data"""
+
+    def __init__(self, supabase, cache_path: str = None, table: str = 'economic_data', lookup_chunk: int = 1000):
+        self.supabase = supabase
+        self.table = table
+        self.lookup_chunk = lookup_chunk
+        self.cache = JSONStateFile(
+            cache_path or os.getenv('CHANGE_CACHE_FILE', 'economic_data_hashes.json'),
+            compact=True
+        )
+        self.stats = {'inserted': 0, 'revised': 0, 'unchanged': 0}
+        self._lock = threading.Lock()
+
+        # Cache antérieur aux clés entières (ids texte) : plus aucune ligne ne s'y retrouverait
+        if self.cache.state and ':' not in next(iter(self.cache.state)):
+            self.cache.state.clear()
+
+    def reset_stats(self):
+        """Remettre les compteurs à zéro en début d'exécution"""
+        with self._lock:
+            self.stats = {'inserted': 0, 'revised': 0, 'unchanged': 0}
+
+    def _load_stored_hashes(self, keys: List[Tuple[int, int]]) -> Dict[str, str]:
+        """
+        Empreintes des lignes déjà en base pour les clés absentes du cache,
+        lues série par série : jusqu'à lookup_chunk périodes par requête
+        (URL courte avec des clés entières, et plafond de lignes par défaut de Supabase)
+        """
+        stored = {}
+        columns = ','.join(KEY_FIELDS + FINGERPRINT_FIELDS)
+
+        periods_by_series = {}
+        for series_key, period_key in keys:
+            periods_by_series.setdefault(series_key, []).append(period_key)
+
+        try:
+            for series_key, periods in periods_by_series.items():
+                for i in range(0, len(periods), self.lookup_chunk):
+                    response = (
+                        self.supabase.table(self.table).select(columns)
+                        .eq('series_key', series_key)
+                        .in_('period_key', periods[i:i + self.lookup_chunk])
+                        .execute()
+                    )
+                    for row in response.data or []:
+                        stored[row_key(row)] = fingerprint(row)
+        except Exception as e:
+            # Sans référence, les lignes seront considérées comme nouvelles
+            logger.warning(f"⚠️ Lecture des empreintes impossible: {e}")
+
+        return stored
+
+    def diff(self, rows: List[Dict]) -> List[Dict]:
+        """Retourne uniquement les lignes nouvelles ou révisées"""
+        if not rows:
+            return []
+
+        keys = [row_key(row) for row in rows]
+        with self._lock:
+            known = self.cache.state
+            unknown = list({
+                key: (row['series_key'], row['period_key'])
+                for key, row in zip(keys, rows)
+                if key not in known
+            }.values())
+
+        stored = self._load_stored_hashes(unknown) if unknown else {}
+
+        changed = []
+        counts = {'inserted': 0, 'revised': 0, 'unchanged': 0}
+
+        with self._lock:
+            for key, row in zip(keys, rows):
+                previous = self.cache.state.get(key) or stored.get(key)
+                if previous is None:
+                    counts['inserted'] += 1
+                    changed.append(row)
+                elif previous != fingerprint(row):
+                    counts['revised'] += 1
+                    changed.append(row)
+                else:
+                    counts['unchanged'] += 1
+                    self.cache.state[key] = previous
+
+            for key, count in counts.items():
+                self.stats[key] += count
+
+        logger.info(
+            f"🔍 Diff: {counts['inserted']} nouvelles, {counts['revised']} révisées, "
+            f"{counts['unchanged']} inchangées"
+        )
+        return changed
+
+    def commit(self, rows: Iterable[Dict]):
+        """Enregistrer les empreintes des lignes effectivement écrites"""
+        with self._lock:
+            for row in rows:
+                self.cache.state[row_key(row)] = fingerprint(row)
+
+    def forget(self):
+        """Vider le cache (lignes écrites hors de ce détecteur, ex. chargement COPY)"""
+        with self._lock:
+            self.cache.state.clear()
+
+    def save(self):
+        """Persister le cache d'empreintes"""
+        try:
+            self.cache.save()
+        except OSError as e:
+            logger.warning(f"⚠️ Cache d'empreintes non sauvegardé: {e}")
+
+    def report(self) -> Dict[str, int]:
+        """Compteurs de l'exécution courante"""
+        with self._lock:
+            return dict(self.stats)
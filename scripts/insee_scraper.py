@@ -6,18 +6,32 @@ Récupération automatisée des données économiques françaises
 
 import os
 import sys
+import asyncio
+import contextvars
 import json
-import time
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import requests
-from dataclasses import dataclass
+import numpy as np
 import pandas as pd
 from supabase import create_client
-import schedule
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
+from rate_limiting import RateLimiter
+from pipeline_state import WatermarkStore
+from change_detection import ChangeDetector
+from series_registry import SeriesRegistry
+from series_catalogue import EconomicIndicator, SeriesCatalogue, parse_query
+from response_store import ResponseStore
+from rest_writer import RESTUpsertWriter
+from backfill import DEFAULT_START_YEAR, BackfillCheckpoint, BackfillProgress, year_chunks
+from scheduler import AsyncScheduler
+from metrics import TRACER, count_retries, instrumented_run, observe_http
+from periods import encode_periods, frequency_names, period_keys, period_start_dates
 
 # Configuration du logging
 logging.basicConfig(
@@ -30,22 +44,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@dataclass
-class EconomicIndicator:
-    """Modèle de données pour un indicateur économique"""
-    id: str
-    name: str
-    series_id: str
-    category: str
-    unit: str
-    frequency: str
-    geography: str = "France"
-
 class INSEEScraper:
     """Scraper principal pour les données INSEE"""
     
-    def __init__(self):
-        self.base_url = "https://api.insee.fr/series/BDM/V1"
+    def __init__(
+        self, 
+        concurrency: int = 1, 
+        requests_per_minute: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        overlap_periods: Optional[int] = None,
+        series_query: Optional[str] = None
+    ):
+        self.base_url = os.getenv('INSEE_BASE_URL', 'https://api.insee.fr/series/BDM/V1')
+        self.token_url = os.getenv('INSEE_TOKEN_URL', 'https://api.insee.fr/token')
         self.api_key = os.getenv('INSEE_API_KEY')
         self.client_id = os.getenv('INSEE_CLIENT_ID')
         self.client_secret = os.getenv('INSEE_CLIENT_SECRET')
@@ -59,75 +70,91 @@ class INSEEScraper:
             sys.exit(1)
             
         self.supabase = create_client(supabase_url, supabase_key)
+        self.change_detector = ChangeDetector(self.supabase)
+        self.series_registry = SeriesRegistry(self.supabase)
+        self.rest_writer = RESTUpsertWriter(supabase_url, supabase_key)
         self.access_token = None
         self.token_expires_at = None
+        self._auth_lock = threading.Lock()
+        
+        # Parallélisme et quota INSEE (requêtes par minute)
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = RateLimiter(
+            requests_per_minute or int(os.getenv('INSEE_RATE_LIMIT', 30))
+        )
+        
+        # Nombre d'idbanks regroupés par requête BDM
+        self.batch_size = max(1, batch_size or int(os.getenv('INSEE_BATCH_SIZE', 20)))
+        
+        # Watermarks par série pour le mode incrémental
+        self.watermarks = WatermarkStore(os.getenv('INSEE_STATE_FILE', 'insee_watermarks.json'))
+        self.overlap_periods = (
+            overlap_periods if overlap_periods is not None 
+            else int(os.getenv('INSEE_OVERLAP_PERIODS', 2))
+        )
+        
+        # Validateurs HTTP et réponses stockées (requêtes conditionnelles)
+        self.response_store = ResponseStore()
         
         # Configuration des sessions HTTP avec retry
         self.session = requests.Session()
         retry_strategy = Retry(
             total=3,
             status_forcelist=[429, 500, 502, 503, 504],
-            method_whitelist=["HEAD", "GET", "OPTIONS"],
+            allowed_methods=["HEAD", "GET", "OPTIONS"],
             backoff_factor=1
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        adapter = HTTPAdapter(
+            max_retries=retry_strategy,
+            pool_connections=self.concurrency,
+            pool_maxsize=self.concurrency
+        )
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
         
-        # Indicateurs à récupérer
-        self.indicators = [
-            EconomicIndicator(
-                id="gdp_quarterly",
-                name="PIB trimestriel en volume",
-                series_id="001656344",
-                category="GDP",
-                unit="Milliards €",
-                frequency="QUARTERLY"
-            ),
-            EconomicIndicator(
-                id="unemployment_rate",
-                name="Taux de chômage au sens du BIT",
-                series_id="001688527",
-                category="UNEMPLOYMENT",
-                unit="%",
-                frequency="QUARTERLY"
-            ),
-            EconomicIndicator(
-                id="inflation_ipc",
-                name="Indice des prix à la consommation",
-                series_id="001759972",
-                category="INFLATION",
-                unit="Indice",
-                frequency="MONTHLY"
-            ),
-            EconomicIndicator(
-                id="industrial_production",
-                name="Production industrielle",
-                series_id="010537510",
-                category="INDUSTRIAL_PRODUCTION",
-                unit="Indice",
-                frequency="MONTHLY"
-            ),
-            EconomicIndicator(
-                id="government_debt",
-                name="Dette publique",
-                series_id="001656434",
-                category="GOVERNMENT_DEBT",
-                unit="Milliards €",
-                frequency="QUARTERLY"
-            ),
-            EconomicIndicator(
-                id="consumer_confidence",
-                name="Indicateur de confiance des ménages",
-                series_id="010565692",
-                category="CONSUMER_CONFIDENCE",
-                unit="Solde d'opinion",
-                frequency="MONTHLY"
-            )
-        ]
+        # Séries suivies : sélectionnées dans le catalogue au premier accès
+        # (INSEE_SERIES_QUERY, ex. "category=INFLATION frequency=MONTHLY" ; vide : séries par défaut)
+        self.catalogue = SeriesCatalogue(base_url=self.base_url, workers=self.concurrency)
+        self.series_query = series_query if series_query is not None else os.getenv('INSEE_SERIES_QUERY')
+        self._indicators: Optional[List[EconomicIndicator]] = None
+
+    @property
+    def indicators(self) -> List[EconomicIndicator]:
+        """Séries suivies, résolues au premier accès (catalogue chargé, et rafraîchi si périmé, seulement sur requête)"""
+        if self._indicators is None:
+            if parse_query(self.series_query) is not None:
+                self.refresh_catalogue()
+            self._indicators = self.catalogue.query(self.series_query)
+            logger.info(f"📚 {len(self._indicators)} séries suivies")
+        return self._indicators
+
+    @indicators.setter
+    def indicators(self, indicators: List[EconomicIndicator]):
+        self._indicators = list(indicators)
+
+    def refresh_catalogue(self, force: bool = False) -> bool:
+        """Rafraîchir le catalogue depuis la BDM s'il est périmé ; en cas d'échec, la version locale est gardée"""
+        try:
+            return self.catalogue.refresh(self._catalogue_get, force=force)
+        except Exception as e:
+            logger.warning(f"⚠️ Rafraîchissement du catalogue impossible, version locale utilisée: {e}")
+            return False
+
+    def _catalogue_get(self, url: str, params: Dict[str, str], headers: Dict[str, str]) -> requests.Response:
+        """GET authentifié et soumis au quota pour le catalogue"""
+        if not self.authenticate():
+            raise RuntimeError("Authentification INSEE impossible")
+        full_url = requests.Request('GET', url, params=params).prepare().url
+        self.rate_limiter.acquire()
+        return self._get(full_url, {**self.get_headers(), **headers}, 60)
 
     def authenticate(self) -> bool:
         """Authentification OAuth2 avec l'API INSEE"""
+        with self._auth_lock:
+            return self._authenticate()
+
+    def _authenticate(self) -> bool:
+        """Rafraîchissement du token (appelé sous verrou)"""
         if self.access_token and self.token_expires_at:
             if datetime.now() < self.token_expires_at:
                 return True
@@ -136,7 +163,7 @@ class INSEEScraper:
             logger.error("Identifiants INSEE manquants")
             return False
 
-        auth_url = "https://api.insee.fr/token"
+        auth_url = self.token_url
         auth_data = {
             'grant_type': 'client_credentials'
         }
@@ -176,7 +203,50 @@ class INSEEScraper:
             
         return headers
 
-    def fetch_series_data(self, indicator: EconomicIndicator, start_date: str = None) -> List[Dict]:
+    def get_conditional(self, url: str, params: Dict, timeout: int, parse) -> object:
+        """GET conditionnel : parse(json) est stocké et réutilisé tel quel sur un 304"""
+        full_url = requests.Request('GET', url, params=params).prepare().url
+        headers = self.get_headers()
+        headers.update(self.response_store.conditional_headers(full_url))
+        
+        self.rate_limiter.acquire()
+        response = self._get(full_url, headers, timeout)
+        
+        if response.status_code == 304:
+            parsed = self.response_store.load_parsed(full_url)
+            if parsed is not None:
+                logger.info(f"♻️ Non modifié, réponse stockée réutilisée: {full_url}")
+                return parsed
+                
+            # Résultat stocké perdu : requête complète
+            self.rate_limiter.acquire()
+            response = self._get(full_url, self.get_headers(), timeout)
+            
+        response.raise_for_status()
+        self.response_store.record_body(full_url, response.headers, response.content)
+        
+        with TRACER.span('parse', bytes=len(response.content)):
+            parsed = parse(response.json())
+        self.response_store.save_parsed(full_url, parsed)
+        return parsed
+
+    def _get(self, url: str, headers: Dict[str, str], timeout: int) -> requests.Response:
+        """GET mesuré : latence, statut, octets reçus et nouveaux essais faits par urllib3"""
+        sent_at = time.perf_counter()
+        response = self.session.get(url, headers=headers, timeout=timeout)
+        observe_http('INSEE', response.status_code, time.perf_counter() - sent_at, len(response.content))
+        
+        history = getattr(getattr(response.raw, 'retries', None), 'history', ())
+        if history:
+            count_retries('INSEE', len(history), sum(1 for attempt in history if attempt.status == 429))
+        return response
+
+    def fetch_series_data(
+        self, 
+        indicator: EconomicIndicator, 
+        start_date: str = None,
+        updated_after: str = None
+    ) -> List[Dict]:
         """Récupération des données d'une série"""
         if not self.authenticate():
             logger.error(f"Impossible de récupérer {indicator.name}")
@@ -188,45 +258,22 @@ class INSEEScraper:
         
         if start_date:
             params['startPeriod'] = start_date
+        if updated_after:
+            params['updatedAfter'] = updated_after
             
         try:
-            response = self.session.get(
-                url,
-                headers=self.get_headers(),
-                params=params,
-                timeout=30
+            observations = self.get_conditional(
+                url, params, 30, lambda data: data.get('observations', [])
             )
-            response.raise_for_status()
-            
-            data = response.json()
-            observations = data.get('observations', [])
             
             if not observations:
-                logger.warning(f"Aucune donnée pour {indicator.name}")
+                if updated_after:
+                    logger.info(f"⏸️ Aucune nouvelle donnée pour {indicator.name}")
+                else:
+                    logger.warning(f"Aucune donnée pour {indicator.name}")
                 return []
 
-            # Transformation des données
-            processed_data = []
-            for obs in observations:
-                processed_data.append({
-                    'id': f"insee_{indicator.id}_{obs['period']}",
-                    'indicator': indicator.name,
-                    'value': float(obs['value']) if obs['value'] else None,
-                    'date': obs['period'],
-                    'source': 'INSEE',
-                    'unit': indicator.unit,
-                    'frequency': indicator.frequency,
-                    'geography': indicator.geography,
-                    'category': indicator.category,
-                    'sub_category': indicator.id,
-                    'quality_flag': obs.get('status', 'NORMAL'),
-                    'metadata': {
-                        'series_id': indicator.series_id,
-                        'revision_date': obs.get('last_update'),
-                        'method': 'API'
-                    }
-                })
-                
+            processed_data = self.process_observations(indicator, observations)
             logger.info(f"✅ {len(processed_data)} observations récupérées pour {indicator.name}")
             return processed_data
 
@@ -237,8 +284,166 @@ class INSEEScraper:
             logger.error(f"Erreur traitement {indicator.name}: {e}")
             return []
 
+    def fetch_series_batch(
+        self, 
+        indicators: List[EconomicIndicator], 
+        start_date: str = None,
+        updated_after: str = None
+    ) -> Dict[str, List[Dict]]:
+        """Récupération de plusieurs séries en une requête (idbanks joints par '+')"""
+        if len(indicators) == 1:
+            return {indicators[0].id: self.fetch_series_data(indicators[0], start_date, updated_after)}
+
+        if not self.authenticate():
+            logger.error(f"Impossible de récupérer le lot de {len(indicators)} séries")
+            return {indicator.id: [] for indicator in indicators}
+
+        url = f"{self.base_url}/data/{'+'.join(ind.series_id for ind in indicators)}"
+        params = {}
+        
+        if start_date:
+            params['startPeriod'] = start_date
+        if updated_after:
+            params['updatedAfter'] = updated_after
+
+        results = {}
+        observations_by_series = {}
+        request_ok = False
+        
+        try:
+            observations_by_series = self.get_conditional(url, params, 60, self.split_batch_observations)
+            request_ok = True
+            
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Erreur HTTP sur le lot de {len(indicators)} séries, repli série par série: {e}")
+        except Exception as e:
+            logger.warning(f"Réponse de lot illisible, repli série par série: {e}")
+
+        missing = []
+        for indicator in indicators:
+            observations = observations_by_series.get(indicator.series_id)
+            
+            if observations is None:
+                # Avec updatedAfter, une série absente d'un lot réussi n'a simplement pas bougé
+                if request_ok and updated_after:
+                    results[indicator.id] = []
+                else:
+                    missing.append(indicator)
+                continue
+                
+            try:
+                results[indicator.id] = self.process_observations(indicator, observations)
+                logger.info(f"✅ {len(results[indicator.id])} observations récupérées pour {indicator.name}")
+            except Exception as e:
+                logger.error(f"Erreur traitement {indicator.name}: {e}")
+                missing.append(indicator)
+
+        # Repli unitaire pour les séries absentes ou en erreur dans le lot
+        if missing:
+            logger.info(f"🔁 Repli unitaire pour {len(missing)}/{len(indicators)} séries du lot")
+            for indicator in missing:
+                results[indicator.id] = self.fetch_series_data(indicator, start_date, updated_after)
+
+        return results
+
+    def fetch_period_range(
+        self,
+        indicators: List[EconomicIndicator],
+        start_period: str,
+        end_period: str
+    ) -> Dict[str, List[Dict]]:
+        """Observations d'une tranche de périodes (backfill) ; toute erreur remonte pour que la tranche soit rejouée"""
+        if not self.authenticate():
+            raise RuntimeError("Authentification INSEE impossible")
+
+        url = f"{self.base_url}/data/{'+'.join(ind.series_id for ind in indicators)}"
+        params = {'startPeriod': start_period, 'endPeriod': end_period}
+
+        def parse(data: Dict) -> Dict[str, List[Dict]]:
+            observations_by_series = self.split_batch_observations(data)
+            # Réponse mono-série : observations sans idbank
+            if len(indicators) == 1 and not observations_by_series:
+                observations_by_series = {indicators[0].series_id: data.get('observations', [])}
+            return observations_by_series
+
+        try:
+            observations_by_series = self.get_conditional(url, params, 60, parse)
+        except requests.exceptions.HTTPError as e:
+            # 404 : aucune observation sur la plage (série plus récente)
+            if e.response is None or e.response.status_code != 404:
+                raise
+            observations_by_series = {}
+
+        return {
+            indicator.id: self.process_observations(indicator, observations_by_series.get(indicator.series_id, []))
+            for indicator in indicators
+        }
+
+    def split_batch_observations(self, data: Dict) -> Dict[str, List[Dict]]:
+        """Répartir les observations d'une réponse multi-séries par idbank"""
+        observations_by_series = {}
+
+        # Réponse structurée par série
+        for series in data.get('series', []):
+            series_id = series.get('idbank') or series.get('series_id')
+            if series_id:
+                observations_by_series.setdefault(series_id, []).extend(series.get('observations', []))
+
+        # Réponse à plat : chaque observation porte son idbank
+        for obs in data.get('observations', []):
+            series_id = obs.get('idbank') or obs.get('series_id')
+            if series_id:
+                observations_by_series.setdefault(series_id, []).append(obs)
+
+        return observations_by_series
+
+    def process_observations(self, indicator: EconomicIndicator, observations: List[Dict]) -> List[Dict]:
+        """Transformation des observations brutes d'une série (fréquence lue sur la période)"""
+        frequencies, keys = encode_periods([obs.get('period') for obs in observations])
+        # Colonne DATE : premier jour de la période (2024-Q2 -> 2024-04-01) ; la période reste en métadonnées
+        start_dates = np.datetime_as_string(period_start_dates(frequencies, keys), unit='D').tolist()
+        
+        processed_data = []
+        unreadable = 0
+        for obs, frequency, period_key, start_date in zip(
+            observations, frequency_names(frequencies), period_keys(frequencies, keys).tolist(), start_dates
+        ):
+            if frequency is None:
+                unreadable += 1
+                continue
+            processed_data.append({
+                'series_id': f"insee_{indicator.id}",
+                'period_key': period_key,
+                'indicator': indicator.name,
+                'value': float(obs['value']) if obs['value'] else None,
+                'date': start_date,
+                'source': 'INSEE',
+                'unit': indicator.unit,
+                'frequency': frequency,
+                'geography': indicator.geography,
+                'category': indicator.category,
+                'sub_category': indicator.id,
+                'quality_flag': obs.get('status', 'NORMAL'),
+                'metadata': {
+                    'series_id': indicator.series_id,
+                    'period': obs['period'],
+                    'revision_date': obs.get('last_update'),
+                    'method': 'API'
+                }
+            })
+        if unreadable:
+            logger.warning(f"⚠️ {indicator.name}: {unreadable} périodes illisibles ignorées")
+        return processed_data
+
     def save_to_supabase(self, data: List[Dict]) -> bool:
         """Sauvegarde des données dans Supabase"""
+        with TRACER.span('write', rows=len(data)) as span:
+            saved = self._save_to_supabase(data)
+            if not saved:
+                span.fail("sauvegarde en échec")
+            return saved
+
+    def _save_to_supabase(self, data: List[Dict]) -> bool:
         if not data:
             return True
 
@@ -250,19 +455,20 @@ class INSEEScraper:
                 logger.warning("Aucune donnée valide à sauvegarder")
                 return True
 
-            # Insertion/mise à jour en batch
-            result = self.supabase.table('economic_data').upsert(
-                clean_data,
-                on_conflict='id',
-                ignore_duplicates=False
-            ).execute()
-            
-            if result.data:
-                logger.info(f"✅ {len(clean_data)} enregistrements sauvegardés")
+            # Clés entières (series_key, period_key), puis uniquement les lignes nouvelles ou révisées
+            changed_data = self.change_detector.diff(self.series_registry.attach(clean_data))
+            if not changed_data:
                 return True
-            else:
-                logger.error("Erreur lors de la sauvegarde")
+
+            # Insertion/mise à jour par lots concurrents ; une ligne refusée n'emporte pas la série
+            report = self.rest_writer.write_sync(changed_data, on_written=self.change_detector.commit)
+            
+            if report.failed:
+                logger.error(f"Erreur lors de la sauvegarde: {report.failed} lignes refusées")
                 return False
+            
+            logger.info(f"✅ {report.written} enregistrements sauvegardés ({report.rows_per_second:.0f} lignes/s)")
+            return True
 
         except Exception as e:
             logger.error(f"Erreur Supabase: {e}")
@@ -289,76 +495,278 @@ class INSEEScraper:
 
     def run_full_scraping(self, days_back: int = 30) -> Dict[str, int]:
         """Exécution complète du scraping"""
-        logger.info("🚀 Début du scraping INSEE")
-        
         start_date = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m')
-        total_saved = 0
-        errors = 0
+        return self._run_scraping({(start_date, None): list(self.indicators)})
+
+    def run_incremental_scraping(
+        self, 
+        overlap_periods: Optional[int] = None,
+        indicators: Optional[List[EconomicIndicator]] = None
+    ) -> Dict[str, int]:
+        """Scraping incrémental depuis le watermark de chaque série (toutes, ou celles indiquées)"""
+        overlap = self.overlap_periods if overlap_periods is None else overlap_periods
         
-        for indicator in self.indicators:
-            try:
-                logger.info(f"📊 Traitement: {indicator.name}")
-                
-                data = self.fetch_series_data(indicator, start_date)
-                
-                if data:
-                    success = self.save_to_supabase(data)
-                    if success:
-                        total_saved += len(data)
-                    else:
+        # Regrouper les séries partageant la même fenêtre de requête
+        plan = {}
+        for indicator in (self.indicators if indicators is None else indicators):
+            start_period = self.watermarks.start_period(indicator.id, overlap)
+            updated_after = self.watermarks.updated_after(indicator.id) if start_period else None
+            plan.setdefault((start_period, updated_after), []).append(indicator)
+            
+        logger.info(f"📍 Incrémental: {len(plan)} fenêtres de requête, recouvrement {overlap} périodes")
+        return self._run_scraping(plan)
+
+    def _run_scraping(self, plan: Dict[Tuple[Optional[str], Optional[str]], List[EconomicIndicator]]) -> Dict[str, int]:
+        """Exécution d'un plan {(startPeriod, updatedAfter): indicateurs}"""
+        with instrumented_run('insee', source='INSEE') as run_span:
+            logger.info(f"🚀 Début du scraping INSEE (concurrence: {self.concurrency})")
+            self.change_detector.reset_stats()
+        
+            total_saved = 0
+            errors = 0
+            failed_indicators = []
+        
+            # Les lots partent en parallèle, cadencés par le rate limiter ;
+            # les sauvegardes passent par un worker dédié pour chevaucher les fetchs
+            batches = [
+                (indicators[i:i + self.batch_size], start_date, updated_after)
+                for (start_date, updated_after), indicators in plan.items()
+                for i in range(0, len(indicators), self.batch_size)
+            ]
+        
+            def fetch_batch(batch, start_date, updated_after):
+                with TRACER.span('fetch', series=len(batch)) as span:
+                    batch_data = self.fetch_series_batch(batch, start_date, updated_after)
+                    span.set(rows=sum(len(rows) for rows in batch_data.values()))
+                    return batch_data
+        
+            # Chaque tâche part avec une copie du contexte : ses spans se rattachent à l'exécution
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='insee-fetch') as fetch_pool, \
+                    ThreadPoolExecutor(max_workers=1, thread_name_prefix='insee-save') as save_pool:
+            
+                fetch_futures = {
+                    fetch_pool.submit(contextvars.copy_context().run, fetch_batch, batch, start_date, updated_after): batch
+                    for batch, start_date, updated_after in batches
+                }
+                save_futures = {}
+            
+                for future in as_completed(fetch_futures):
+                    batch = fetch_futures[future]
+                    try:
+                        batch_data = future.result()
+                    except Exception as e:
+                        logger.error(f"Erreur lot {[ind.id for ind in batch]}: {e}")
+                        errors += len(batch)
+                        failed_indicators.extend(ind.id for ind in batch)
+                        continue
+                    
+                    for indicator in batch:
+                        logger.info(f"📊 Traitement: {indicator.name}")
+                        data = batch_data.get(indicator.id, [])
+                    
+                        if data:
+                            save_futures[save_pool.submit(contextvars.copy_context().run, self.save_to_supabase, data)] = (indicator, data)
+
+                for future in as_completed(save_futures):
+                    indicator, data = save_futures[future]
+                    try:
+                        if future.result():
+                            total_saved += len(data)
+                            self.watermarks.advance(
+                                indicator.id,
+                                (item['metadata']['period'] for item in data),
+                                (item['metadata'].get('revision_date') for item in data)
+                            )
+                        else:
+                            errors += 1
+                            failed_indicators.append(indicator.id)
+                    except Exception as e:
+                        logger.error(f"Erreur sauvegarde {indicator.name}: {e}")
                         errors += 1
-                        
-                # Pause entre les requêtes
-                time.sleep(1)
-                
-            except Exception as e:
-                logger.error(f"Erreur indicateur {indicator.name}: {e}")
-                errors += 1
+                        failed_indicators.append(indicator.id)
+
+            self.rest_writer.close()
+            self.watermarks.save()
+            self.change_detector.save()
+            changes = self.change_detector.report()
 
-        # Mise à jour du statut
-        self.update_data_source_status('INSEE', errors == 0, f"{errors} erreurs" if errors > 0 else None)
+            # Mise à jour du statut
+            self.update_data_source_status('INSEE', errors == 0, f"{errors} erreurs" if errors > 0 else None)
         
-        logger.info(f"✅ Scraping terminé: {total_saved} données sauvegardées, {errors} erreurs")
+            if errors:
+                run_span.fail(f"{errors} erreurs")
         
-        return {
-            'total_saved': total_saved,
-            'errors': errors,
-            'indicators_processed': len(self.indicators)
-        }
+            logger.info(
+                f"✅ Scraping terminé: {total_saved} données sauvegardées, {errors} erreurs "
+                f"(attente quota: {self.rate_limiter.total_wait:.1f}s)"
+            )
+            logger.info(
+                f"🔍 Changements: {changes['inserted']} nouvelles, {changes['revised']} révisées, "
+                f"{changes['unchanged']} inchangées"
+            )
+        
+            return {
+                'total_saved': total_saved,
+                'inserted': changes['inserted'],
+                'revised': changes['revised'],
+                'unchanged': changes['unchanged'],
+                'not_modified': self.response_store.stats['not_modified'],
+                'errors': errors,
+                'failed_indicators': failed_indicators,
+                'indicators_processed': sum(len(indicators) for indicators in plan.values())
+            }
 
-    def run_incremental_scraping(self) -> Dict[str, int]:
-        """Scraping incrémental (dernières données uniquement)"""
-        return self.run_full_scraping(days_back=7)
+    def run_backfill(
+        self,
+        start_year: int = DEFAULT_START_YEAR,
+        end_year: Optional[int] = None,
+        years_per_chunk: int = 5,
+        restart: bool = False
+    ) -> Dict[str, int]:
+        """
+        Reprise d'historique : chaque série est découpée en plages d'années,
+        les tranches partent en parallèle et chaque tranche sauvegardée est
+        enregistrée comme point de reprise. Relancer la commande après une
+        interruption ne rejoue que les tranches manquantes.
+        """
+        with instrumented_run('insee_backfill', source='INSEE', start_year=start_year) as run_span:
+            checkpoint = BackfillCheckpoint('insee')
+            if restart:
+                checkpoint.reset()
 
-def setup_scheduler():
-    """Configuration du scheduler pour l'exécution automatique"""
-    scraper = INSEEScraper()
-    
-    # Scraping complet une fois par jour à 6h
-    schedule.every().day.at("06:00").do(scraper.run_full_scraping)
+            chunks = year_chunks(start_year, end_year, years_per_chunk)
+            total = len(chunks) * len(self.indicators)
+        
+            # Séries restantes par tranche, regroupées en requêtes multi-séries
+            tasks = []
+            for chunk in chunks:
+                pending = [ind for ind in self.indicators if not checkpoint.is_done(ind.id, chunk)]
+                tasks.extend(
+                    (pending[i:i + self.batch_size], chunk)
+                    for i in range(0, len(pending), self.batch_size)
+                )
+        
+            progress = BackfillProgress(total, skipped=total - sum(len(batch) for batch, _ in tasks))
+            logger.info(
+                f"⏪ Backfill INSEE {chunks[-1][0]}-{chunks[0][1]}: {len(chunks)} tranches de {years_per_chunk} ans "
+                f"x {len(self.indicators)} séries, {progress.skipped} déjà faites"
+            )
+            self.change_detector.reset_stats()
+        
+            def fetch_chunk(batch, start_period, end_period):
+                with TRACER.span('fetch', series=len(batch), chunk=f"{start_period}-{end_period}") as span:
+                    batch_data = self.fetch_period_range(batch, start_period, end_period)
+                    span.set(rows=sum(len(rows) for rows in batch_data.values()))
+                    return batch_data
+        
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='insee-backfill') as pool:
+                futures = {
+                    pool.submit(contextvars.copy_context().run, fetch_chunk, batch, *chunk): (batch, chunk)
+                    for batch, chunk in tasks
+                }
+            
+                for future in as_completed(futures):
+                    batch, chunk = futures[future]
+                    try:
+                        batch_data = future.result()
+                    except Exception as e:
+                        logger.error(f"Erreur tranche {chunk[0]}-{chunk[1]} {[ind.id for ind in batch]}: {e}")
+                        for indicator in batch:
+                            progress.record(f"{indicator.id} {chunk[0]}-{chunk[1]}", 0, success=False)
+                        continue
+                
+                    for indicator in batch:
+                        data = batch_data.get(indicator.id, [])
+                        label = f"{indicator.id} {chunk[0]}-{chunk[1]}"
+                    
+                        if data and not self.save_to_supabase(data):
+                            progress.record(label, 0, success=False)
+                            continue
+                        
+                        if data:
+                            self.watermarks.advance(
+                                indicator.id,
+                                (item['metadata']['period'] for item in data),
+                                (item['metadata'].get('revision_date') for item in data)
+                            )
+                        checkpoint.complete(indicator.id, chunk, len(data))
+                        progress.record(label, len(data))
+        
+            self.rest_writer.close()
+            self.watermarks.save()
+            self.change_detector.save()
+        
+            report = progress.report()
+            if report['chunks_failed']:
+                run_span.fail(f"{report['chunks_failed']} tranches en échec")
+            logger.info(f"✅ Backfill INSEE terminé: {report}")
+            return {**report, **self.change_detector.report()}
+
+def setup_scheduler(scraper: Optional[INSEEScraper] = None):
+    """
+    Scheduler asyncio : chaque série est reprise en incrémental selon sa
+    fréquence et le calendrier de publication, sans chevauchement d'exécutions
+    """
+    scraper = scraper or INSEEScraper()
+    scheduler = AsyncScheduler('insee')
     
-    # Scraping incrémental toutes les 4 heures
-    schedule.every(4).hours.do(scraper.run_incremental_scraping)
+    async def run_due(indicator_ids: List[str]) -> List[str]:
+        indicators = [ind for ind in scraper.indicators if ind.id in indicator_ids]
+        # Scraper à threads (requests) : exécuté hors de la boucle asyncio
+        result = await asyncio.to_thread(scraper.run_incremental_scraping, indicators=indicators)
+        return result['failed_indicators']
     
-    logger.info("📅 Scheduler configuré")
+    scheduler.add_job('insee', run_due, {ind.id: ind.frequency for ind in scraper.indicators})
     
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
+    try:
+        asyncio.run(scheduler.run_forever())
+    except KeyboardInterrupt:
+        logger.info("📅 Scheduler arrêté")
 
 def main():
     """Point d'entrée principal"""
     import argparse
     
     parser = argparse.ArgumentParser(description='Scraper INSEE')
-    parser.add_argument('--mode', choices=['full', 'incremental', 'scheduler'], 
+    parser.add_argument('--mode', choices=['full', 'incremental', 'backfill', 'scheduler', 'catalogue'], 
                        default='full', help='Mode d\'exécution')
+    parser.add_argument('--concurrency', type=int, default=4,
+                       help='Nombre de séries récupérées en parallèle')
+    parser.add_argument('--rate-limit', type=int, default=None,
+                       help='Quota INSEE en requêtes par minute (défaut: $INSEE_RATE_LIMIT ou 30)')
+    parser.add_argument('--batch-size', type=int, default=None,
+                       help='Nombre de séries par requête BDM (défaut: $INSEE_BATCH_SIZE ou 20)')
     parser.add_argument('--days', type=int, default=30, 
                        help='Nombre de jours à récupérer (mode full)')
+    parser.add_argument('--overlap', type=int, default=None,
+                       help='Périodes re-téléchargées pour les révisions (mode incremental)')
+    parser.add_argument('--start-year', type=int, default=DEFAULT_START_YEAR,
+                       help='Première année reprise (mode backfill)')
+    parser.add_argument('--end-year', type=int, default=None,
+                       help='Dernière année reprise (mode backfill, défaut: année courante)')
+    parser.add_argument('--chunk-years', type=int, default=5,
+                       help='Nombre d\'années par tranche (mode backfill)')
+    parser.add_argument('--restart', action='store_true',
+                       help='Ignorer les points de reprise existants (mode backfill)')
+    parser.add_argument('--series', metavar='REQUÊTE', default=None,
+                       help='Séries du catalogue à suivre, ex. "category=INFLATION frequency=M" ou "all" '
+                            '(défaut: $INSEE_SERIES_QUERY, sinon les séries par défaut)')
+    parser.add_argument('--force-refresh', action='store_true',
+                       help='Rafraîchir le catalogue même s\'il n\'est pas périmé (mode catalogue)')
     
     args = parser.parse_args()
+    try:
+        parse_query(args.series)
+    except ValueError as e:
+        parser.error(str(e))
     
-    scraper = INSEEScraper()
+    scraper = INSEEScraper(
+        concurrency=args.concurrency,
+        requests_per_minute=args.rate_limit,
+        batch_size=args.batch_size,
+        overlap_periods=args.overlap,
+        series_query=args.series
+    )
     
     if args.mode == 'full':
         result = scraper.run_full_scraping(args.days)
@@ -368,8 +776,16 @@ def main():
         result = scraper.run_incremental_scraping()
         print(f"Résultat: {result}")
         
+    elif args.mode == 'backfill':
+        result = scraper.run_backfill(args.start_year, args.end_year, args.chunk_years, args.restart)
+        print(f"Résultat: {result}")
+        
     elif args.mode == 'scheduler':
-        setup_scheduler()
+        setup_scheduler(scraper)
+        
+    elif args.mode == 'catalogue':
+        scraper.refresh_catalogue(force=args.force_refresh)
+        print(f"Catalogue: {json.dumps(scraper.catalogue.summary(), indent=2, ensure_ascii=False)}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
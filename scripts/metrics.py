@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+📈 Métriques et traces - Instrumentation des scrapers et pipelines
+Compteurs, jauges et histogrammes exposés au format texte Prometheus
+(fichier pour le collecteur textfile, ou endpoint /metrics), et spans au
+format OpenTelemetry par exécution, jeu de données et étape
+"""
+
+import json
+import logging
+import os
+import resource
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Bornes des histogrammes de latence, en secondes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Spans conservés au plus entre deux exports (une exécution jamais exportée ne fait pas fuir la mémoire)
+MAX_PENDING_SPANS = 10000
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def rss_bytes() -> int:
+    """Mémoire résidente actuelle du processus"""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss
+    # Sans psutil : pic depuis le démarrage du processus (Linux : ko)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PeakRSS:
+    """Pic de mémoire résidente pendant un bloc (échantillonné en tâche de fond)"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.start_bytes = 0
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, rss_bytes())
+
+    def __enter__(self) -> 'PeakRSS':
+        self.start_bytes = self.peak_bytes = rss_bytes()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name='peak-rss', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, rss_bytes())
+
+    @property
+    def peak_mb(self) -> float:
+        return self.peak_bytes / 1024 / 1024
+
+    @property
+    def delta_mb(self) -> float:
+        return (self.peak_bytes - self.start_bytes) / 1024 / 1024
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class MetricFamily:
+    """Métrique et ses séries, une par combinaison de labels"""
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> Iterator[Tuple[str, LabelKey, Optional[Tuple[str, str]], float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield self.name, key, None, value
+
+
+class Counter(MetricFamily):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError(f"{self.name}: un compteur ne décroît pas")
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(MetricFamily):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = float(value)
+
+    def set_max(self, value: float, **labels):
+        """Ne retenir que la plus grande valeur observée (pics)"""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = max(self._values.get(key, float('-inf')), float(value))
+
+
+class Histogram(MetricFamily):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, List[float]] = {}  # [compte par borne..., somme, total]
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def value(self, **labels) -> float:
+        """Nombre d'observations"""
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+        return series[-1] if series else 0.0
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for key, values in series:
+            for bound, count in zip(self.buckets, values):
+                yield f"{self.name}_bucket", key, ('le', _format_value(bound)), count
+            yield f"{self.name}_bucket", key, ('le', '+Inf'), values[-1]
+            yield f"{self.name}_sum", key, None, values[-2]
+            yield f"{self.name}_count", key, None, values[-1]
+
+
+class MetricsRegistry:
+    """Ensemble des métriques d'un processus, rendu au format texte Prometheus"""
+
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _family(self, cls, name: str, help_text: str, **kwargs) -> MetricFamily:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = cls(name, help_text, **kwargs)
+            elif not isinstance(family, cls):
+                raise ValueError(f"Métrique {name} déjà déclarée comme {family.kind}")
+            return family
+
+    def counter(self, name: str, help_text: str = '') -> Counter:
+        return self._family(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str = '') -> Gauge:
+        return self._family(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str = '', buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._family(Histogram, name, help_text, buckets=buckets)
+
+    def render(self) -> str:
+        """Exposition au format texte Prometheus 0.0.4"""
+        with self._lock:
+            families = sorted(self._families.values(), key=lambda family: family.name)
+
+        lines = []
+        for family in families:
+            if family.help:
+                lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for name, key, extra, value in family.samples():
+                lines.append(f"{name}{_format_labels(key, extra)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: str):
+        """Fichier pour le collecteur textfile de node_exporter (temporaire puis renommage)"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+        """Endpoint /metrics dans un thread dédié (un seul par processus)"""
+        if self._server is not None:
+            return self._server
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+        logger.info(f"📈 Métriques exposées sur http://{host}:{self._server.server_port}/metrics")
+        return self._server
+
+    def serve_from_env(self):
+        """Endpoint /metrics si METRICS_PORT est défini"""
+        port = os.getenv('METRICS_PORT')
+        if port and self._server is None:
+            try:
+                self.serve(int(port), os.getenv('METRICS_HOST', '0.0.0.0'))
+            except OSError as e:
+                logger.warning(f"⚠️ Endpoint métriques indisponible sur le port {port}: {e}")
+
+
+@dataclass
+class Span:
+    """Unité de travail chronométrée (exécution, tâche, étape, requête)"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    attributes: Dict[str, object] = field(default_factory=dict)
+    start_time: float = 0.0
+    duration: float = 0.0
+    status: str = 'OK'
+    error: Optional[str] = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def fail(self, error: str):
+        self.status = 'ERROR'
+        self.error = error
+
+    def to_dict(self) -> Dict:
+        """Forme OpenTelemetry (OTLP/JSON simplifié)"""
+        start_ns = int(self.start_time * 1e9)
+        return {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_id or '',
+            'name': self.name,
+            'startTimeUnixNano': start_ns,
+            'endTimeUnixNano': start_ns + int(self.duration * 1e9),
+            'attributes': self.attributes,
+            'status': {'code': self.status, 'message': self.error or ''}
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+# Attributs hérités du span parent (labels des métriques d'étape)
+INHERITED_ATTRIBUTES = ('job', 'source')
+
+# Spans englobant des étapes (exclus des durées cumulées par étape)
+CONTAINER_SPANS = ('run', 'dataset')
+
+
+class Tracer:
+    """
+    Spans imbriqués via contextvars (suivis à travers les tâches asyncio et
+    asyncio.to_thread ; parent explicite pour les pools de threads).
+
+    À la fin de chaque span, sa durée alimente l'histogramme
+    pipeline_stage_duration_seconds{job, source, stage}, et ses attributs
+    rows, bytes les compteurs correspondants.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self._finished: List[Span] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def current() -> Optional[Span]:
+        return _current_span.get()
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attributes) -> Iterator[Span]:
+        parent = parent if parent is not None else _current_span.get()
+        if parent is not None:
+            inherited = {key: parent.attributes[key] for key in INHERITED_ATTRIBUTES if key in parent.attributes}
+            attributes = {**inherited, **attributes}
+
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent is not None else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent is not None else None,
+            attributes=attributes,
+            start_time=time.time()
+        )
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            _current_span.reset(token)
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        labels = {
+            'job': span.attributes.get('job', ''),
+            'source': span.attributes.get('source', ''),
+            'stage': span.name
+        }
+        self.registry.histogram(
+            'pipeline_stage_duration_seconds', 'Durée des étapes (fetch, parse, validate, write...)'
+        ).observe(span.duration, **labels)
+        if 'rows' in span.attributes:
+            self.registry.counter('pipeline_rows_total', 'Lignes traitées par étape').inc(span.attributes['rows'], **labels)
+        if 'bytes' in span.attributes:
+            self.registry.counter('pipeline_bytes_total', 'Octets traités par étape').inc(span.attributes['bytes'], **labels)
+        if span.status == 'ERROR':
+            self.registry.counter('pipeline_stage_errors_total', 'Étapes en échec').inc(**labels)
+
+        with self._lock:
+            self._finished.append(span)
+            if len(self._finished) > MAX_PENDING_SPANS:
+                del self._finished[:len(self._finished) - MAX_PENDING_SPANS]
+
+    def summary(self, trace_id: str) -> Dict[str, float]:
+        """Durée cumulée par source/étape d'une trace, de la plus longue à la plus courte"""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            spans = [span for span in self._finished if span.trace_id == trace_id and span.name not in CONTAINER_SPANS]
+        for span in spans:
+            key = f"{span.attributes.get('source') or '-'}/{span.name}"
+            totals[key] = totals.get(key, 0.0) + span.duration
+        return {key: round(seconds, 3) for key, seconds in sorted(totals.items(), key=lambda item: -item[1])}
+
+    def flush(self, path: str) -> int:
+        """Ajouter les spans terminés au fichier JSONL, retourne leur nombre"""
+        with self._lock:
+            spans, self._finished = self._finished, []
+        if not spans:
+            return 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), separators=(',', ':'), default=str) + '\n')
+        return len(spans)
+
+
+# Instances du processus (comme le registre par défaut des clients Prometheus)
+REGISTRY = MetricsRegistry()
+TRACER = Tracer(REGISTRY)
+
+
+def observe_http(source: str, status: int, seconds: float, size: int = 0):
+    """Requête HTTP terminée : latence, statut et octets reçus"""
+    REGISTRY.histogram(
+        'pipeline_http_request_duration_seconds', 'Latence des requêtes HTTP vers les sources'
+    ).observe(seconds, source=source)
+    REGISTRY.counter('pipeline_http_requests_total', 'Requêtes HTTP par statut').inc(source=source, status=status)
+    if size:
+        REGISTRY.counter('pipeline_http_response_bytes_total', 'Octets reçus des sources').inc(size, source=source)
+
+
+def count_retries(source: str, retries: int = 1, throttled: int = 0):
+    """Requêtes rejouées, dont réponses 429 (ou 503 avec Retry-After)"""
+    if retries:
+        REGISTRY.counter('pipeline_http_retries_total', 'Requêtes rejouées').inc(retries, source=source)
+    if throttled:
+        REGISTRY.counter('pipeline_http_throttled_total', 'Réponses 429 reçues').inc(throttled, source=source)
+
+
+def export_telemetry():
+    """Écrire les métriques (METRICS_FILE) et les spans terminés (TRACE_FILE) ; chaîne vide : désactivé"""
+    metrics_file = os.getenv('METRICS_FILE', 'pipeline_metrics.prom')
+    trace_file = os.getenv('TRACE_FILE', 'pipeline_traces.jsonl')
+    try:
+        if metrics_file:
+            REGISTRY.write_textfile(metrics_file)
+        if trace_file:
+            TRACER.flush(trace_file)
+    except OSError as e:
+        logger.warning(f"⚠️ Export des métriques impossible: {e}")
+
+
+@contextmanager
+def instrumented_run(job: str, **attributes) -> Iterator[Span]:
+    """
+    Span racine d'une exécution : pic de mémoire, compteurs d'exécutions,
+    durée cumulée par source/étape dans les logs, puis export des métriques
+    et des spans. L'appelant marque le span en échec (span.fail) si besoin.
+    """
+    REGISTRY.serve_from_env()
+    memory = PeakRSS(interval=0.05)
+    span = None
+    try:
+        with memory, TRACER.span('run', job=job, **attributes) as span:
+            yield span
+    finally:
+        if span is not None:
+            span.set(peak_rss_bytes=memory.peak_bytes)
+            status = 'failed' if span.status == 'ERROR' else 'success'
+            REGISTRY.counter('pipeline_runs_total', 'Exécutions terminées').inc(job=job, status=status)
+            REGISTRY.gauge('pipeline_run_duration_seconds', 'Durée de la dernière exécution').set(span.duration, job=job)
+            REGISTRY.gauge('pipeline_run_peak_rss_bytes', 'Pic de mémoire de la dernière exécution').set(memory.peak_bytes, job=job)
+            REGISTRY.gauge('process_peak_rss_bytes', 'Pic de mémoire du processus').set_max(memory.peak_bytes)
+            REGISTRY.gauge('pipeline_last_run_timestamp_seconds', 'Fin de la dernière exécution').set(time.time(), job=job)
+
+            top = list(TRACER.summary(span.trace_id).items())[:8]
+            if top:
+                logger.info(
+                    f"⏱️ {job}: {span.duration:.1f}s, pic mémoire {memory.peak_mb:.0f} Mo ; durée cumulée par étape: "
+                    + ', '.join(f"{key} {seconds:.2f}s" for key, seconds in top)
+                )
+        export_telemetry()
@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+"""
+🧪 Sources simulées - Serveur HTTP local remplaçant INSEE, Eurostat, OECD,
+Banque de France et l'API REST Supabase
+Réponses synthétiques (ou enregistrées) de taille, latence et taux d'erreur
+configurables, pour mesurer le pipeline sans identifiants ni réseau
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import zlib
+from collections import Counter
+from itertools import product
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from aiohttp import web
+
+from periods import PERIODS_PER_YEAR, format_period
+
+logger = logging.getLogger(__name__)
+
+# Date de dernière mise à jour annoncée par toutes les séries synthétiques
+LAST_UPDATE = '2024-06-01'
+
+# Fréquence des jeux Eurostat connus (les autres sont mensuels)
+EUROSTAT_FREQUENCIES = {'nama_10_gdp': 'A', 'une_rt_m': 'M', 'prc_hicp_manr': 'M'}
+
+# Paramètres Eurostat qui ne sont pas des filtres de dimension
+EUROSTAT_RESERVED_PARAMS = ('format', 'lang', 'sinceTimePeriod', 'untilTimePeriod')
+
+# Dataflows BDM simulés (catalogue INSEE) et code FREQ de leurs séries
+MOCK_DATAFLOWS = (
+    ('CNT-2014-PIB-EQB-RF', 'T'),
+    ('IPC-2015', 'M'),
+    ('CHOMAGE-TRIM-NATIONAL', 'T'),
+    ('IPI-2021', 'M'),
+    ('ENQ-CONJ-MENAGES', 'M'),
+    ('COMMERCE-EXT-GEN', 'M'),
+    ('DEMO-POPULATION', 'A'),
+    ('SERIES-DIVERSES', 'M'),
+)
+
+SDMX_STRUCTURE = 'http://www.sdmx.org/resources/sdmxml/schemas/v2_1/structure'
+SDMX_COMMON = 'http://www.sdmx.org/resources/sdmxml/schemas/v2_1/common'
+SDMX_GENERIC = 'http://www.SDMX.org/resources/SDMXML/schemas/v2_0/generic'
+SDMX_MESSAGE = 'http://www.SDMX.org/resources/SDMXML/schemas/v2_0/message'
+
+
+@dataclass
+class MockConfig:
+    """Taille des réponses, latence et erreurs injectées"""
+    series: int = 20                 # séries par jeu de données (Eurostat, OECD) et par requête INSEE
+    first_year: int = 1990
+    last_year: int = 2024
+    latency: float = 0.0             # secondes ajoutées à chaque réponse
+    rate_429: float = 0.0            # part des requêtes refusées en 429 (Retry-After: 1)
+    rate_5xx: float = 0.0            # part des requêtes en erreur 500/502/503
+    missing_rate: float = 0.02       # part des cellules Eurostat absentes (réponse creuse)
+    seed: int = 42
+    fixtures_dir: Optional[str] = None
+    catalogue_series: int = 1000     # séries du catalogue BDM, réparties entre les dataflows
+
+
+def mock_environment(base_url: str) -> Dict[str, str]:
+    """Variables d'environnement orientant scrapers et pipeline vers un serveur simulé"""
+    return {
+        'INSEE_BASE_URL': f"{base_url}/insee/series/BDM/V1",
+        'INSEE_TOKEN_URL': f"{base_url}/insee/token",
+        'INSEE_CLIENT_ID': 'mock',
+        'INSEE_CLIENT_SECRET': 'mock',
+        'EUROSTAT_BASE_URL': f"{base_url}/eurostat",
+        'OECD_BASE_URL': f"{base_url}/oecd",
+        'BANQUE_FRANCE_BASE_URL': f"{base_url}/bdf",
+        'NEXT_PUBLIC_SUPABASE_URL': base_url,
+        'SUPABASE_SERVICE_ROLE_KEY': 'mock.service.role',
+    }
+
+
+def _periods(frequency: str, first_year: int, last_year: int) -> List[str]:
+    per_year = PERIODS_PER_YEAR.get(frequency, 12)
+    frequency = frequency if frequency in PERIODS_PER_YEAR else 'M'
+    return [format_period(frequency, ordinal) for ordinal in range(first_year * per_year, (last_year + 1) * per_year)]
+
+
+def _in_range(periods: List[str], start: Optional[str], end: Optional[str]) -> List[str]:
+    """Périodes comprises dans [start, end], bornes comparées à leur propre précision (2024, 2024-05...)"""
+    return [
+        period for period in periods
+        if (not start or period[:len(start)] >= start) and (not end or period[:len(end)] <= end)
+    ]
+
+
+class MockSourceServer:
+    """
+    Serveur aiohttp simulant les quatre sources et PostgREST.
+
+    Routes : /insee/token, /insee/series/BDM/V1/data/{idbanks}, /insee/series/BDM/V1/dataflow/FR1/all
+    et /insee/series/BDM/V1/data/{dataflow}/all?detail=nodata (catalogue), /eurostat/{dataset},
+    /oecd/{dataset}/{clé}/all/{fréquence}, /bdf/{série}, /rest/v1/{table}, /rest/v1/rpc/{fonction}, et
+    /mock/reset, /mock/stats pour les processus de mesure.
+    Sans filtre, Eurostat et OECD renvoient config.series pays synthétiques ;
+    un filtre (geo=FR&unit=..., clé SDMX FRA+DEU.B1_GE) renvoie la coupe demandée.
+    Les corps sont générés une fois par requête distincte puis resservis ;
+    un fichier {fixtures_dir}/{source}/{nom} remplace la réponse synthétique.
+    Les lignes écrites dans economic_data (clé series_key, period_key) et
+    series (clé entière attribuée à la création) sont conservées et relues
+    comme par Supabase (select ... colonne=eq.x, colonne=in.(...)).
+    """
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or MockConfig()
+        self.host = host
+        self.port = port
+        self.base_url: Optional[str] = None
+        self.stats = Counter()
+        self.rows: Dict[Tuple[int, int], Dict] = {}
+        self.series: Dict[str, Dict] = {}
+        self.dataflow_versions = Counter()  # touch_dataflow : dataflow modifié (nouvel ETag, une série de plus)
+        self._bodies: Dict[Tuple, Tuple[bytes, str]] = {}
+        self._random = random.Random(self.config.seed)
+        self._runner: Optional[web.AppRunner] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def application(self) -> web.Application:
+        app = web.Application(client_max_size=256 * 1024 * 1024)
+        app.router.add_post('/insee/token', self.insee_token)
+        app.router.add_get('/insee/series/BDM/V1/data/{idbanks}', self.insee_data)
+        app.router.add_get('/insee/series/BDM/V1/dataflow/FR1/all', self.insee_dataflows)
+        app.router.add_get('/insee/series/BDM/V1/data/{dataflow}/{key}', self.insee_dataflow_series)
+        app.router.add_get('/eurostat/{dataset}', self.eurostat)
+        app.router.add_get('/oecd/{dataset}/{key}/all/{frequency}', self.oecd)
+        app.router.add_get('/bdf/{series}', self.banque_france)
+        app.router.add_get('/rest/v1/{table}', self.rest_select)
+        app.router.add_post('/rest/v1/{table}', self.rest_write)
+        app.router.add_patch('/rest/v1/{table}', self.rest_update)
+        app.router.add_post('/rest/v1/rpc/{function}', self.rest_rpc)
+        app.router.add_post('/mock/reset', self.control_reset)
+        app.router.add_get('/mock/stats', self.control_stats)
+        return app
+
+    async def start(self) -> str:
+        """Démarrer le serveur ; retourne son URL de base"""
+        self._runner = web.AppRunner(self.application(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        host, port = self._runner.addresses[0][:2]
+        self.base_url = f"http://{host}:{port}"
+        logger.info(f"🧪 Sources simulées sur {self.base_url}")
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_background(self) -> str:
+        """
+        Serveur sur une boucle dédiée (thread) : les appels bloquants faits
+        depuis la boucle appelante (client supabase-py) ne le figent pas
+        """
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name='mock-sources', daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(self.start(), self._loop).result()
+
+    def stop_background(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+    def reset(self):
+        """Oublier lignes écrites et compteurs ; les corps déjà générés restent servis"""
+        self.stats.clear()
+        self.rows.clear()
+        self.series.clear()
+
+    def environment(self) -> Dict[str, str]:
+        return mock_environment(self.base_url)
+
+    def touch_dataflow(self, dataflow: str):
+        """Simuler la mise à jour d'un dataflow du catalogue (nouvel ETag, une série ajoutée)"""
+        self.dataflow_versions[dataflow] += 1
+
+    # Simulation de latence et d'erreurs
+
+    async def _disturb(self, route: str) -> Optional[web.Response]:
+        """Latence configurée, puis éventuellement une erreur injectée à la place de la réponse"""
+        self.stats[f"{route}_requests"] += 1
+        if self.config.latency:
+            await asyncio.sleep(self.config.latency)
+
+        draw = self._random.random()
+        if draw < self.config.rate_429:
+            self.stats[f"{route}_429"] += 1
+            return web.Response(status=429, headers={'Retry-After': '1'}, text='Too Many Requests')
+        if draw < self.config.rate_429 + self.config.rate_5xx:
+            self.stats[f"{route}_5xx"] += 1
+            return web.Response(status=self._random.choice((500, 502, 503)), text='Server Error')
+        return None
+
+    def _respond(self, route: str, body: bytes, content_type: str) -> web.Response:
+        self.stats[f"{route}_bytes"] += len(body)
+        return web.Response(body=body, content_type=content_type)
+
+    def _fixture(self, source: str, name: str) -> Optional[Tuple[bytes, str]]:
+        if not self.config.fixtures_dir:
+            return None
+        path = os.path.join(self.config.fixtures_dir, source, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read(), 'application/xml' if name.endswith('.xml') else 'application/json'
+
+    def _body(self, key: Tuple, render) -> Tuple[bytes, str]:
+        """Corps mis en cache par requête distincte : le coût de génération n'entre pas dans les mesures"""
+        if key not in self._bodies:
+            self._bodies[key] = render()
+        return self._bodies[key]
+
+    def _values(self, key: str, size: int) -> np.ndarray:
+        """Marche aléatoire déterministe (même série, mêmes valeurs d'une requête à l'autre)"""
+        rng = np.random.default_rng(self.config.seed + zlib.crc32(key.encode('utf-8')))
+        return np.round(100 + np.cumsum(rng.normal(0, 1, size)), 2)
+
+    def _series_periods(self, frequency: str, start: Optional[str], end: Optional[str]) -> Tuple[List[str], slice]:
+        """
+        Périodes demandées et leur position dans l'historique complet : les valeurs
+        sont lues sur la marche entière (_values(clé, fenêtre.stop)[fenêtre]), une
+        période garde la même valeur quelle que soit la plage demandée
+        """
+        periods = _periods(frequency, self.config.first_year, self.config.last_year)
+        selected = _in_range(periods, start, end)
+        first = periods.index(selected[0]) if selected else 0
+        return selected, slice(first, first + len(selected))
+
+    # Sources
+
+    async def insee_token(self, request: web.Request) -> web.Response:
+        return web.json_response({'access_token': 'mock-token', 'token_type': 'Bearer', 'expires_in': 3600})
+
+    async def insee_data(self, request: web.Request) -> web.Response:
+        error = await self._disturb('insee')
+        if error is not None:
+            return error
+
+        idbanks = request.match_info['idbanks'].split('+')
+        start, end = request.query.get('startPeriod'), request.query.get('endPeriod')
+        updated_after = request.query.get('updatedAfter')
+
+        def render() -> Optional[Tuple[bytes, str]]:
+            fixture = self._fixture('insee', f"{'+'.join(idbanks)}.json")
+            if fixture:
+                return fixture
+
+            series = []
+            for idbank in idbanks:
+                # updatedAfter postérieur à la dernière mise à jour : série inchangée, absente de la réponse
+                if updated_after and updated_after[:10] >= LAST_UPDATE:
+                    continue
+                all_periods = _periods('M', self.config.first_year, self.config.last_year)
+                values = dict(zip(all_periods, self._values(f"insee_{idbank}", len(all_periods)).tolist()))
+                observations = [
+                    {'period': period, 'value': str(values[period]), 'status': 'A', 'last_update': LAST_UPDATE}
+                    for period in _in_range(all_periods, start, end)
+                ]
+                if observations:
+                    series.append({'idbank': idbank, 'observations': observations})
+
+            if not series and (start or end) and not updated_after:
+                return None  # plage sans observation : 404 comme l'API BDM
+            if len(idbanks) == 1:
+                payload = {'observations': series[0]['observations'] if series else []}
+            else:
+                payload = {'series': series}
+            return json.dumps(payload).encode('utf-8'), 'application/json'
+
+        body = self._body(('insee', tuple(idbanks), start, end, updated_after), render)
+        if body is None:
+            return web.Response(status=404)
+        return self._respond('insee', *body)
+
+    async def insee_dataflows(self, request: web.Request) -> web.Response:
+        error = await self._disturb('insee_catalogue')
+        if error is not None:
+            return error
+
+        flows = ''.join(
+            f'<str:Dataflow id="{flow}" agencyID="FR1" version="1.0">'
+            f'<com:Name xml:lang="fr">Dataflow {flow}</com:Name><com:Name xml:lang="en">{flow}</com:Name>'
+            f'</str:Dataflow>'
+            for flow, _ in MOCK_DATAFLOWS
+        )
+        body = (
+            f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<mes:Structure xmlns:mes="{SDMX_MESSAGE}" xmlns:str="{SDMX_STRUCTURE}" xmlns:com="{SDMX_COMMON}">'
+            f'<mes:Structures><str:Dataflows>{flows}</str:Dataflows></mes:Structures></mes:Structure>'
+        ).encode('utf-8')
+        return self._respond('insee_catalogue', body, 'application/xml')
+
+    async def insee_dataflow_series(self, request: web.Request) -> web.Response:
+        """Séries d'un dataflow sans observations (detail=nodata), avec ETag par version"""
+        error = await self._disturb('insee_catalogue')
+        if error is not None:
+            return error
+
+        dataflow = request.match_info['dataflow']
+        flows = dict(MOCK_DATAFLOWS)
+        if dataflow not in flows:
+            return web.Response(status=404)
+
+        version = self.dataflow_versions[dataflow]
+        etag = f'"{dataflow}-{version}"'
+        if request.headers.get('If-None-Match') == etag:
+            self.stats['insee_catalogue_not_modified'] += 1
+            return web.Response(status=304, headers={'ETag': etag})
+
+        def render() -> Tuple[bytes, str]:
+            index = list(flows).index(dataflow)
+            count = self.config.catalogue_series // len(flows) + version
+            series = ''.join(
+                f'<Series IDBANK="{index + 1:02d}{i:07d}" FREQ="{flows[dataflow]}" '
+                f'TITLE_FR="{dataflow} - série {i}" TITLE_EN="{dataflow} - series {i}" '
+                f'UNIT_MEASURE="{"IND" if i % 2 else "EUR"}" LAST_UPDATE="{LAST_UPDATE}"/>'
+                for i in range(count)
+            )
+            body = (
+                f'<?xml version="1.0" encoding="UTF-8"?>'
+                f'<message:StructureSpecificData xmlns:message="{SDMX_MESSAGE}">'
+                f'<message:DataSet>{series}</message:DataSet></message:StructureSpecificData>'
+            )
+            return body.encode('utf-8'), 'application/xml'
+
+        body, content_type = self._body(('insee_catalogue', dataflow, version), render)
+        response = self._respond('insee_catalogue', body, content_type)
+        response.headers['ETag'] = etag
+        return response
+
+    async def eurostat(self, request: web.Request) -> web.Response:
+        error = await self._disturb('eurostat')
+        if error is not None:
+            return error
+
+        dataset = request.match_info['dataset']
+        start, end = request.query.get('sinceTimePeriod'), request.query.get('untilTimePeriod')
+        filters = {
+            dim: tuple(request.query.getall(dim))
+            for dim in dict.fromkeys(request.query) if dim not in EUROSTAT_RESERVED_PARAMS
+        }
+
+        def render() -> Optional[Tuple[bytes, str]]:
+            fixture = self._fixture('eurostat', f"{dataset}.json")
+            if fixture:
+                return fixture
+
+            frequency = EUROSTAT_FREQUENCIES.get(dataset, 'M')
+            times, window = self._series_periods(frequency, start, end)
+            if not times:
+                return None
+            geos = list(filters.get('geo') or [f"G{i:03d}" for i in range(self.config.series)])
+
+            # Cube (freq, unit, dimensions filtrées..., geo, time) en valeurs creuses {index à plat: valeur}
+            dimensions = {'freq': [frequency], 'unit': list(filters.get('unit') or ['PC'])}
+            dimensions.update((dim, list(values)) for dim, values in filters.items() if dim not in ('geo', 'unit'))
+            dimensions['geo'] = geos
+            series = ['_'.join(labels) for labels in product(*list(dimensions.values())[1:])]
+
+            values = np.concatenate([self._values(f"{dataset}_{key}", window.stop)[window] for key in series])
+            rng = np.random.default_rng(self.config.seed)
+            missing = rng.random((len(series), window.stop))[:, window].ravel()
+            present = np.flatnonzero(missing >= self.config.missing_rate)
+            provisional = present[-len(series):]
+
+            payload = {
+                'version': '2.0',
+                'class': 'dataset',
+                'label': dataset,
+                'updated': f"{LAST_UPDATE}T11:00:00+0200",
+                'id': [*dimensions, 'time'],
+                'size': [*(len(labels) for labels in dimensions.values()), len(times)],
+                'dimension': {
+                    **{
+                        dim: {'category': {'index': {label: i for i, label in enumerate(labels)}}}
+                        for dim, labels in dimensions.items()
+                    },
+                    'time': {'category': {'index': {time: i for i, time in enumerate(times)}}}
+                },
+                'value': {str(i): value for i, value in zip(present.tolist(), values[present].tolist())},
+                'status': {str(i): 'p' for i in provisional.tolist()}
+            }
+            return json.dumps(payload).encode('utf-8'), 'application/json'
+
+        body = self._body(('eurostat', dataset, start, end, tuple(filters.items())), render)
+        if body is None:
+            return web.Response(status=404)
+        return self._respond('eurostat', *body)
+
+    async def oecd(self, request: web.Request) -> web.Response:
+        error = await self._disturb('oecd')
+        if error is not None:
+            return error
+
+        dataset, frequency = request.match_info['dataset'], request.match_info['frequency']
+        key = request.match_info['key']
+        start, end = request.query.get('startTime'), request.query.get('endTime')
+
+        def render() -> Optional[Tuple[bytes, str]]:
+            fixture = self._fixture('oecd', f"{dataset}.xml")
+            if fixture:
+                return fixture
+
+            times, window = self._series_periods(frequency, start, end)
+            if not times:
+                return None
+
+            # Clé LOCATION.SUBJECT.MEASURE (valeurs séparées par +, position vide : toutes)
+            positions = [part.split('+') if part else [] for part in key.split('.')] if key != 'all' else []
+            positions += [[]] * (3 - len(positions))
+            locations = positions[0] or [f"L{i:03d}" for i in range(self.config.series)]
+            subjects = positions[1] or [dataset]
+            measures = positions[2] or ['IDX']
+
+            parts = [
+                f'<?xml version="1.0" encoding="utf-8"?>'
+                f'<message:GenericData xmlns:message="{SDMX_MESSAGE}" xmlns:generic="{SDMX_GENERIC}">'
+                f'<message:DataSet>'
+            ]
+            for location, subject, measure in product(locations, subjects, measures):
+                parts.append(
+                    f'<generic:Series><generic:SeriesKey>'
+                    f'<generic:Value concept="LOCATION" value="{location}"/>'
+                    f'<generic:Value concept="SUBJECT" value="{subject}"/>'
+                    f'<generic:Value concept="MEASURE" value="{measure}"/>'
+                    f'</generic:SeriesKey>'
+                    f'<generic:Attributes><generic:Value concept="UNIT" value="{measure}"/></generic:Attributes>'
+                )
+                values = self._values(f"{dataset}_{location}_{subject}_{measure}", window.stop)[window].tolist()
+                parts.extend(
+                    f'<generic:Obs><generic:Time>{time}</generic:Time><generic:ObsValue value="{value}"/></generic:Obs>'
+                    for time, value in zip(times, values)
+                )
+                parts.append('</generic:Series>')
+            parts.append('</message:DataSet></message:GenericData>')
+            return ''.join(parts).encode('utf-8'), 'application/xml'
+
+        body = self._body(('oecd', dataset, key, frequency, start, end), render)
+        if body is None:
+            return web.Response(status=404)
+        return self._respond('oecd', *body)
+
+    async def banque_france(self, request: web.Request) -> web.Response:
+        error = await self._disturb('bdf')
+        if error is not None:
+            return error
+
+        series_id = request.match_info['series']
+        start, end = request.query.get('startPeriod'), request.query.get('endPeriod')
+
+        def render() -> Optional[Tuple[bytes, str]]:
+            fixture = self._fixture('bdf', f"{series_id}.json")
+            if fixture:
+                return fixture
+
+            # Code fréquence en deuxième position de la clé (BSI_M_..., ICP_M_...)
+            parts = series_id.split('_')
+            frequency = parts[1] if len(parts) > 1 and parts[1] in PERIODS_PER_YEAR else 'M'
+            periods, window = self._series_periods(frequency, start, end)
+            if not periods:
+                return None
+
+            values = self._values(f"bdf_{series_id}", window.stop)[window].tolist()
+            payload = {
+                'title': series_id,
+                'unit': '%',
+                'frequency': {'A': 'YEARLY', 'Q': 'QUARTERLY'}.get(frequency, 'MONTHLY'),
+                'last_update': LAST_UPDATE,
+                'observations': [{'period': period, 'value': value} for period, value in zip(periods, values)]
+            }
+            return json.dumps(payload).encode('utf-8'), 'application/json'
+
+        body = self._body(('bdf', series_id, start, end), render)
+        if body is None:
+            return web.Response(status=404)
+        return self._respond('bdf', *body)
+
+    # API REST Supabase (PostgREST)
+
+    @staticmethod
+    def _matches(row: Dict, filters: Dict[str, set]) -> bool:
+        return all(str(row.get(column)) in accepted for column, accepted in filters.items())
+
+    async def rest_select(self, request: web.Request) -> web.Response:
+        table = request.match_info['table']
+        self.stats['rest_reads'] += 1
+        stored = {'economic_data': self.rows, 'series': self.series}.get(table)
+        if stored is None:
+            return web.json_response([])
+
+        # Filtres PostgREST colonne=eq.x et colonne=in.(x,y)
+        filters = {}
+        for column, condition in request.query.items():
+            if condition.startswith('eq.'):
+                filters[column] = {condition[3:]}
+            elif condition.startswith('in.(') and condition.endswith(')'):
+                filters[column] = {value.strip('"') for value in condition[4:-1].split(',')}
+        if table == 'economic_data' and len(filters.get('series_key', ())) == 1 and 'period_key' in filters:
+            # Accès direct par clé (index unique series_key, period_key)
+            series_key = int(next(iter(filters.pop('series_key'))))
+            candidates = (stored.get((series_key, int(period))) for period in filters.pop('period_key'))
+        elif table == 'series' and 'series_id' in filters:
+            candidates = (stored.get(series_id) for series_id in filters.pop('series_id'))
+        else:
+            candidates = stored.values()
+        rows = [row for row in candidates if row is not None and self._matches(row, filters)]
+
+        select = request.query.get('select', '*')
+        if select != '*':
+            columns = select.split(',')
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+        return web.json_response(rows)
+
+    async def rest_write(self, request: web.Request) -> web.Response:
+        table = request.match_info['table']
+        error = await self._disturb('rest')
+        if error is not None:
+            return error
+
+        payload = json.loads(await request.read())
+        rows = payload if isinstance(payload, list) else [payload]
+        self.stats['rest_rows'] += len(rows)
+        if table == 'economic_data':
+            for row in rows:
+                self.rows[(row['series_key'], row['period_key'])] = row
+        elif table == 'series':
+            for row in rows:
+                known = self.series.get(row['series_id'])
+                key = known['series_key'] if known else len(self.series) + 1
+                self.series[row['series_id']] = {**row, 'series_key': key}
+            if 'return=representation' in request.headers.get('Prefer', ''):
+                return web.json_response([self.series[row['series_id']] for row in rows], status=201)
+        return web.Response(status=201)
+
+    async def rest_update(self, request: web.Request) -> web.Response:
+        self.stats['rest_updates'] += 1
+        return web.Response(status=204)
+
+    async def rest_rpc(self, request: web.Request) -> web.Response:
+        # purge_superseded_economic_data : les lignes conservées ont toutes une clé
+        self.stats['rest_rpc'] += 1
+        return web.json_response(0)
+
+
+    # Pilotage (processus de mesure séparés)
+
+    async def control_reset(self, request: web.Request) -> web.Response:
+        self.reset()
+        return web.Response(status=204)
+
+    async def control_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats))
+
+
+async def serve(config: MockConfig, host: str, port: int):
+    server = MockSourceServer(config, host, port)
+    await server.start()
+    for name, value in server.environment().items():
+        print(f"export {name}={value}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    """Serveur autonome : lancer les scripts avec les variables affichées"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Sources de données simulées (hors ligne)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--series', type=int, default=20, help='Séries par jeu de données')
+    parser.add_argument('--first-year', type=int, default=1990)
+    parser.add_argument('--last-year', type=int, default=2024)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Latence ajoutée à chaque réponse')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='Part des requêtes refusées en 429')
+    parser.add_argument('--rate-5xx', type=float, default=0.0, help='Part des requêtes en erreur serveur')
+    parser.add_argument('--fixtures', default=None, help='Réponses enregistrées ({source}/{nom}.json|xml)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--catalogue-series', type=int, default=1000, help='Séries du catalogue INSEE simulé')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    config = MockConfig(
+        series=args.series,
+        first_year=args.first_year,
+        last_year=args.last_year,
+        latency=args.latency_ms / 1000,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        seed=args.seed,
+        fixtures_dir=args.fixtures,
+        catalogue_series=args.catalogue_series
+    )
+    try:
+        asyncio.run(serve(config, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
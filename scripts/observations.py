@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+🧱 Observations - Lot d'observations en colonnes
+Valeurs dans un tableau NumPy, tout le reste (série, dates, sources, unités,
+métadonnées...) en colonnes catégorielles : chaque chaîne n'est stockée
+qu'une fois quel que soit le nombre de lignes. La clé d'une ligne en base
+(series_key, period_key) n'est calculée qu'au moment de l'écriture
+"""
+
+import base64
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from periods import PERIOD_CODEC, frequency_names, period_keys, period_start_dates
+
+# Colonnes catégorielles d'une observation (hors clés et value)
+CATEGORICAL_COLUMNS = ('indicator', 'date', 'source', 'unit', 'frequency', 'geography', 'category')
+
+# Séparateur des clés de métadonnées imbriquées ({'series_key': {'LOCATION': ...}})
+METADATA_SEPARATOR = '.'
+
+ColumnInput = Union[Any, Sequence, np.ndarray, pd.Categorical]
+
+
+def to_categorical(values: ColumnInput, size: int) -> pd.Categorical:
+    """Colonne catégorielle depuis un scalaire (répété) ou un tableau de même longueur"""
+    if isinstance(values, pd.Categorical):
+        return values
+    if isinstance(values, (list, tuple, np.ndarray, pd.Series)):
+        return pd.Categorical(values)
+    if values is None:
+        return pd.Categorical.from_codes(np.full(size, -1, dtype=np.int8), categories=[])
+    return pd.Categorical.from_codes(np.zeros(size, dtype=np.int8), categories=[values])
+
+
+def period_frequencies(dates: pd.Categorical) -> pd.Categorical:
+    """Fréquence (YEARLY, QUARTERLY...) déduite de chaque période, encodée une fois par date distincte"""
+    codes, _ = PERIOD_CODEC.encode_values(list(dates.categories))
+    name_codes, names = pd.factorize(pd.Series(frequency_names(codes), dtype=object), use_na_sentinel=True)
+    row_codes = np.append(name_codes, -1)[dates.codes]
+    return pd.Categorical.from_codes(row_codes, categories=names)
+
+
+def _category_values(column: pd.Categorical) -> np.ndarray:
+    """Catégories en objets Python, suivies de None pour le code -1 (valeur absente)"""
+    return np.array(column.categories.tolist() + [None], dtype=object)
+
+
+def period_start_values(dates: pd.Categorical) -> np.ndarray:
+    """
+    Colonne DATE de economic_data : premier jour ISO de chaque période des
+    catégories (2024-Q2 -> 2024-04-01), suivi de None pour le code -1 ; None si illisible
+    """
+    starts = period_start_dates(*PERIOD_CODEC.encode_values(list(dates.categories)))
+    values = np.datetime_as_string(starts, unit='D').astype(object)
+    values[np.isnat(starts)] = None
+    return np.append(values, None)
+
+
+def _encode_array(values: np.ndarray) -> Dict[str, str]:
+    """Tableau NumPy en texte (base64 des octets bruts) pour les payloads JSON"""
+    return {'dtype': values.dtype.str, 'data': base64.b64encode(np.ascontiguousarray(values).tobytes()).decode('ascii')}
+
+
+def _decode_array(encoded: Dict[str, str]) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(encoded['data']), dtype=np.dtype(encoded['dtype']))
+
+
+def _nest(items) -> Dict:
+    """Dictionnaire de métadonnées (clés imbriquées restaurées, valeurs absentes omises)"""
+    document = {}
+    for key, value in items:
+        if value is None:
+            continue
+        path = key.split(METADATA_SEPARATOR)
+        target = document
+        for part in path[:-1]:
+            target = target.setdefault(part, {})
+        target[path[-1]] = value
+    return document
+
+
+def combinations(codes: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Combinaisons distinctes de colonnes de codes catégoriels : retourne
+    (indice de la combinaison pour chaque ligne, première ligne de chaque combinaison).
+    """
+    key = np.zeros(len(codes[0]), dtype=np.int64)
+    for column_codes in codes:
+        # Refactoriser à chaque colonne pour rester dans les bornes d'int64
+        radix = int(column_codes.max(initial=-1)) + 2
+        key = pd.factorize(key * radix + column_codes + 1)[0]
+    first_rows = np.unique(key, return_index=True)[1]
+    return key, first_rows
+
+
+def _flatten(metadata: Dict, prefix: str = '') -> Iterator:
+    for key, value in metadata.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}{METADATA_SEPARATOR}")
+        else:
+            yield f"{prefix}{key}", value
+
+
+@dataclass
+class ObservationBatch:
+    """
+    Lot d'observations stocké en colonnes.
+
+    Produit par les parsers, consommé par la validation et écrit par la
+    persistance ; les dictionnaires ligne à ligne attendus par Supabase ne
+    sont matérialisés que par tranches (iter_records).
+    """
+    series_ids: pd.Categorical
+    values: np.ndarray
+    columns: Dict[str, pd.Categorical]
+    metadata: Dict[str, pd.Categorical] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def duplicated(self) -> np.ndarray:
+        """Lignes dont la clé (série, date) est déjà apparue, calculé sur les codes"""
+        dates = self.columns['date']
+        keys = self.series_ids.codes.astype(np.int64) * (len(dates.categories) + 1) + dates.codes
+        return pd.Series(keys).duplicated().to_numpy()
+
+    @classmethod
+    def empty(cls) -> 'ObservationBatch':
+        return cls.from_columns([], [])
+
+    @classmethod
+    def from_columns(
+        cls,
+        series_ids: ColumnInput,
+        values: Sequence[float],
+        metadata: Optional[Dict[str, ColumnInput]] = None,
+        **columns: ColumnInput
+    ) -> 'ObservationBatch':
+        """Construire un lot ; chaque colonne est un scalaire ou un tableau aligné sur values"""
+        values = np.asarray(values, dtype=np.float64)
+        size = len(values)
+        return cls(
+            series_ids=to_categorical(series_ids, size),
+            values=values,
+            columns={name: to_categorical(columns.get(name), size) for name in CATEGORICAL_COLUMNS},
+            metadata={
+                key: to_categorical(value, size)
+                for key, value in _flatten(metadata or {})
+            }
+        )
+
+    @classmethod
+    def concat(cls, batches: Sequence['ObservationBatch']) -> 'ObservationBatch':
+        """Concaténer des lots (catégories fusionnées, métadonnées absentes = None)"""
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+
+        keys = list(dict.fromkeys(key for batch in batches for key in batch.metadata))
+
+        def merged(parts: List[pd.Categorical]) -> pd.Categorical:
+            # union_categoricals exige des catégories de même type
+            if len({part.categories.dtype for part in parts}) > 1:
+                parts = [
+                    pd.Categorical.from_codes(part.codes, categories=part.categories.astype(object))
+                    for part in parts
+                ]
+            return union_categoricals(parts, ignore_order=True)
+
+        return cls(
+            series_ids=merged([batch.series_ids for batch in batches]),
+            values=np.concatenate([batch.values for batch in batches]),
+            columns={
+                name: merged([batch.columns[name] for batch in batches])
+                for name in CATEGORICAL_COLUMNS
+            },
+            metadata={
+                key: merged([
+                    batch.metadata[key] if key in batch.metadata else to_categorical(None, len(batch))
+                    for batch in batches
+                ])
+                for key in keys
+            }
+        )
+
+    def take(self, indexer: np.ndarray) -> 'ObservationBatch':
+        """Sous-ensemble de lignes (masque booléen ou positions)"""
+        return ObservationBatch(
+            series_ids=self.series_ids[indexer],
+            values=self.values[indexer],
+            columns={name: column[indexer] for name, column in self.columns.items()},
+            metadata={key: column[indexer] for key, column in self.metadata.items()}
+        )
+
+    def with_metadata(self, key: str, values: ColumnInput) -> 'ObservationBatch':
+        """Copie légère du lot avec une colonne de métadonnées en plus"""
+        return ObservationBatch(
+            series_ids=self.series_ids,
+            values=self.values,
+            columns=self.columns,
+            metadata={**self.metadata, key: to_categorical(values, len(self))}
+        )
+
+    def with_period_frequencies(self) -> 'ObservationBatch':
+        """Copie légère du lot dont la fréquence est déduite des périodes"""
+        return ObservationBatch(
+            series_ids=self.series_ids,
+            values=self.values,
+            columns={**self.columns, 'frequency': period_frequencies(self.columns['date'])},
+            metadata=self.metadata
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """Vue DataFrame (value, series_id + colonnes catégorielles) pour les calculs vectorisés"""
+        return pd.DataFrame({'value': self.values, 'series_id': self.series_ids, **self.columns}, copy=False)
+
+    def period_keys(self) -> np.ndarray:
+        """Clé de période (int32) de chaque ligne, encodée une fois par date distincte"""
+        return period_keys(*PERIOD_CODEC.encode(self.columns['date']))
+
+    def row_series_keys(self, series_keys: np.ndarray) -> np.ndarray:
+        """Clé de série de chaque ligne, series_keys étant aligné sur les catégories de series_ids"""
+        return np.append(np.asarray(series_keys, dtype=np.int32), np.int32(-1))[self.series_ids.codes]
+
+    def iter_records(self, series_keys: np.ndarray, chunk_size: int = 10000) -> Iterator[List[Dict]]:
+        """Dictionnaires au format economic_data (clés entières), matérialisés par tranches"""
+        column_values = {name: _category_values(column) for name, column in self.columns.items()}
+        column_values['date'] = period_start_values(self.columns['date'])
+        metadata_values = {key: _category_values(column) for key, column in self.metadata.items()}
+        row_series = self.row_series_keys(series_keys)
+        row_periods = self.period_keys()
+
+        for start in range(0, len(self), chunk_size):
+            stop = start + chunk_size
+            series_slice = row_series[start:stop].tolist()
+            period_slice = row_periods[start:stop].tolist()
+            columns = {
+                name: column_values[name][self.columns[name].codes[start:stop]]
+                for name in CATEGORICAL_COLUMNS
+            }
+            metadata = [
+                (key, metadata_values[key][column.codes[start:stop]])
+                for key, column in self.metadata.items()
+            ]
+
+            records = []
+            for i, value in enumerate(self.values[start:stop].tolist()):
+                record = {'series_key': series_slice[i], 'period_key': period_slice[i], 'value': value}
+                for name in CATEGORICAL_COLUMNS:
+                    record[name] = columns[name][i]
+                record['metadata'] = _nest((key, meta_values[i]) for key, meta_values in metadata)
+                records.append(record)
+            yield records
+
+    def metadata_documents(self, start: int, stop: int) -> Tuple[np.ndarray, List[Dict]]:
+        """
+        Métadonnées d'une tranche, une seule fois par combinaison distincte :
+        retourne (indice du document par ligne, documents).
+        """
+        size = len(self.values[start:stop])
+        if not self.metadata:
+            return np.zeros(size, dtype=np.intp), [{}]
+
+        keys = list(self.metadata)
+        codes = [self.metadata[key].codes[start:stop] for key in keys]
+        inverse, first_rows = combinations(codes)
+        values = [_category_values(self.metadata[key]) for key in keys]
+
+        documents = [
+            _nest((key, column_values[column_codes[row]]) for key, column_values, column_codes in zip(keys, values, codes))
+            for row in first_rows
+        ]
+        return inverse, documents
+
+    def to_records(self, series_keys: np.ndarray) -> List[Dict]:
+        """Toutes les lignes en dictionnaires (petits lots uniquement)"""
+        return [record for chunk in self.iter_records(series_keys) for record in chunk]
+
+    def to_payload(self) -> Optional[Dict]:
+        """Forme JSON compacte (cache, response store), None si le lot est vide"""
+        if not len(self):
+            return None
+
+        def encode(column: pd.Categorical) -> Dict:
+            return {'categories': column.categories.tolist(), 'codes': _encode_array(column.codes)}
+
+        return {
+            'series_ids': encode(self.series_ids),
+            'values': _encode_array(self.values),
+            'columns': {name: encode(column) for name, column in self.columns.items()},
+            'metadata': {key: encode(column) for key, column in self.metadata.items()}
+        }
+
+    @staticmethod
+    def is_payload(payload: Any) -> bool:
+        """Vrai si payload provient de to_payload (et non d'un format antérieur)"""
+        return isinstance(payload, dict) and 'series_ids' in payload
+
+    @classmethod
+    def from_payload(cls, payload: Optional[Dict]) -> 'ObservationBatch':
+        """Inverse de to_payload"""
+        if not payload:
+            return cls.empty()
+
+        def decode(encoded: Dict) -> pd.Categorical:
+            return pd.Categorical.from_codes(
+                _decode_array(encoded['codes']),
+                categories=pd.Index(encoded['categories'], dtype=object)
+            )
+
+        return cls(
+            series_ids=decode(payload['series_ids']),
+            values=_decode_array(payload['values']).copy(),
+            columns={name: decode(encoded) for name, encoded in payload['columns'].items()},
+            metadata={key: decode(encoded) for key, encoded in payload['metadata'].items()}
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Empreinte mémoire approximative des colonnes"""
+        categorical = [self.series_ids, *self.columns.values(), *self.metadata.values()]
+        return int(self.values.nbytes + sum(column.memory_usage(deep=True) for column in categorical))
+
+
+class ObservationBuilder:
+    """
+    Accumulateur ligne à ligne pour les parsers en flux : chaque valeur est
+    encodée immédiatement en code entier, les dictionnaires reçus ne sont
+    pas conservés.
+    """
+
+    def __init__(self):
+        self._values = array('d')
+        self._series_codes = array('i')
+        self._series_categories: Dict[str, int] = {}
+        self._codes: Dict[str, array] = {name: array('i') for name in CATEGORICAL_COLUMNS}
+        self._categories: Dict[str, Dict[Any, int]] = {name: {} for name in CATEGORICAL_COLUMNS}
+        self._metadata_codes: Dict[str, array] = {}
+        self._metadata_categories: Dict[str, Dict[Any, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    @staticmethod
+    def _code(categories: Dict[Any, int], value: Any) -> int:
+        if value is None:
+            return -1
+        code = categories.get(value)
+        if code is None:
+            code = categories[value] = len(categories)
+        return code
+
+    def append(self, record: Dict):
+        """Ajouter une observation au format dictionnaire (series_id, value, colonnes, metadata)"""
+        size = len(self._values)
+        self._values.append(float(record['value']))
+        self._series_codes.append(self._code(self._series_categories, record['series_id']))
+
+        for name in CATEGORICAL_COLUMNS:
+            self._codes[name].append(self._code(self._categories[name], record.get(name)))
+
+        seen = set()
+        for key, value in _flatten(record.get('metadata') or {}):
+            codes = self._metadata_codes.get(key)
+            if codes is None:
+                # Colonne apparue en cours de route : lignes précédentes sans valeur
+                codes = self._metadata_codes[key] = array('i', [-1]) * size
+                self._metadata_categories[key] = {}
+            codes.append(self._code(self._metadata_categories[key], value))
+            seen.add(key)
+
+        if len(seen) < len(self._metadata_codes):
+            for key, codes in self._metadata_codes.items():
+                if key not in seen:
+                    codes.append(-1)
+
+    def build(self) -> ObservationBatch:
+        """Lot en colonnes (le builder peut ensuite être abandonné)"""
+
+        def categorical(codes: array, categories: Dict[Any, int]) -> pd.Categorical:
+            return pd.Categorical.from_codes(
+                np.frombuffer(codes, dtype=np.int32) if len(codes) else np.empty(0, dtype=np.int32),
+                categories=pd.Index(list(categories), dtype=object)
+            )
+
+        return ObservationBatch(
+            series_ids=categorical(self._series_codes, self._series_categories),
+            values=np.frombuffer(self._values, dtype=np.float64).copy() if len(self._values) else np.empty(0),
+            columns={
+                name: categorical(self._codes[name], self._categories[name])
+                for name in CATEGORICAL_COLUMNS
+            },
+            metadata={
+                key: categorical(codes, self._metadata_categories[key])
+                for key, codes in self._metadata_codes.items()
+            }
+        )
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+⚙️ Pool de parsing - Décodage des gros corps de réponse hors de la boucle asyncio
+Au-delà d'un seuil, le corps brut est déposé dans un fichier de spool (tmpfs
+/dev/shm si disponible) qu'un processus du pool lit par mmap : aucun octet du
+corps ne passe par pickle, seul le lot en colonnes revient. La boucle continue
+de servir les téléchargements pendant que les parsings occupent tous les cœurs
+"""
+
+import asyncio
+import logging
+import mmap
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Spool en mémoire partagée quand le système en propose une
+DEFAULT_SPOOL_DIR = '/dev/shm' if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK) else None
+
+
+def _parse_spooled(path: str, parse: Callable, kwargs: Dict[str, Any]) -> Any:
+    """Exécuté dans un processus du pool : parse(corps, **kwargs), corps projeté par mmap"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return parse(b'', **kwargs)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as body:
+            return parse(body, **kwargs)
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+class ParseExecutor:
+    """
+    Parsing sur place sous min_bytes, dans un pool de processus au-delà.
+
+    Les fonctions de parsing doivent être définies au niveau d'un module
+    (ex. source_parsers) pour être transmises aux processus. Un processus
+    du pool tué (mémoire...) n'interrompt pas l'exécution : le parsing est
+    rejoué dans un thread et le pool recréé à l'appel suivant.
+    """
+
+    def __init__(self, workers: Optional[int] = None, min_bytes: Optional[int] = None, spool_dir: Optional[str] = None):
+        # Un cœur reste à la boucle : sur une machine mono-cœur, le pool n'apporterait que ses coûts
+        self.workers = int(workers if workers is not None else os.getenv('PARSE_WORKERS', (os.cpu_count() or 1) - 1))
+        self.min_bytes = int(min_bytes if min_bytes is not None else os.getenv('PARSE_POOL_MIN_BYTES', 1024 * 1024))
+        self.spool_dir = spool_dir or os.getenv('PARSE_SPOOL_DIR') or DEFAULT_SPOOL_DIR
+        self.stats = {'inline': 0, 'pooled': 0, 'pooled_bytes': 0, 'fallbacks': 0}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def should_offload(self, size: int) -> bool:
+        """Vrai si un corps de cette taille doit être parsé dans le pool (PARSE_WORKERS=0 : jamais)"""
+        return self.workers > 0 and size >= self.min_bytes
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            return self._create_pool() if self._pool is None else self._pool
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            # Processus neufs, sans les threads du parent (boucles, serveur de métriques),
+            # parsers importés une fois dans le serveur de fork
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['source_parsers'])
+        else:
+            context = multiprocessing.get_context('spawn')
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._pool
+
+    def start(self):
+        """
+        Démarrer les processus dans un thread (le démarrage du serveur de fork
+        est bloquant), à appeler avant les premiers téléchargements
+        """
+        if self.workers <= 0 or self._pool is not None:
+            return
+
+        def spawn():
+            pool = self._get_pool()
+            for _ in range(self.workers):
+                pool.submit(_ready)
+
+        threading.Thread(target=spawn, name='parse-pool-start', daemon=True).start()
+
+    def spool(self):
+        """Fichier recevant un corps destiné au pool (supprimé par parse_spooled)"""
+        return tempfile.NamedTemporaryFile(prefix='parse-', suffix='.body', dir=self.spool_dir, delete=False)
+
+    async def parse(self, body: bytes, parse: Callable, **kwargs) -> Any:
+        """parse(body, **kwargs), sur place ou dans le pool selon la taille du corps"""
+        if not self.should_offload(len(body)):
+            self.stats['inline'] += 1
+            return parse(body, **kwargs)
+
+        with self.spool() as spool:
+            spool.write(body)
+        return await self.parse_spooled(spool.name, parse, **kwargs)
+
+    async def parse_spooled(self, path: str, parse: Callable, **kwargs) -> Any:
+        """parse(contenu du fichier, **kwargs) dans le pool, puis suppression du fichier"""
+        try:
+            size = os.path.getsize(path)
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self._get_pool(), _parse_spooled, path, parse, kwargs
+                )
+            except BrokenProcessPool as e:
+                logger.warning(f"⚠️ Pool de parsing interrompu ({e}), parsing dans un thread")
+                self._pool = None
+                self.stats['fallbacks'] += 1
+                return await asyncio.to_thread(_parse_spooled, path, parse, kwargs)
+
+            self.stats['pooled'] += 1
+            self.stats['pooled_bytes'] += size
+            return result
+        finally:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        """Arrêter les processus du pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+🧩 Parsers - Décodage des formats statistiques (JSON-stat, SDMX-ML)
+Fonctions pures, sans état, utilisables depuis n'importe quel pipeline
+"""
+
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+
+def _category_codes(dimension: Dict, size: int) -> np.ndarray:
+    """Codes d'une dimension JSON-stat rangés selon leur position"""
+    index = dimension.get('category', {}).get('index')
+
+    if index is None:
+        # Dimension à catégorie unique sans index explicite
+        labels = list(dimension.get('category', {}).get('label', {}).keys())
+        codes = labels if len(labels) == size else [str(i) for i in range(size)]
+    elif isinstance(index, list):
+        codes = index
+    else:
+        codes = [None] * size
+        for code, position in index.items():
+            codes[position] = code
+
+    return np.array(codes, dtype=object)
+
+
+def decode_jsonstat(data: Dict) -> Dict[str, np.ndarray]:
+    """
+    Décoder un dataset JSON-stat 2.0 en colonnes.
+
+    Gère un nombre et un ordre quelconques de dimensions (ordre donné par
+    'id'/'size'), ainsi que les valeurs denses (liste) ou creuses (dict
+    {index_plat: valeur}). Les cellules vides sont écartées.
+
+    Retourne {dimension: codes, 'value': float64, 'status': codes|None}.
+    """
+    dimension_ids: List[str] = data.get('id') or list(data['dimension'].keys())
+    sizes = data.get('size') or [
+        len(data['dimension'][dim]['category']['index']) for dim in dimension_ids
+    ]
+    values = data.get('value', [])
+
+    if isinstance(values, dict):
+        flat_index = np.fromiter((int(k) for k in values.keys()), dtype=np.int64, count=len(values))
+        cell_values = np.fromiter(
+            (np.nan if v is None else v for v in values.values()), dtype=np.float64, count=len(values)
+        )
+    else:
+        cell_values = np.array(values, dtype=np.float64)
+        flat_index = np.arange(len(cell_values), dtype=np.int64)
+
+    # Ne garder que les cellules renseignées et dans les bornes du cube
+    total = int(np.prod(sizes, dtype=np.int64))
+    mask = ~np.isnan(cell_values) & (flat_index < total)
+    flat_index = flat_index[mask]
+    cell_values = cell_values[mask]
+
+    coordinates = np.unravel_index(flat_index, sizes)
+    columns = {
+        dim: _category_codes(data['dimension'][dim], size)[coords]
+        for dim, size, coords in zip(dimension_ids, sizes, coordinates)
+    }
+    columns['value'] = cell_values
+
+    status = data.get('status')
+    if isinstance(status, dict) and status:
+        status_index = np.fromiter((int(k) for k in status.keys()), dtype=np.int64, count=len(status))
+        status_codes = np.array(list(status.values()) + [None], dtype=object)
+        order = np.argsort(status_index)
+        status_index = status_index[order]
+        positions = np.searchsorted(status_index, flat_index)
+        found = positions < len(status_index)
+        found[found] = status_index[positions[found]] == flat_index[found]
+        columns['status'] = status_codes[np.where(found, order[np.minimum(positions, len(order) - 1)], -1)]
+    elif isinstance(status, list) and status:
+        columns['status'] = np.array(status, dtype=object)[flat_index]
+    else:
+        columns['status'] = None
+
+    return columns
+
+
+def _local_name(tag: str) -> str:
+    """Nom d'élément XML sans namespace"""
+    return tag.rsplit('}', 1)[-1]
+
+
+class SDMXStreamParser:
+    """
+    Parser SDMX-ML incrémental (generic 2.0/2.1 et structure-specific).
+
+    Les octets sont fournis morceau par morceau via feed(), qui retourne les
+    observations terminées ; les éléments Obs et Series sont libérés dès leur
+    fermeture pour que la mémoire reste constante quelle que soit la taille
+    de la réponse. Chaque observation porte la clé de sa série.
+    """
+
+    TIME_ELEMENTS = ('ObsTime', 'Time', 'ObsDimension')
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._names: Dict[str, str] = {}
+        self._dataset: Optional[ET.Element] = None
+        self._series: Optional[ET.Element] = None
+        self._in_obs = False
+        self._series_key: Dict[str, str] = {}
+        self._series_attributes: Dict[str, str] = {}
+        self.observation_count = 0
+
+    def feed(self, chunk: bytes) -> List[Dict]:
+        """Consommer un morceau de réponse et retourner les observations complètes"""
+        self._parser.feed(chunk)
+        return list(self._drain())
+
+    def close(self) -> List[Dict]:
+        """Terminer le flux et retourner les dernières observations"""
+        self._parser.close()
+        return list(self._drain())
+
+    def _drain(self) -> Iterator[Dict]:
+        names = self._names
+
+        for event, elem in self._parser.read_events():
+            tag = elem.tag
+            name = names.get(tag)
+            if name is None:
+                name = names[tag] = _local_name(tag)
+
+            if event == 'start':
+                if name == 'Obs':
+                    self._in_obs = True
+                elif name == 'Series':
+                    # Structure-specific : la clé est portée par les attributs
+                    self._series = elem
+                    self._series_key = dict(elem.attrib)
+                    self._series_attributes = {}
+                elif name == 'DataSet':
+                    self._dataset = elem
+                continue
+
+            if name == 'Obs':
+                self._in_obs = False
+                observation = self._read_observation(elem)
+                if self._series is not None:
+                    self._series.remove(elem)
+                elem.clear()
+                if observation is not None:
+                    self.observation_count += 1
+                    yield observation
+
+            elif name == 'SeriesKey':
+                for value in elem:
+                    self._series_key[value.get('id') or value.get('concept')] = value.get('value')
+
+            elif name == 'Attributes' and not self._in_obs and self._series is not None:
+                for value in elem:
+                    self._series_attributes[value.get('id') or value.get('concept')] = value.get('value')
+
+            elif name == 'Series':
+                self._series = None
+                self._series_key = {}
+                self._series_attributes = {}
+                if self._dataset is not None:
+                    self._dataset.remove(elem)
+                elem.clear()
+
+    def _read_observation(self, obs: ET.Element) -> Optional[Dict]:
+        """Extraire période, valeur et attributs d'un élément Obs"""
+        time_period = obs.get('TIME_PERIOD')
+        value = obs.get('OBS_VALUE')
+        attributes = {
+            k: v for k, v in obs.attrib.items() if k not in ('TIME_PERIOD', 'OBS_VALUE')
+        }
+
+        for child in obs:
+            name = _local_name(child.tag)
+            if name in self.TIME_ELEMENTS:
+                time_period = child.get('value') or (child.text or '').strip()
+            elif name == 'ObsValue':
+                value = child.get('value')
+            elif name == 'Attributes':
+                for attr in child:
+                    attributes[attr.get('id') or attr.get('concept')] = attr.get('value')
+
+        if not time_period or value in (None, '', 'NaN'):
+            return None
+
+        return {
+            'series_key': dict(self._series_key),
+            'series_attributes': dict(self._series_attributes),
+            'time': time_period,
+            'value': value,
+            'attributes': attributes
+        }
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+📅 Périodes - Manipulation des périodes statistiques
+Formats INSEE/SDMX : 2024, 2024-S1, 2024-Q1, 2024-05, 2024-05-31
+(et variantes SDMX compactes 2024Q1, 2024M05)
+"""
+
+import re
+import threading
+from datetime import date
+from functools import lru_cache
+from typing import Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+PERIOD_PATTERN = re.compile(
+    r'^(\d{4})(?:-?(Q)([1-4])|-?(S)([12])|(?:-|-?M)(\d{2})(?:-(\d{2}))?)?$'
+)
+
+# Nombre de sous-périodes par an pour chaque code de fréquence
+PERIODS_PER_YEAR = {'A': 1, 'S': 2, 'Q': 4, 'M': 12}
+
+# Codes entiers des fréquences (0 : période illisible) et libellés economic_data
+FREQUENCY_CODES = ('', 'A', 'S', 'Q', 'M', 'D')
+FREQUENCY_NAMES = {'A': 'YEARLY', 'S': 'SEMIANNUAL', 'Q': 'QUARTERLY', 'M': 'MONTHLY', 'D': 'DAILY'}
+INVALID_PERIOD = 0
+
+# Clé de période economic_data : ordinal * 8 + code fréquence (entier 32 bits,
+# unique toutes fréquences confondues, -1 si illisible)
+PERIOD_KEY_BITS = 3
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+@lru_cache(maxsize=65536)
+def parse_period(period: str) -> Optional[Tuple[str, int]]:
+    """Convertir une période en (code fréquence, ordinal entier), None si illisible"""
+    match = PERIOD_PATTERN.match(period.strip()) if period else None
+    if not match:
+        return None
+
+    year, _, quarter, _, semester, month, day = match.groups()
+    year = int(year)
+
+    if quarter:
+        return 'Q', year * 4 + int(quarter) - 1
+    if semester:
+        return 'S', year * 2 + int(semester) - 1
+    if month and not 1 <= int(month) <= 12:
+        return None
+    if month and day:
+        try:
+            return 'D', date(year, int(month), int(day)).toordinal()
+        except ValueError:
+            return None
+    if month:
+        return 'M', year * 12 + int(month) - 1
+    return 'A', year
+
+
+class PeriodCodec:
+    """
+    Encodage de colonnes de périodes en (code fréquence int8, clé int32).
+
+    Chaque chaîne distincte n'est analysée qu'une fois (mémo partagé entre
+    les lots) ; une colonne catégorielle n'est jamais parcourue ligne à
+    ligne : seules ses catégories sont encodées, puis projetées sur les codes.
+    Les horodatages ISO complets (2024-05-31T00:00:00) sont acceptés comme
+    périodes quotidiennes. Clés comparables entre périodes de même fréquence.
+    """
+
+    def __init__(self, max_entries: int = 1_000_000):
+        self.max_entries = max_entries
+        self._frequencies = {}  # chaîne -> code fréquence
+        self._keys = {}  # chaîne -> clé
+        self._lock = threading.Lock()
+
+    def _encode_new(self, values: Sequence[str]):
+        """Encoder et mémoriser des chaînes absentes du mémo"""
+        parsed = [parse_period(value) for value in values]
+
+        # Dernier recours, vectorisé : horodatages complets
+        fallback = [value for value, result in zip(values, parsed) if result is None]
+        timestamps = {}
+        if fallback:
+            converted = pd.to_datetime(pd.Series(fallback, dtype=object), errors='coerce', format='ISO8601')
+            timestamps = {
+                value: stamp.date().toordinal()
+                for value, stamp in zip(fallback, converted)
+                if not pd.isna(stamp)
+            }
+
+        frequencies = {}
+        keys = {}
+        for value, result in zip(values, parsed):
+            if result is not None:
+                frequencies[value], keys[value] = FREQUENCY_CODES.index(result[0]), result[1]
+            elif value in timestamps:
+                frequencies[value], keys[value] = FREQUENCY_CODES.index('D'), timestamps[value]
+            else:
+                frequencies[value], keys[value] = INVALID_PERIOD, -1
+
+        with self._lock:
+            if len(self._keys) + len(keys) > self.max_entries:
+                self._frequencies, self._keys = {}, {}
+            self._frequencies.update(frequencies)
+            self._keys.update(keys)
+        return frequencies, keys
+
+    def encode_values(self, values: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+        """(codes fréquence, clés) d'une suite de valeurs, doublons compris (lecture du mémo en C)"""
+        if not all(isinstance(value, str) for value in values):
+            values = ['' if value is None else str(value) for value in values]
+
+        missing = [value for value in dict.fromkeys(values) if value not in self._keys]
+        new_frequencies, new_keys = self._encode_new(missing) if missing else ({}, {})
+
+        try:
+            return self._lookup(self._frequencies, self._keys, values)
+        except KeyError:
+            # Mémo vidé entre-temps par un autre thread (plafond atteint)
+            return self._lookup({**self._frequencies, **new_frequencies}, {**self._keys, **new_keys}, values)
+
+    @staticmethod
+    def _lookup(frequencies: dict, keys: dict, values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        return (
+            np.fromiter(map(frequencies.__getitem__, values), dtype=np.int8, count=len(values)),
+            np.fromiter(map(keys.__getitem__, values), dtype=np.int32, count=len(values))
+        )
+
+    def encode(self, column: Union[pd.Categorical, pd.Series, Sequence]) -> Tuple[np.ndarray, np.ndarray]:
+        """(codes fréquence, clés) ligne à ligne ; valeur absente ou illisible : code 0, clé -1"""
+        if isinstance(column, pd.Series) and isinstance(column.dtype, pd.CategoricalDtype):
+            column = column.array
+        if not isinstance(column, pd.Categorical):
+            return self.encode_values(list(column))
+
+        frequencies, keys = self.encode_values(list(column.categories))
+        # Code -1 (absent) : dernière position, période illisible
+        frequencies = np.append(frequencies, np.int8(INVALID_PERIOD))
+        keys = np.append(keys, np.int32(-1))
+        return frequencies[column.codes], keys[column.codes]
+
+
+PERIOD_CODEC = PeriodCodec()
+
+
+def encode_periods(column) -> Tuple[np.ndarray, np.ndarray]:
+    """Encodage d'une colonne de périodes avec le codec partagé du processus"""
+    return PERIOD_CODEC.encode(column)
+
+
+def frequency_names(frequencies: np.ndarray) -> np.ndarray:
+    """Libellés de fréquence (YEARLY, QUARTERLY...) des codes, None si illisible"""
+    labels = np.array([None] + [FREQUENCY_NAMES[code] for code in FREQUENCY_CODES[1:]], dtype=object)
+    return labels[frequencies]
+
+
+def period_keys(frequencies: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """Clés de période compactes (int32) des couples (code fréquence, clé)"""
+    combined = (keys.astype(np.int32) << PERIOD_KEY_BITS) | frequencies.astype(np.int32)
+    combined[frequencies == INVALID_PERIOD] = -1
+    return combined
+
+
+def period_start_dates(frequencies: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """Premier jour de chaque période (datetime64[D], NaT si illisible), sans boucle Python"""
+    keys = keys.astype(np.int64)
+    months = np.zeros(len(keys), dtype=np.int64)  # mois depuis 1970-01
+    for code, periods_per_year in PERIODS_PER_YEAR.items():
+        mask = frequencies == FREQUENCY_CODES.index(code)
+        year, index = np.divmod(keys[mask], periods_per_year)
+        months[mask] = (year - 1970) * 12 + index * (12 // periods_per_year)
+
+    starts = months.astype('datetime64[M]').astype('datetime64[D]')
+    daily = frequencies == FREQUENCY_CODES.index('D')
+    starts[daily] = (keys[daily] - _EPOCH_ORDINAL).astype('datetime64[D]')
+    starts[frequencies == INVALID_PERIOD] = np.datetime64('NaT')
+    return starts
+
+
+def format_period(frequency: str, ordinal: int) -> str:
+    """Reconstituer la période textuelle depuis son ordinal"""
+    if frequency == 'D':
+        return date.fromordinal(ordinal).isoformat()
+    if frequency == 'A':
+        return str(ordinal)
+
+    year, index = divmod(ordinal, PERIODS_PER_YEAR[frequency])
+    if frequency == 'M':
+        return f"{year}-{index + 1:02d}"
+    return f"{year}-{frequency}{index + 1}"
+
+
+def shift_period(period: str, periods: int) -> str:
+    """Décaler une période de n sous-périodes (négatif = vers le passé)"""
+    parsed = parse_period(period)
+    if parsed is None:
+        return period
+
+    frequency, ordinal = parsed
+    return format_period(frequency, ordinal + periods)
+
+
+def latest_period(periods: Iterable[str]) -> Optional[str]:
+    """Période la plus récente d'une liste (formats homogènes)"""
+    latest = None
+    latest_key = None
+
+    for period in periods:
+        parsed = parse_period(period)
+        if parsed is not None and (latest_key is None or parsed[1] > latest_key):
+            latest, latest_key = period, parsed[1]
+
+    return latest
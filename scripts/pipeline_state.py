@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+💾 État persistant des scrapers et pipelines
+Watermarks par série pour l'ingestion incrémentale
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from periods import latest_period, shift_period
+
+logger = logging.getLogger(__name__)
+
+
+class JSONStateFile:
+    """Fichier d'état JSON avec écriture atomique"""
+
+    def __init__(self, path: str, compact: bool = False):
+        self.path = path
+        self.compact = compact  # gros états : ni indentation ni tri des clés
+        self._lock = threading.Lock()
+        self.state = self._load()
+
+    def _load(self) -> Dict:
+        """Charger l'état depuis le disque"""
+        if not os.path.exists(self.path):
+            return {}
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ État illisible {self.path}, réinitialisation: {e}")
+            return {}
+
+    def save(self):
+        """Écrire l'état (fichier temporaire puis renommage)"""
+        with self._lock:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                if self.compact:
+                    json.dump(self.state, f, separators=(',', ':'))
+                else:
+                    json.dump(self.state, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+class WatermarkStore(JSONStateFile):
+    """Dernière période ingérée et dernière révision connue par série"""
+
+    def get(self, series_key: str) -> Optional[Dict]:
+        """Watermark d'une série (None si jamais ingérée)"""
+        with self._lock:
+            return self.state.get(series_key)
+
+    def start_period(self, series_key: str, overlap_periods: int = 0) -> Optional[str]:
+        """Période de départ de la prochaine requête, fenêtre de révision incluse"""
+        watermark = self.get(series_key)
+        if not watermark or not watermark.get('last_period'):
+            return None
+
+        return shift_period(watermark['last_period'], -overlap_periods)
+
+    def updated_after(self, series_key: str) -> Optional[str]:
+        """Date de dernière révision publiée par la source"""
+        watermark = self.get(series_key)
+        return watermark.get('last_update') if watermark else None
+
+    def advance(self, series_key: str, periods: Iterable[str], last_updates: Iterable[Optional[str]] = ()):
+        """Faire avancer le watermark (jamais de recul)"""
+        with self._lock:
+            watermark = dict(self.state.get(series_key) or {})
+
+            candidates = [p for p in periods if p]
+            if watermark.get('last_period'):
+                candidates.append(watermark['last_period'])
+            last_period = latest_period(candidates)
+
+            updates = [u for u in last_updates if u]
+            if watermark.get('last_update'):
+                updates.append(watermark['last_update'])
+
+            if last_period:
+                watermark['last_period'] = last_period
+            if updates:
+                watermark['last_update'] = max(updates)
+            watermark['ingested_at'] = datetime.now().isoformat()
+
+            self.state[series_key] = watermark
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+⏱️ Rate limiting - Régulation du débit des appels API
+Seau de jetons partagé entre les threads d'un scraper, et variante asyncio
+avec plafond de concurrence, adaptation AIMD et état partagé via Redis
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Seau de jetons thread-safe exprimé en requêtes par minute"""
+
+    def __init__(self, requests_per_minute: int, burst: Optional[int] = None):
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute doit être strictement positif")
+
+        self.rate = requests_per_minute / 60.0  # jetons par seconde
+        self.capacity = float(burst if burst is not None else max(1, requests_per_minute // 10))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.total_wait = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """Recharger le seau selon le temps écoulé"""
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Attendre qu'un jeton soit disponible, retourne le temps d'attente"""
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    self.total_wait += waited
+                    return waited
+
+                wait_time = (tokens - self.tokens) / self.rate
+
+            time.sleep(wait_time)
+            waited += wait_time
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Délai d'un en-tête Retry-After (secondes ou date HTTP)"""
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# Seau de jetons atomique côté Redis : retourne l'attente en ms (0 = jeton obtenu)
+REDIS_TOKEN_BUCKET_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate')
+local now = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[3])
+local rate = tonumber(state[3]) or tonumber(ARGV[2])
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+
+local blocked_until = tonumber(redis.call('GET', KEYS[2]) or '0')
+if blocked_until > now then
+    return blocked_until - now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 3600000)
+return wait
+"""
+
+
+class AsyncRateLimiter:
+    """
+    Limiteur asyncio par source : seau de jetons (requêtes par minute),
+    plafond de requêtes simultanées et adaptation AIMD du débit.
+
+    Le débit baisse de moitié à chaque 429 (en respectant Retry-After pour
+    toutes les coroutines) puis remonte progressivement après les succès.
+    Avec un client redis.asyncio, le seau, le débit adapté et le blocage
+    Retry-After sont partagés entre tous les processus utilisant la même clé.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: int,
+        max_concurrency: int,
+        burst: Optional[int] = None,
+        redis_client=None,
+        increase_fraction: float = 0.05,
+        min_rate_fraction: float = 0.1
+    ):
+        self.name = name
+        self.max_rate = requests_per_minute / 60.0
+        self.min_rate = self.max_rate * min_rate_fraction
+        self.rate = self.max_rate
+        self.increase = self.max_rate * increase_fraction
+        self.capacity = float(burst if burst is not None else max(1, requests_per_minute // 10))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+        self.max_concurrency = max_concurrency
+        self._loop = None
+        self._bind_loop()
+
+        self.redis = redis_client
+        self._redis_script = redis_client.register_script(REDIS_TOKEN_BUCKET_SCRIPT) if redis_client else None
+        self._bucket_key = f"ratelimit:{name}"
+        self._blocked_key = f"ratelimit:{name}:blocked_until"
+
+        self.stats = {'requests': 0, 'throttled': 0, 'wait_seconds': 0.0}
+
+    def _bind_loop(self):
+        """(Re)créer les primitives asyncio pour la boucle courante"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is None or loop is not self._loop:
+            self._loop = loop
+            self.concurrency = asyncio.Semaphore(self.max_concurrency)
+            self._lock = asyncio.Lock()
+
+    async def _acquire_local(self) -> float:
+        """Jeton du seau local, retourne l'attente nécessaire (0 = obtenu)"""
+        async with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    async def _acquire_shared(self) -> float:
+        """Jeton du seau Redis partagé, repli local si Redis est indisponible"""
+        try:
+            wait_ms = await self._redis_script(
+                keys=[self._bucket_key, self._blocked_key],
+                args=[int(time.time() * 1000), self.max_rate, self.capacity]
+            )
+            return int(wait_ms) / 1000.0
+        except Exception as e:
+            logger.warning(f"⚠️ Rate limiter Redis indisponible ({self.name}), repli local: {e}")
+            self.redis = None
+            return await self._acquire_local()
+
+    async def acquire(self):
+        """Attendre un jeton"""
+        while True:
+            wait = await (self._acquire_shared() if self.redis else self._acquire_local())
+            if wait <= 0:
+                self.stats['requests'] += 1
+                return
+            self.stats['wait_seconds'] += wait
+            await asyncio.sleep(wait)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Créneau de requête : place de concurrence puis jeton"""
+        self._bind_loop()
+        async with self.concurrency:
+            await self.acquire()
+            yield
+
+    async def on_success(self):
+        """Augmentation additive du débit après une réponse acceptée"""
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            await self._publish_rate()
+
+    async def on_throttle(self, retry_after: Optional[float] = None, default_backoff: float = 1.0):
+        """Diminution multiplicative du débit et pause globale après un 429"""
+        self.stats['throttled'] += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        pause = retry_after if retry_after is not None else default_backoff
+
+        async with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+            self.tokens = min(self.tokens, 0.0)
+
+        logger.warning(
+            f"⏳ {self.name} limité: pause {pause:.1f}s, débit ramené à {self.rate * 60:.0f} req/min"
+        )
+
+        if self.redis:
+            try:
+                blocked_until_ms = int((time.time() + pause) * 1000)
+                await self.redis.set(self._blocked_key, blocked_until_ms, px=max(1, int(pause * 1000)))
+            except Exception as e:
+                logger.warning(f"⚠️ Publication du blocage {self.name} impossible: {e}")
+            await self._publish_rate()
+
+    async def _publish_rate(self):
+        """Partager le débit adapté avec les autres workers"""
+        if not self.redis:
+            return
+        try:
+            await self.redis.hset(self._bucket_key, 'rate', self.rate)
+        except Exception as e:
+            logger.warning(f"⚠️ Publication du débit {self.name} impossible: {e}")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+🗄️ Response store - Requêtes HTTP conditionnelles (ETag / Last-Modified)
+Conserve par URL les validateurs, le corps brut et le résultat parsé :
+une réponse 304 réutilise le résultat sans téléchargement ni parsing
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseStore:
+    """Stockage disque des réponses HTTP par URL"""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or os.getenv('RESPONSE_STORE_DIR', 'response_store')
+        self._index_path = os.path.join(self.directory, 'index.json')
+        self._lock = threading.Lock()
+        self.stats = {'not_modified': 0, 'downloaded': 0, 'bytes_saved': 0}
+        self._index = self._load_index()
+
+    def _load_index(self) -> Dict[str, Dict]:
+        if not os.path.exists(self._index_path):
+            return {}
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Index du response store illisible, réinitialisation: {e}")
+            return {}
+
+    def _save_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{key}.{kind}.gz")
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """En-têtes If-None-Match / If-Modified-Since si un résultat parsé est disponible"""
+        with self._lock:
+            entry = self._index.get(self._key(url))
+
+        if not entry or not entry.get('parsed'):
+            return {}
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def body_writer(self, url: str):
+        """Fichier compressé recevant le corps brut (écrit d'un bloc ou au fil de l'eau)"""
+        os.makedirs(self.directory, exist_ok=True)
+        return gzip.open(self._path(self._key(url), 'body'), 'wb', compresslevel=3)
+
+    def record_headers(self, url: str, headers, size: int):
+        """Validateurs d'une réponse 200 dont le corps a été écrit (résultat parsé à suivre)"""
+        with self._lock:
+            self._index[self._key(url)] = {
+                'url': url,
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'size': size,
+                'fetched_at': datetime.now().isoformat(),
+                'parsed': False
+            }
+            self.stats['downloaded'] += 1
+
+    def record_body(self, url: str, headers, body: bytes):
+        """Enregistrer validateurs et corps brut d'une réponse 200"""
+        with self.body_writer(url) as f:
+            f.write(body)
+        self.record_headers(url, headers, len(body))
+
+    def save_parsed(self, url: str, parsed: Any):
+        """Associer le résultat parsé à la dernière réponse de l'URL"""
+        key = self._key(url)
+
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None or not (entry.get('etag') or entry.get('last_modified')):
+                # Sans validateur, aucune requête conditionnelle possible
+                return
+
+        with gzip.open(self._path(key, 'parsed'), 'wt', encoding='utf-8', compresslevel=3) as f:
+            json.dump(parsed, f, separators=(',', ':'), default=str)
+
+        with self._lock:
+            entry['parsed'] = True
+            self._save_index()
+
+    def load_parsed(self, url: str) -> Optional[Any]:
+        """Résultat parsé stocké, après une réponse 304"""
+        key = self._key(url)
+        try:
+            with gzip.open(self._path(key, 'parsed'), 'rt', encoding='utf-8') as f:
+                parsed = json.load(f)
+        except (OSError, ValueError) as e:
+            # La prochaine requête repartira sans validateur
+            logger.warning(f"⚠️ Résultat stocké illisible pour {url}: {e}")
+            self.invalidate(url)
+            return None
+
+        with self._lock:
+            self.stats['not_modified'] += 1
+            self.stats['bytes_saved'] += self._index.get(key, {}).get('size', 0)
+        return parsed
+
+    def invalidate(self, url: str):
+        """Oublier une URL (304 reçu alors que le résultat stocké est illisible)"""
+        with self._lock:
+            if self._index.pop(self._key(url), None) is not None:
+                self._save_index()
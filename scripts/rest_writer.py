@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+📤 REST writer - Upserts Supabase concurrents et dimensionnés à la volée
+Lots envoyés en parallèle (nombre borné), taille ajustée selon la latence
+et le poids observés ; un lot rejeté est rejoué en deux moitiés pour isoler
+les lignes fautives. Une indisponibilité qui dure interrompt l'écriture
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import AsyncIterable, Callable, Dict, Iterable, List, Optional, Union
+
+import aiohttp
+
+from metrics import count_retries, observe_http
+from rate_limiting import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Statuts justifiant un nouvel essai (surcharge ou indisponibilité passagère)
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class RESTWriteError(Exception):
+    """Lot refusé par l'API REST"""
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None, transient: bool = False):
+        super().__init__(f"HTTP {status}: {message}" if status else message)
+        self.status = status
+        self.retry_after = retry_after
+        self.transient = transient or status in TRANSIENT_STATUSES
+
+
+@dataclass
+class WriteReport:
+    """Bilan d'une écriture"""
+    rows: int = 0
+    written: int = 0
+    failed: int = 0
+    batches: int = 0
+    splits: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+    batch_size: int = 0
+    failed_ids: List[str] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.written / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        """Compteurs à intégrer aux résultats d'une exécution"""
+        return {
+            'rest_written': self.written,
+            'rest_failed': self.failed,
+            'rest_batches': self.batches,
+            'rest_rows_per_second': round(self.rows_per_second, 1)
+        }
+
+
+class RESTUpsertWriter:
+    """
+    Upserts PostgREST (Supabase) avec un nombre borné de lots en vol.
+
+    La taille des lots suit la latence et le poids des requêtes : elle est
+    multipliée par min(latence cible / latence, poids max / poids), borné
+    entre x0.5 et x1.5, après chaque succès, et divisée par deux sur erreur
+    passagère (lot rejoué après une pause). Un lot refusé définitivement est
+    coupé en deux moitiés rejouées en priorité, jusqu'à isoler les lignes
+    fautives, qui sont écartées et comptées. Une erreur passagère qui
+    persiste après max_retries essais interrompt l'écriture (RESTWriteError) :
+    les lots déjà acceptés restent écrits, le reste est à reprendre.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        key: Optional[str] = None,
+        table: str = 'economic_data',
+        on_conflict: str = 'series_key,period_key',
+        max_in_flight: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        min_batch_size: int = 50,
+        max_batch_size: int = 5000,
+        target_latency: Optional[float] = None,
+        max_payload_bytes: Optional[int] = None,
+        max_retries: int = 3,
+        timeout: int = 60
+    ):
+        url = url or os.getenv('NEXT_PUBLIC_SUPABASE_URL') or ''
+        key = key or os.getenv('SUPABASE_SERVICE_ROLE_KEY') or ''
+        self.endpoint = f"{url.rstrip('/')}/rest/v1/{table}"
+        self.on_conflict = on_conflict
+        self.headers = {
+            'apikey': key,
+            'Authorization': f"Bearer {key}",
+            'Content-Type': 'application/json',
+            'Prefer': 'resolution=merge-duplicates,return=minimal'
+        }
+
+        self.max_in_flight = max(1, int(max_in_flight or os.getenv('REST_MAX_IN_FLIGHT', 4)))
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.batch_size = int(batch_size or os.getenv('REST_BATCH_SIZE', 500))
+        self.target_latency = float(target_latency or os.getenv('REST_TARGET_LATENCY', 1.0))
+        self.max_payload_bytes = int(max_payload_bytes or os.getenv('REST_MAX_PAYLOAD_BYTES', 1024 * 1024))
+        self.max_retries = max_retries
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    def _row_label(self, row: Dict) -> str:
+        """Clé de conflit d'une ligne, pour les journaux et le bilan"""
+        return ':'.join(str(row.get(column)) for column in self.on_conflict.split(','))
+
+    def _clamp(self, size: float) -> int:
+        return int(min(self.max_batch_size, max(self.min_batch_size, size)))
+
+    def _adapt(self, latency: float, payload_bytes: int):
+        """Ajuster la taille des lots après un succès"""
+        factor = min(
+            self.target_latency / max(latency, 1e-3),
+            self.max_payload_bytes / max(payload_bytes, 1)
+        )
+        self.batch_size = self._clamp(self.batch_size * min(1.5, max(0.5, factor)))
+
+    @asynccontextmanager
+    async def session(self):
+        """Session réutilisée si déjà ouverte, sinon ouverte et fermée ici"""
+        if self._session is not None and not self._session.closed:
+            yield self._session
+            return
+
+        self._session = aiohttp.ClientSession(headers=self.headers, timeout=self.timeout)
+        try:
+            yield self._session
+        finally:
+            await self._session.close()
+            self._session = None
+
+    async def _send(self, session: aiohttp.ClientSession, payload: bytes):
+        sent_at = time.perf_counter()
+        try:
+            async with session.post(self.endpoint, params={'on_conflict': self.on_conflict}, data=payload) as response:
+                observe_http('SUPABASE', response.status, time.perf_counter() - sent_at)
+                if response.status >= 400:
+                    message = (await response.text())[:300]
+                    raise RESTWriteError(
+                        message,
+                        status=response.status,
+                        retry_after=parse_retry_after(response.headers.get('Retry-After'))
+                    )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise RESTWriteError(f"{type(e).__name__}: {e}", transient=True) from e
+
+    @staticmethod
+    def _encode(batch: List[Dict]) -> bytes:
+        try:
+            return json.dumps(batch, separators=(',', ':'), default=str, allow_nan=False).encode('utf-8')
+        except ValueError as e:
+            # NaN / Infinity : JSON invalide, la ligne fautive sera isolée par découpage
+            raise RESTWriteError(f"JSON invalide: {e}") from e
+
+    async def write(
+        self,
+        rows: Union[Iterable[Dict], AsyncIterable[Dict]],
+        on_written: Optional[Callable[[List[Dict]], None]] = None
+    ) -> WriteReport:
+        """
+        Écrire des lignes (itérable consommé au fil de l'eau ; un itérable
+        asynchrone permet de préparer les lignes hors de la boucle).
+
+        on_written reçoit chaque lot accepté par l'API, par exemple pour
+        enregistrer les empreintes du détecteur de changements.
+        Lève RESTWriteError si l'API reste indisponible après max_retries essais.
+        """
+        report = WriteReport()
+        started = time.monotonic()
+        if isinstance(rows, AsyncIterable):
+            source = rows.__aiter__()
+
+            async def take(size: int) -> List[Dict]:
+                batch = []
+                async for row in source:
+                    batch.append(row)
+                    if len(batch) >= size:
+                        break
+                return batch
+        else:
+            source = iter(rows)
+
+            async def take(size: int) -> List[Dict]:
+                return list(islice(source, size))
+
+        source_lock = asyncio.Lock()  # un seul lecteur à la fois (générateur asynchrone)
+        retry_queue = deque()  # (lignes, essai) : moitiés et lots à rejouer, prioritaires
+        exhausted = False
+        aborted: Optional[RESTWriteError] = None
+
+        async def next_batch():
+            nonlocal exhausted
+            async with source_lock:
+                if aborted is not None:
+                    return None
+                if retry_queue:
+                    return retry_queue.popleft()
+                if exhausted:
+                    return None
+                batch = await take(self.batch_size)
+                if not batch:
+                    exhausted = True
+                    return None
+                report.rows += len(batch)
+                return batch, 0
+
+        async def worker(session: aiohttp.ClientSession):
+            nonlocal aborted
+            while True:
+                item = await next_batch()
+                if item is None:
+                    return
+                batch, attempt = item
+
+                report.batches += 1
+                try:
+                    payload = self._encode(batch)
+                    sent_at = time.monotonic()
+                    await self._send(session, payload)
+                except RESTWriteError as e:
+                    if e.transient and attempt >= self.max_retries:
+                        # Indisponibilité qui dure : découper ne ferait que multiplier les essais
+                        if aborted is None:
+                            aborted = e
+                        return
+                    await self._on_failure(e, batch, attempt, retry_queue, report)
+                    continue
+
+                report.written += len(batch)
+                self._adapt(time.monotonic() - sent_at, len(payload))
+                if on_written is not None:
+                    on_written(batch)
+
+        async with self.session() as session:
+            await asyncio.gather(*(worker(session) for _ in range(self.max_in_flight)))
+
+        report.seconds = time.monotonic() - started
+        report.batch_size = self.batch_size
+        if aborted is not None:
+            logger.error(
+                f"❌ REST: écriture interrompue après {self.max_retries} nouveaux essais "
+                f"({report.written} lignes écrites): {aborted}"
+            )
+            raise RESTWriteError(
+                f"API indisponible après {self.max_retries} nouveaux essais, "
+                f"{report.written} lignes écrites: {aborted}",
+                status=aborted.status,
+                transient=True
+            ) from aborted
+        logger.info(
+            f"📤 REST: {report.written}/{report.rows} lignes en {report.seconds:.1f}s "
+            f"({report.rows_per_second:.0f} lignes/s), {report.batches} lots, "
+            f"{report.splits} découpages, taille de lot finale {report.batch_size}"
+            + (f", {report.failed} lignes en échec" if report.failed else "")
+        )
+        return report
+
+    async def _on_failure(self, error: RESTWriteError, batch: List[Dict], attempt: int, retry_queue: deque, report: WriteReport):
+        """Lot refusé : nouvel essai si l'erreur est passagère, sinon deux moitiés, sinon abandon de la ligne"""
+        if error.transient:
+            # Surcharge probable : lots suivants plus petits et pause avant de rejouer
+            self.batch_size = self._clamp(self.batch_size / 2)
+            count_retries('SUPABASE', throttled=int(error.status == 429))
+            await asyncio.sleep(error.retry_after if error.retry_after is not None else min(30.0, 2 ** attempt))
+            report.retries += 1
+            retry_queue.appendleft((batch, attempt + 1))
+        elif len(batch) > 1:
+            middle = len(batch) // 2
+            report.splits += 1
+            retry_queue.appendleft((batch[middle:], 0))
+            retry_queue.appendleft((batch[:middle], 0))
+            logger.warning(f"⚠️ Lot de {len(batch)} lignes refusé ({error}), rejoué en deux moitiés")
+        else:
+            report.failed += 1
+            label = self._row_label(batch[0])
+            report.failed_ids.append(label)
+            logger.error(f"❌ Ligne {label} écartée: {error}")
+
+    def write_sync(
+        self,
+        rows: Iterable[Dict],
+        on_written: Optional[Callable[[List[Dict]], None]] = None
+    ) -> WriteReport:
+        """Variante bloquante pour les scripts à threads : boucle dédiée, session conservée entre appels"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='rest-writer', daemon=True).start()
+
+        return asyncio.run_coroutine_threadsafe(self._write_persistent(rows, on_written), self._loop).result()
+
+    async def _write_persistent(self, rows, on_written) -> WriteReport:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(headers=self.headers, timeout=self.timeout)
+        return await self.write(rows, on_written)
+
+    def close(self):
+        """Fermer la session et la boucle de write_sync"""
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+
+        async def close_session():
+            if self._session is not None:
+                await self._session.close()
+                self._session = None
+
+        asyncio.run_coroutine_threadsafe(close_session(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+🧾 Journal d'exécution - État des tâches d'une exécution du pipeline
+Chaque tâche (jeu de données) passe par fetched → validated → saved ; la
+sortie de chaque étape est conservée jusqu'à la sauvegarde, pour qu'une
+reprise (--resume <run_id>) ne refasse que le travail inachevé
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    mode TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    run_id TEXT NOT NULL,
+    task TEXT NOT NULL,
+    state TEXT NOT NULL,
+    stages TEXT NOT NULL DEFAULT '{}',
+    error TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (run_id, task)
+);
+CREATE TABLE IF NOT EXISTS outputs (
+    run_id TEXT NOT NULL,
+    task TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (run_id, task, stage)
+);
+"""
+
+
+class RunJournal:
+    """Journal SQLite local : indépendant de Redis, qui reste optionnel"""
+
+    def __init__(self, path: Optional[str] = None, retention_days: Optional[int] = None):
+        self.path = path or os.getenv('RUN_JOURNAL_DB', 'pipeline_runs.sqlite')
+        self.retention_days = int(retention_days or os.getenv('RUN_JOURNAL_RETENTION_DAYS', 7))
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def _execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._db.execute(sql, params)
+
+    def start_run(self, run_id: Optional[str] = None, mode: str = 'full') -> str:
+        """Nouvelle exécution, ou reprise d'une exécution existante"""
+        if run_id is not None:
+            if self._execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone() is None:
+                raise ValueError(f"Exécution inconnue: {run_id}")
+            self._execute("UPDATE runs SET status = 'running', finished_at = NULL WHERE run_id = ?", (run_id,))
+            logger.info(f"🧾 Reprise de l'exécution {run_id}")
+            return run_id
+
+        self.prune()
+        run_id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+        self._execute(
+            "INSERT INTO runs (run_id, mode, status, started_at) VALUES (?, ?, 'running', ?)",
+            (run_id, mode, datetime.now().isoformat())
+        )
+        logger.info(f"🧾 Exécution {run_id}")
+        return run_id
+
+    def latest_unfinished(self) -> Optional[str]:
+        """Dernière exécution non terminée avec succès (--resume last)"""
+        row = self._execute(
+            "SELECT run_id FROM runs WHERE status != 'completed' ORDER BY started_at DESC LIMIT 1"
+        ).fetchone()
+        return row[0] if row else None
+
+    def finish_run(self, run_id: str, status: str):
+        self._execute(
+            "UPDATE runs SET status = ?, finished_at = ? WHERE run_id = ?",
+            (status, datetime.now().isoformat(), run_id)
+        )
+
+    def tasks(self, run_id: str) -> Dict[str, Dict]:
+        """{tâche: {'state', 'stages': {étape: résumé}, 'error'}}"""
+        rows = self._execute("SELECT task, state, stages, error FROM tasks WHERE run_id = ?", (run_id,)).fetchall()
+        return {
+            task: {'state': state, 'stages': json.loads(stages), 'error': error}
+            for task, state, stages, error in rows
+        }
+
+    def plan(self, run_id: str, tasks):
+        """Déclarer les tâches d'une exécution (état pending), pour qu'une reprise les retrouve toutes"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN")
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO tasks (run_id, task, state, updated_at) VALUES (?, ?, 'pending', ?)",
+                    [(run_id, task, now) for task in tasks]
+                )
+
+    def record_stage(self, run_id: str, task: str, stage: str, summary: Dict, output: Any = None):
+        """Étape terminée : résumé (JSON) et sortie éventuelle (compressée), en une transaction"""
+        row = self._execute("SELECT stages FROM tasks WHERE run_id = ? AND task = ?", (run_id, task)).fetchone()
+        stages = json.loads(row[0]) if row else {}
+        stages[stage] = summary
+        now = datetime.now().isoformat()
+
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN")
+                self._db.execute(
+                    "INSERT INTO tasks (run_id, task, state, stages, error, updated_at) VALUES (?, ?, ?, ?, NULL, ?) "
+                    "ON CONFLICT (run_id, task) DO UPDATE SET state = excluded.state, stages = excluded.stages, "
+                    "error = NULL, updated_at = excluded.updated_at",
+                    (run_id, task, stage, json.dumps(stages, default=str), now)
+                )
+                # Seule la sortie de la dernière étape est utile à une reprise
+                self._db.execute("DELETE FROM outputs WHERE run_id = ? AND task = ?", (run_id, task))
+                if output is not None:
+                    payload = zlib.compress(json.dumps(output, separators=(',', ':')).encode('utf-8'), 1)
+                    self._db.execute(
+                        "INSERT INTO outputs (run_id, task, stage, payload) VALUES (?, ?, ?, ?)",
+                        (run_id, task, stage, payload)
+                    )
+
+    def load_output(self, run_id: str, task: str, stage: str) -> Any:
+        """Sortie conservée d'une étape (None si absente)"""
+        row = self._execute(
+            "SELECT payload FROM outputs WHERE run_id = ? AND task = ? AND stage = ?", (run_id, task, stage)
+        ).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def fail(self, run_id: str, task: str, stage: str, error: str):
+        """Échec d'une étape : les étapes déjà terminées restent acquises"""
+        self._execute(
+            "INSERT INTO tasks (run_id, task, state, error, updated_at) VALUES (?, ?, 'failed', ?, ?) "
+            "ON CONFLICT (run_id, task) DO UPDATE SET state = 'failed', error = excluded.error, "
+            "updated_at = excluded.updated_at",
+            (run_id, task, f"{stage}: {error}", datetime.now().isoformat())
+        )
+
+    def prune(self):
+        """Oublier les exécutions plus anciennes que la durée de rétention"""
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN")
+                old_runs = "SELECT run_id FROM runs WHERE started_at < ?"
+                self._db.execute(f"DELETE FROM outputs WHERE run_id IN ({old_runs})", (cutoff,))
+                self._db.execute(f"DELETE FROM tasks WHERE run_id IN ({old_runs})", (cutoff,))
+                self._db.execute("DELETE FROM runs WHERE started_at < ?", (cutoff,))
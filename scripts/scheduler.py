@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+📅 Scheduler - Planification des séries selon leur fréquence
+Boucle asyncio unique : chaque série a sa prochaine échéance (fréquence,
+calendrier de publication éventuel, gigue), les séries dues sont traitées
+ensemble et un job ne se chevauche jamais lui-même
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from pipeline_state import JSONStateFile
+
+logger = logging.getLogger(__name__)
+
+# Intervalle de vérification par fréquence, en heures (surchargeable par
+# SCHEDULE_<FRÉQUENCE>_HOURS) : une série mensuelle ne change pas toutes les 4h
+CHECK_INTERVAL_HOURS = {
+    'DAILY': 4,
+    'WEEKLY': 24,
+    'MONTHLY': 24,
+    'QUARTERLY': 72,
+    'YEARLY': 336
+}
+DEFAULT_INTERVAL_HOURS = 24
+
+# Codes SDMX et variantes rencontrées dans les sources
+FREQUENCY_ALIASES = {
+    'D': 'DAILY',
+    'W': 'WEEKLY',
+    'M': 'MONTHLY',
+    'Q': 'QUARTERLY',
+    'A': 'YEARLY',
+    'ANNUAL': 'YEARLY'
+}
+
+
+def check_interval(frequency: Optional[str]) -> timedelta:
+    """Intervalle entre deux vérifications d'une série"""
+    frequency = (frequency or '').upper()
+    frequency = FREQUENCY_ALIASES.get(frequency, frequency)
+    hours = os.getenv(f'SCHEDULE_{frequency}_HOURS') or CHECK_INTERVAL_HOURS.get(frequency, DEFAULT_INTERVAL_HOURS)
+    return timedelta(hours=float(hours))
+
+
+def load_release_calendar(path: Optional[str] = None) -> Dict[str, List[datetime]]:
+    """
+    Calendrier de publication optionnel : {série: ["2024-10-30T07:30", ...]}.
+    Fichier absent ou illisible : calendrier vide, les intervalles suffisent.
+    """
+    path = path or os.getenv('RELEASE_CALENDAR_FILE', 'release_calendar.json')
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+        return {key: sorted(datetime.fromisoformat(d) for d in dates) for key, dates in raw.items()}
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"⚠️ Calendrier de publication illisible {path}: {e}")
+        return {}
+
+
+class ScheduleState(JSONStateFile):
+    """Prochaine échéance, dernier passage et échecs consécutifs par série"""
+
+    def get(self, job: str, key: str) -> Dict:
+        with self._lock:
+            return dict(self.state.get(job, {}).get(key) or {})
+
+    def next_run(self, job: str, key: str) -> Optional[datetime]:
+        """Échéance de la série (None : jamais planifiée, donc due)"""
+        entry = self.get(job, key)
+        return datetime.fromisoformat(entry['next_run']) if entry.get('next_run') else None
+
+    def record(self, job: str, key: str, next_run: datetime, success: bool):
+        with self._lock:
+            entry = self.state.setdefault(job, {}).setdefault(key, {})
+            entry['last_run'] = datetime.now().isoformat()
+            entry['last_status'] = 'success' if success else 'failed'
+            entry['failures'] = 0 if success else entry.get('failures', 0) + 1
+            entry['next_run'] = next_run.isoformat()
+
+    def failures(self, job: str, key: str) -> int:
+        return self.get(job, key).get('failures', 0)
+
+
+@dataclass
+class ScheduledJob:
+    """
+    Traitement planifié : action(clés dues) retourne les clés en échec.
+    Les séries sont identifiées par une clé et planifiées selon leur fréquence.
+    """
+    name: str
+    action: Callable[[List[str]], Awaitable[Iterable[str]]]
+    frequencies: Dict[str, Optional[str]]
+    running: Optional[asyncio.Task] = None
+
+
+class AsyncScheduler:
+    """
+    Planificateur asyncio longue durée.
+
+    Prochaine échéance d'une série après un passage réussi : le plus tôt
+    entre l'intervalle de sa fréquence et la prochaine publication annoncée
+    (+ délai de mise en ligne), plus une gigue aléatoire qui étale les
+    requêtes. Après un échec, nouvel essai avec un délai doublé à chaque
+    échec consécutif, sans dépasser l'intervalle. Les échéances sont
+    persistées : un redémarrage ne relance pas tout.
+
+    Single-flight : tant qu'une exécution d'un job est en cours, aucune
+    autre n'est lancée ; les séries arrivées à échéance entre-temps partent
+    ensemble à l'exécution suivante.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        state_path: Optional[str] = None,
+        calendar_path: Optional[str] = None,
+        jitter_seconds: Optional[float] = None,
+        retry_delay_seconds: Optional[float] = None,
+        release_delay_seconds: Optional[float] = None,
+        max_sleep_seconds: float = 60.0
+    ):
+        self.name = name
+        self.state = ScheduleState(
+            state_path or os.path.join(os.getenv('SCHEDULER_STATE_DIR', '.'), f"schedule_{name}.json")
+        )
+        self.calendar_path = calendar_path
+        self.calendar = load_release_calendar(calendar_path)
+        self.jitter = float(jitter_seconds if jitter_seconds is not None else os.getenv('SCHEDULER_JITTER_SECONDS', 300))
+        self.retry_delay = timedelta(seconds=float(
+            retry_delay_seconds if retry_delay_seconds is not None else os.getenv('SCHEDULER_RETRY_SECONDS', 900)
+        ))
+        self.release_delay = timedelta(seconds=float(
+            release_delay_seconds if release_delay_seconds is not None else os.getenv('RELEASE_DELAY_SECONDS', 600)
+        ))
+        self.max_sleep = max_sleep_seconds
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def add_job(
+        self,
+        name: str,
+        action: Callable[[List[str]], Awaitable[Iterable[str]]],
+        frequencies: Dict[str, Optional[str]]
+    ):
+        """Planifier les séries {clé: fréquence} d'un job"""
+        self.jobs[name] = ScheduledJob(name, action, dict(frequencies))
+
+    def _jitter(self, interval: timedelta) -> timedelta:
+        # Gigue bornée à 10% de l'intervalle pour les séries vérifiées souvent
+        return timedelta(seconds=random.uniform(0, min(self.jitter, interval.total_seconds() * 0.1)))
+
+    def next_run_after(self, job: str, key: str, frequency: Optional[str], now: datetime, success: bool) -> datetime:
+        """Prochaine échéance d'une série après un passage"""
+        interval = check_interval(frequency)
+
+        if not success:
+            failures = self.state.failures(job, key) + 1
+            delay = min(interval, self.retry_delay * 2 ** (failures - 1))
+            return now + delay + self._jitter(delay)
+
+        next_run = now + interval
+        release = next((date for date in self.calendar.get(key, []) if date > now), None)
+        if release is not None:
+            next_run = min(next_run, release + self.release_delay)
+        return next_run + self._jitter(interval)
+
+    def due(self, job: ScheduledJob, now: datetime) -> List[str]:
+        due = []
+        for key in job.frequencies:
+            next_run = self.state.next_run(job.name, key)
+            if next_run is None or next_run <= now:
+                due.append(key)
+        return due
+
+    def _next_wakeup(self) -> Optional[datetime]:
+        pending = [
+            self.state.next_run(job.name, key) or datetime.now()
+            for job in self.jobs.values() if job.running is None
+            for key in job.frequencies
+        ]
+        return min(pending) if pending else None
+
+    async def _run(self, job: ScheduledJob, keys: List[str]):
+        started = datetime.now()
+        logger.info(f"⏰ {job.name}: {len(keys)} séries dues ({', '.join(keys)})")
+
+        try:
+            failed = set(await job.action(keys))
+        except Exception as e:
+            logger.error(f"Erreur exécution planifiée {job.name}: {e}")
+            failed = set(keys)
+
+        # Calendrier relu à chaque passage : ses mises à jour sont prises en compte sans redémarrage
+        self.calendar = load_release_calendar(self.calendar_path)
+        now = datetime.now()
+        for key in keys:
+            success = key not in failed
+            next_run = self.next_run_after(job.name, key, job.frequencies.get(key), now, success)
+            self.state.record(job.name, key, next_run, success)
+        self.state.save()
+
+        upcoming = min(filter(None, (self.state.next_run(job.name, key) for key in job.frequencies)))
+        logger.info(
+            f"📅 {job.name}: {len(keys) - len(failed & set(keys))}/{len(keys)} séries à jour "
+            f"en {(now - started).total_seconds():.0f}s, prochaine échéance {upcoming:%Y-%m-%d %H:%M}"
+        )
+
+    def _finished(self, job: ScheduledJob):
+        job.running = None
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run_forever(self):
+        """Boucle de planification (jusqu'à annulation)"""
+        self._wakeup = asyncio.Event()
+        logger.info(
+            f"📅 Scheduler {self.name}: {sum(len(job.frequencies) for job in self.jobs.values())} séries, "
+            f"{len(self.calendar)} au calendrier de publication"
+        )
+
+        try:
+            while True:
+                now = datetime.now()
+                for job in self.jobs.values():
+                    if job.running is not None:
+                        continue
+                    keys = self.due(job, now)
+                    if keys:
+                        job.running = asyncio.create_task(self._run(job, keys))
+                        job.running.add_done_callback(lambda _, job=job: self._finished(job))
+
+                # Réveil à la prochaine échéance, à la fin d'une exécution, ou au plus tard après max_sleep
+                self._wakeup.clear()
+                wakeup = self._next_wakeup()
+                timeout = self.max_sleep
+                if wakeup is not None:
+                    timeout = min(self.max_sleep, max(1.0, (wakeup - datetime.now()).total_seconds()))
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            running = [job.running for job in self.jobs.values() if job.running is not None]
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
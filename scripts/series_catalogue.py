@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+📚 Catalogue des séries INSEE - Métadonnées des idbanks BDM suivis
+Fichier local (JSON compressé, en colonnes) chargé à la première sélection,
+indexé par idbank, catégorie et fréquence. Le rafraîchissement lit la liste
+des dataflows BDM puis la structure de chaque dataflow par requête
+conditionnelle : seuls les dataflows modifiés sont retéléchargés, et
+uniquement quand le catalogue a dépassé sa durée de validité
+"""
+
+import gzip
+import io
+import json
+import logging
+import os
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from periods import FREQUENCY_NAMES
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_VERSION = 1
+
+# Colonnes du fichier catalogue ; idbank sert d'index
+CATALOGUE_COLUMNS = ('idbank', 'id', 'name', 'dataflow', 'category', 'unit', 'frequency', 'last_update')
+
+# Colonnes à faible cardinalité, gardées en catégories (mémoire, index)
+INDEXED_COLUMNS = ('dataflow', 'category', 'unit', 'frequency')
+
+# Codes FREQ de la BDM (T : trimestrielle, B : bimestrielle, suivie comme mensuelle)
+INSEE_FREQUENCIES = {'A': 'YEARLY', 'S': 'SEMIANNUAL', 'T': 'QUARTERLY', 'B': 'MONTHLY', 'M': 'MONTHLY'}
+
+# Codes acceptés dans une requête de sélection (frequency=M, frequency=Q...)
+FREQUENCY_ALIASES = {**FREQUENCY_NAMES, **INSEE_FREQUENCIES}
+
+# Catégorie d'une série selon le préfixe de son dataflow (premier préfixe correspondant)
+DATAFLOW_CATEGORIES = (
+    ('CNT-', 'GDP'),
+    ('PIB', 'GDP'),
+    ('IPC', 'INFLATION'),               # IPC-2015, IPCH-2015
+    ('CHOMAGE', 'UNEMPLOYMENT'),
+    ('TAUX-CHOMAGE', 'UNEMPLOYMENT'),
+    ('IPI', 'INDUSTRIAL_PRODUCTION'),
+    ('DETTE', 'GOVERNMENT_DEBT'),
+    ('ENQ-CONJ-MENAGES', 'CONSUMER_CONFIDENCE'),
+    ('COMMERCE-EXT', 'TRADE'),
+    ('DEMO', 'DEMOGRAPHICS'),
+    ('POPULATION', 'DEMOGRAPHICS'),
+)
+
+# Critères de sélection acceptés (requête "category=INFLATION,GDP frequency=MONTHLY")
+QUERY_KEYS = {'idbank': 'idbanks', 'category': 'categories', 'frequency': 'frequencies', 'dataflow': 'dataflows'}
+
+# Réponse de la source : get(url, params, en-têtes) -> requests.Response
+Fetch = Callable[[str, Dict[str, str], Dict[str, str]], object]
+
+
+@dataclass
+class EconomicIndicator:
+    """Modèle de données pour un indicateur économique"""
+    id: str
+    name: str
+    series_id: str
+    category: str
+    unit: str
+    frequency: str
+    geography: str = "France"
+
+
+# Séries suivies par défaut (sans requête de sélection), prioritaires sur le catalogue
+SEED_INDICATORS = (
+    EconomicIndicator(
+        id="gdp_quarterly",
+        name="PIB trimestriel en volume",
+        series_id="001656344",
+        category="GDP",
+        unit="Milliards €",
+        frequency="QUARTERLY"
+    ),
+    EconomicIndicator(
+        id="unemployment_rate",
+        name="Taux de chômage au sens du BIT",
+        series_id="001688527",
+        category="UNEMPLOYMENT",
+        unit="%",
+        frequency="QUARTERLY"
+    ),
+    EconomicIndicator(
+        id="inflation_ipc",
+        name="Indice des prix à la consommation",
+        series_id="001759972",
+        category="INFLATION",
+        unit="Indice",
+        frequency="MONTHLY"
+    ),
+    EconomicIndicator(
+        id="industrial_production",
+        name="Production industrielle",
+        series_id="010537510",
+        category="INDUSTRIAL_PRODUCTION",
+        unit="Indice",
+        frequency="MONTHLY"
+    ),
+    EconomicIndicator(
+        id="government_debt",
+        name="Dette publique",
+        series_id="001656434",
+        category="GOVERNMENT_DEBT",
+        unit="Milliards €",
+        frequency="QUARTERLY"
+    ),
+    EconomicIndicator(
+        id="consumer_confidence",
+        name="Indicateur de confiance des ménages",
+        series_id="010565692",
+        category="CONSUMER_CONFIDENCE",
+        unit="Solde d'opinion",
+        frequency="MONTHLY"
+    ),
+)
+
+
+def parse_query(query: Optional[str]) -> Optional[Dict[str, List[str]]]:
+    """
+    Critères d'une requête de sélection ("category=INFLATION,GDP frequency=MONTHLY",
+    "all" : tout le catalogue) ; None sans requête (séries par défaut)
+    """
+    if not query or not query.strip():
+        return None
+    if query.strip().lower() == 'all':
+        return {}
+
+    criteria = {}
+    for term in query.replace(';', ' ').split():
+        key, _, values = term.partition('=')
+        if key not in QUERY_KEYS or not values:
+            raise ValueError(f"Critère de sélection invalide: {term} (attendu: {', '.join(QUERY_KEYS)}=valeur[,valeur])")
+        criteria.setdefault(QUERY_KEYS[key], []).extend(value for value in values.split(',') if value)
+    return criteria
+
+
+def dataflow_category(dataflow: str) -> str:
+    """Catégorie des séries d'un dataflow (OTHER si aucun préfixe connu)"""
+    upper = dataflow.upper()
+    return next((category for prefix, category in DATAFLOW_CATEGORIES if upper.startswith(prefix)), 'OTHER')
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_dataflows(body: bytes) -> Dict[str, str]:
+    """Dataflows d'un message de structure SDMX : {identifiant: libellé français}"""
+    flows = {}
+    for _, elem in ET.iterparse(io.BytesIO(body), events=('end',)):
+        if _local_name(elem.tag) != 'Dataflow':
+            continue
+        names = {
+            child.get('{http://www.w3.org/XML/1998/namespace}lang'): (child.text or '').strip()
+            for child in elem if _local_name(child.tag) == 'Name'
+        }
+        flow_id = elem.get('id')
+        if flow_id:
+            flows[flow_id] = names.get('fr') or next(iter(names.values()), flow_id)
+        elem.clear()
+    return flows
+
+
+def parse_dataflow_series(body: bytes, dataflow: str) -> Dict[str, List]:
+    """Séries d'un dataflow (réponse detail=nodata : attributs IDBANK, FREQ, TITLE_FR... des Series), en colonnes"""
+    columns = {name: [] for name in CATALOGUE_COLUMNS}
+    category = dataflow_category(dataflow)
+
+    for _, elem in ET.iterparse(io.BytesIO(body), events=('end',)):
+        if _local_name(elem.tag) != 'Series':
+            continue
+        attributes = elem.attrib
+        idbank = attributes.get('IDBANK')
+        if idbank:
+            columns['idbank'].append(idbank)
+            columns['id'].append(idbank)
+            columns['name'].append(attributes.get('TITLE_FR') or attributes.get('TITLE_EN') or idbank)
+            columns['dataflow'].append(dataflow)
+            columns['category'].append(category)
+            columns['unit'].append(attributes.get('UNIT_MEASURE') or '')
+            columns['frequency'].append(INSEE_FREQUENCIES.get(attributes.get('FREQ'), 'MONTHLY'))
+            columns['last_update'].append(attributes.get('LAST_UPDATE'))
+        elem.clear()
+
+    return columns
+
+
+class SeriesCatalogue:
+    """
+    Catalogue des séries BDM, chargé au premier accès.
+
+    Les lignes sont gardées en colonnes (DataFrame indexé par idbank, colonnes
+    répétitives en catégories) : 10 000 séries tiennent en quelques Mo, et seules
+    les séries sélectionnées deviennent des EconomicIndicator. Les séries par
+    défaut (SEED_INDICATORS) font toujours partie du catalogue.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        base_url: Optional[str] = None,
+        ttl_hours: Optional[float] = None,
+        dataflows: Optional[Iterable[str]] = None,
+        workers: int = 4
+    ):
+        self.path = path or os.getenv('INSEE_CATALOGUE_FILE', 'insee_catalogue.json.gz')
+        self.base_url = base_url or os.getenv('INSEE_BASE_URL', 'https://api.insee.fr/series/BDM/V1')
+        self.ttl = timedelta(hours=float(ttl_hours if ttl_hours is not None else os.getenv('INSEE_CATALOGUE_TTL_HOURS', 168)))
+        if dataflows is None:
+            dataflows = [flow for flow in os.getenv('INSEE_CATALOGUE_DATAFLOWS', '').split(',') if flow]
+        self.dataflows = set(dataflows)  # vide : tous les dataflows de la BDM
+        self.workers = max(1, workers)
+        self.stats = {'dataflows_modified': 0, 'dataflows_unchanged': 0, 'dataflows_removed': 0}
+
+        self._lock = threading.Lock()
+        self._frame: Optional[pd.DataFrame] = None
+        self._groups: Dict[str, Dict[str, np.ndarray]] = {}
+        self._flows: Dict[str, Dict] = {}
+        self._refreshed_at: Optional[datetime] = None
+
+    # Chargement
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """Séries du catalogue, indexées par idbank (fichier lu au premier accès)"""
+        with self._lock:
+            if self._frame is None:
+                self._load()
+            return self._frame
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def _load(self):
+        """Lire le fichier catalogue (appelé sous verrou)"""
+        columns = {name: [] for name in CATALOGUE_COLUMNS}
+        if os.path.exists(self.path):
+            try:
+                with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                    state = json.load(f)
+                if state.get('version') == CATALOGUE_VERSION:
+                    columns = state['columns']
+                    self._flows = state.get('dataflows', {})
+                    refreshed_at = state.get('refreshed_at')
+                    self._refreshed_at = datetime.fromisoformat(refreshed_at) if refreshed_at else None
+                else:
+                    logger.info(f"📚 Catalogue {self.path} d'un format antérieur, reconstruit au prochain rafraîchissement")
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"⚠️ Catalogue illisible {self.path}, réinitialisation: {e}")
+
+        self._set_frame(self._build_frame(columns))
+
+    @staticmethod
+    def _build_frame(columns: Dict[str, List]) -> pd.DataFrame:
+        """DataFrame du catalogue, séries par défaut comprises (et prioritaires)"""
+        frame = pd.DataFrame({name: columns.get(name, []) for name in CATALOGUE_COLUMNS}, dtype=object)
+        seeds = pd.DataFrame(
+            [
+                (ind.series_id, ind.id, ind.name, None, ind.category, ind.unit, ind.frequency, None)
+                for ind in SEED_INDICATORS
+            ],
+            columns=list(CATALOGUE_COLUMNS),
+            dtype=object
+        )
+        # Dataflow d'une série par défaut conservé s'il est connu
+        known = frame.drop_duplicates('idbank').set_index('idbank')['dataflow']
+        seeds['dataflow'] = seeds['idbank'].map(known)
+
+        frame = pd.concat([frame[~frame['idbank'].isin(seeds['idbank'])], seeds], ignore_index=True)
+        frame = frame.drop_duplicates('idbank', keep='last')
+        for name in INDEXED_COLUMNS:
+            frame[name] = frame[name].astype('category')
+        return frame.set_index('idbank', drop=False)
+
+    def _set_frame(self, frame: pd.DataFrame):
+        self._frame = frame
+        self._groups = {}
+
+    def _positions(self, column: str) -> Dict[str, np.ndarray]:
+        """Index secondaire {valeur: positions} d'une colonne, construit au premier usage"""
+        if column not in self._groups:
+            self._groups[column] = self._frame.groupby(column, observed=True).indices
+        return self._groups[column]
+
+    # Sélection
+
+    def select(
+        self,
+        idbanks: Optional[Iterable[str]] = None,
+        categories: Optional[Iterable[str]] = None,
+        frequencies: Optional[Iterable[str]] = None,
+        dataflows: Optional[Iterable[str]] = None
+    ) -> List[EconomicIndicator]:
+        """Séries répondant à tous les critères donnés (toutes sans critère), dans l'ordre du catalogue"""
+        frame = self.frame
+        with self._lock:
+            selected = np.arange(len(frame))
+
+            if idbanks is not None:
+                positions = frame.index.get_indexer(list(idbanks))
+                unknown = int((positions < 0).sum())
+                if unknown:
+                    logger.warning(f"⚠️ {unknown} idbanks absents du catalogue ignorés")
+                selected = np.intersect1d(selected, positions[positions >= 0])
+
+            # Catégories et fréquences en majuscules, identifiants de dataflow tels quels
+            criteria = (
+                ('category', categories and {value.upper() for value in categories}),
+                ('frequency', frequencies and {FREQUENCY_ALIASES.get(value.upper(), value.upper()) for value in frequencies}),
+                ('dataflow', dataflows and set(dataflows)),
+            )
+            for column, values in criteria:
+                if values is None:
+                    continue
+                groups = self._positions(column)
+                matches = [groups[value] for value in values if value in groups]
+                selected = np.intersect1d(selected, np.concatenate(matches) if matches else np.empty(0, dtype=np.intp))
+
+        rows = frame.iloc[selected]
+        return [
+            EconomicIndicator(
+                id=row.id,
+                name=row.name,
+                series_id=row.idbank,
+                category=row.category,
+                unit=row.unit,
+                frequency=row.frequency
+            )
+            for row in rows.itertuples(index=False)
+        ]
+
+    def query(self, query: Optional[str]) -> List[EconomicIndicator]:
+        """Sélection par requête texte (voir parse_query) ; sans requête, les séries par défaut"""
+        criteria = parse_query(query)
+        if criteria is None:
+            return list(SEED_INDICATORS)
+        return self.select(**criteria)
+
+    def summary(self) -> Dict[str, object]:
+        """Taille du catalogue par catégorie et fréquence"""
+        frame = self.frame
+        return {
+            'series': len(frame),
+            'dataflows': len(self._flows),
+            'refreshed_at': self._refreshed_at.isoformat() if self._refreshed_at else None,
+            'categories': {str(k): int(v) for k, v in frame['category'].value_counts().items() if v},
+            'frequencies': {str(k): int(v) for k, v in frame['frequency'].value_counts().items() if v},
+        }
+
+    # Rafraîchissement
+
+    def is_stale(self) -> bool:
+        """Vrai si le catalogue n'a jamais été rafraîchi ou a dépassé sa durée de validité"""
+        self.frame  # chargement éventuel
+        return self._refreshed_at is None or datetime.now() - self._refreshed_at > self.ttl
+
+    def refresh(self, get: Fetch, force: bool = False) -> bool:
+        """
+        Rafraîchir depuis la BDM si périmé (ou force) ; True si un rafraîchissement a eu lieu.
+        Dataflows interrogés en requêtes conditionnelles : un 304 garde leurs séries
+        """
+        if not force and not self.is_stale():
+            return False
+
+        frame = self.frame  # validateurs des dataflows lus avec le fichier local
+        response = get(f"{self.base_url}/dataflow/FR1/all", {}, {'Accept': 'application/xml'})
+        response.raise_for_status()
+        flows = parse_dataflows(response.content)
+        if self.dataflows:
+            flows = {flow: name for flow, name in flows.items() if flow in self.dataflows}
+
+        def fetch_flow(flow: str):
+            validators = self._flows.get(flow, {})
+            headers = {'Accept': 'application/xml'}
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+
+            response = get(f"{self.base_url}/data/{flow}/all", {'detail': 'nodata'}, headers)
+            if response.status_code == 304:
+                return flow, None, response.headers
+            response.raise_for_status()
+            return flow, parse_dataflow_series(response.content, flow), response.headers
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='insee-catalogue') as pool:
+            results = list(pool.map(fetch_flow, sorted(flows)))
+
+        with self._lock:
+            # Séries conservées : dataflows inchangés (304) ; remplacées : dataflows modifiés
+            unchanged = {flow for flow, columns, _ in results if columns is None}
+            kept = frame[frame['dataflow'].isin(unchanged)]
+            columns = {name: kept[name].astype(object).tolist() for name in CATALOGUE_COLUMNS}
+            for flow, flow_columns, _ in results:
+                if flow_columns is not None:
+                    for name in CATALOGUE_COLUMNS:
+                        columns[name].extend(flow_columns[name])
+
+            removed = set(self._flows) - set(flows)
+            previous_flows = self._flows
+            self._flows = {
+                flow: {
+                    'name': flows[flow],
+                    'etag': headers.get('ETag') or previous_flows.get(flow, {}).get('etag'),
+                    'last_modified': headers.get('Last-Modified') or previous_flows.get(flow, {}).get('last_modified'),
+                }
+                for flow, _, headers in results
+            }
+            self._refreshed_at = datetime.now()
+            self._set_frame(self._build_frame(columns))
+
+            self.stats['dataflows_modified'] += len(results) - len(unchanged)
+            self.stats['dataflows_unchanged'] += len(unchanged)
+            self.stats['dataflows_removed'] += len(removed)
+
+        logger.info(
+            f"📚 Catalogue INSEE: {len(self._frame)} séries, {len(results) - len(unchanged)} dataflows mis à jour, "
+            f"{len(unchanged)} inchangés, {len(removed)} retirés"
+        )
+        self.save()
+        return True
+
+    def save(self):
+        """Écrire le catalogue (fichier temporaire puis renommage)"""
+        frame = self.frame
+        with self._lock:
+            state = {
+                'version': CATALOGUE_VERSION,
+                'refreshed_at': self._refreshed_at.isoformat() if self._refreshed_at else None,
+                'dataflows': self._flows,
+                'columns': {
+                    name: [None if pd.isna(value) else value for value in frame[name].astype(object).tolist()]
+                    for name in CATALOGUE_COLUMNS
+                },
+            }
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+                json.dump(state, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+🔑 Registre des séries - Correspondance series_id -> series_key
+Table de dimension `series` à clé entière compacte : economic_data est indexée
+par (series_key, period_key). La correspondance est gardée en mémoire pour la
+durée du processus ; seules les séries encore inconnues sont lues, puis
+créées, dans Supabase
+"""
+
+import logging
+import threading
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from observations import ObservationBatch
+
+logger = logging.getLogger(__name__)
+
+# Attributs descriptifs renseignés à la création d'une série
+SERIES_ATTRIBUTES = ('source', 'indicator')
+
+
+class SeriesRegistryError(Exception):
+    """Séries sans clé : les observations correspondantes ne peuvent pas être écrites"""
+
+
+class SeriesRegistry:
+    """Clés entières des séries, résolues par lots et mises en cache en mémoire"""
+
+    def __init__(self, supabase, table: str = 'series', lookup_chunk: int = 200):
+        self.supabase = supabase
+        self.table = table
+        self.lookup_chunk = lookup_chunk
+        self._keys: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _load(self, series_ids: List[str]) -> Dict[str, int]:
+        """Clés des séries déjà présentes dans la table"""
+        found = {}
+        for i in range(0, len(series_ids), self.lookup_chunk):
+            chunk = series_ids[i:i + self.lookup_chunk]
+            response = self.supabase.table(self.table).select('series_key,series_id').in_('series_id', chunk).execute()
+            for row in response.data or []:
+                found[row['series_id']] = int(row['series_key'])
+        return found
+
+    def _register(self, rows: List[Dict]) -> Dict[str, int]:
+        """Créer les séries absentes ; un upsert sur series_id rend aussi les clés créées entre-temps par un autre processus"""
+        created = {}
+        for i in range(0, len(rows), self.lookup_chunk):
+            response = self.supabase.table(self.table).upsert(
+                rows[i:i + self.lookup_chunk], on_conflict='series_id'
+            ).execute()
+            for row in response.data or []:
+                created[row['series_id']] = int(row['series_key'])
+        return created
+
+    def resolve(self, series: Dict[str, Dict]) -> Dict[str, int]:
+        """Clés des séries {series_id: attributs}, lues ou créées si absentes du cache"""
+        with self._lock:
+            missing = [series_id for series_id in series if series_id not in self._keys]
+
+        if missing:
+            try:
+                found = self._load(missing)
+                unknown = [series_id for series_id in missing if series_id not in found]
+                if unknown:
+                    found.update(self._register([{'series_id': series_id, **series[series_id]} for series_id in unknown]))
+                    logger.info(f"🔑 {len(unknown)} nouvelles séries enregistrées")
+            except Exception as e:
+                raise SeriesRegistryError(f"Résolution des clés de série impossible: {e}") from e
+
+            absent = [series_id for series_id in missing if series_id not in found]
+            if absent:
+                raise SeriesRegistryError(f"{len(absent)} séries sans clé (ex. {absent[0]})")
+
+            with self._lock:
+                self._keys.update(found)
+
+        with self._lock:
+            return {series_id: self._keys[series_id] for series_id in series}
+
+    def keys_for(self, batch: ObservationBatch) -> np.ndarray:
+        """Clés alignées sur les catégories de batch.series_ids (-1 pour une catégorie sans ligne)"""
+        series_keys = np.full(len(batch.series_ids.categories), -1, dtype=np.int32)
+        codes, first_rows = np.unique(batch.series_ids.codes, return_index=True)
+        present = codes >= 0
+        codes, first_rows = codes[present], first_rows[present]
+        if not len(codes):
+            return series_keys
+
+        # Attributs lus sur la première ligne de chaque série
+        attributes = {
+            name: [None if pd.isna(value) else value for value in batch.columns[name][first_rows].tolist()]
+            for name in SERIES_ATTRIBUTES
+        }
+        series_ids = batch.series_ids.categories[codes].tolist()
+        keys = self.resolve({
+            series_id: {name: attributes[name][i] for name in SERIES_ATTRIBUTES}
+            for i, series_id in enumerate(series_ids)
+        })
+        series_keys[codes] = [keys[series_id] for series_id in series_ids]
+        return series_keys
+
+    def attach(self, rows: List[Dict]) -> List[Dict]:
+        """Lignes au format dictionnaire : series_id remplacé par series_key"""
+        series = {}
+        for row in rows:
+            if row['series_id'] not in series:
+                series[row['series_id']] = {name: row.get(name) for name in SERIES_ATTRIBUTES}
+
+        keys = self.resolve(series)
+        return [
+            {'series_key': keys[row['series_id']], **{name: value for name, value in row.items() if name != 'series_id'}}
+            for row in rows
+        ]
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+📰 Parsers par source - Corps de réponse brut → lot d'observations
+Fonctions de module (sérialisables) : exécutées dans la boucle pour les
+petits corps, dans un processus du pool de parsing (parse_pool) pour les
+gros. Le corps reçu est un objet bytes ou un mmap en lecture seule
+"""
+
+import json
+import logging
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from observations import ObservationBatch, ObservationBuilder, period_frequencies
+from parsers import SDMXStreamParser, decode_jsonstat
+
+logger = logging.getLogger(__name__)
+
+# Taille des morceaux fournis au parser SDMX incrémental
+SDMX_CHUNK_SIZE = 64 * 1024
+
+
+def _load_json(body) -> Optional[Dict]:
+    """JSON d'un corps bytes ou mmap (json.loads n'accepte pas les buffers)"""
+    if not len(body):
+        return None
+    return json.loads(body if isinstance(body, (bytes, bytearray)) else body[:])
+
+
+def parse_eurostat(body, dataset_code: str, category: str, key_dimensions: Tuple[str, ...] = ()) -> ObservationBatch:
+    """
+    Cube JSON-stat Eurostat à N dimensions, décodé directement en colonnes.
+    key_dimensions : dimensions filtrées à la requête, gardées dans l'identifiant
+    de série même réduites à une valeur (identifiants stables avec ou sans filtre)
+    """
+    data = _load_json(body)
+    if not data or 'dimension' not in data or 'value' not in data:
+        return ObservationBatch.empty()
+
+    columns = decode_jsonstat(data)
+
+    times = columns['time']
+    geos = columns['geo'] if 'geo' in columns else 'EU'
+
+    # Dimensions additionnelles (unit, na_item, s_adj...) : celles qui varient,
+    # ou qui ont été filtrées, entrent dans l'identifiant pour éviter les collisions
+    extra_dims = [
+        dim for dim, size in zip(data.get('id', []), data.get('size', []))
+        if dim not in ('time', 'geo', 'freq') and (size > 1 or dim in key_dimensions)
+    ]
+
+    dates = pd.Categorical(times)
+
+    # Identifiant de série, encodé immédiatement en catégories
+    series_parts = [columns[dim] for dim in extra_dims]
+    series_parts.append(geos if 'geo' in columns else np.full(len(times), geos, dtype=object))
+    series_ids = pd.Categorical(
+        [f"eurostat_{dataset_code}_" + '_'.join(parts) for parts in zip(*series_parts)]
+    )
+
+    metadata = {
+        'dataset_code': dataset_code,
+        'last_update': data.get('updated'),
+        'quality_score': 1.0
+    }
+    for dim in extra_dims:
+        metadata[dim] = columns[dim]
+    if columns['status'] is not None:
+        metadata['status'] = columns['status']
+
+    return ObservationBatch.from_columns(
+        series_ids,
+        columns['value'],
+        metadata=metadata,
+        indicator=dataset_code,
+        date=dates,
+        source='EUROSTAT',
+        unit=columns['unit'] if 'unit' in columns else data.get('unit', 'Unknown'),
+        frequency=period_frequencies(dates),
+        geography=geos,
+        category=category
+    )
+
+
+def oecd_record(obs: Dict, dataset: str, category: str) -> Optional[Dict]:
+    """Observation SDMX OECD au format ObservationBuilder (None si valeur non numérique)"""
+    try:
+        value = float(obs['value'])
+    except ValueError:
+        return None
+
+    series_key = obs['series_key']
+    attributes = {**obs['series_attributes'], **obs['attributes']}
+    key = '.'.join(series_key.values())
+
+    return {
+        'series_id': f"oecd_{dataset}_{key}" if key else f"oecd_{dataset}",
+        'indicator': dataset,
+        'value': value,
+        'date': obs['time'],
+        'source': 'OECD',
+        'unit': attributes.get('UNIT') or series_key.get('MEASURE') or 'Index',
+        'geography': series_key.get('LOCATION') or series_key.get('REF_AREA') or 'OECD',
+        'category': category,
+        'metadata': {
+            'dataset': dataset,
+            'series_key': series_key,
+            'method': 'SDMX'
+        }
+    }
+
+
+def parse_sdmx(body, transform: Callable[[Dict], Optional[Dict]]) -> ObservationBatch:
+    """Corps SDMX-ML complet, parsé par morceaux (vues sans copie sur un mmap)"""
+    parser = SDMXStreamParser()
+    builder = ObservationBuilder()
+
+    with memoryview(body) as view:
+        for start in range(0, len(view), SDMX_CHUNK_SIZE):
+            for record in map(transform, parser.feed(view[start:start + SDMX_CHUNK_SIZE])):
+                if record is not None:
+                    builder.append(record)
+
+    for record in map(transform, parser.close()):
+        if record is not None:
+            builder.append(record)
+    return builder.build()
+
+
+def parse_banque_france(body, series_id: str, category: str) -> ObservationBatch:
+    """Réponse JSON de l'API Banque de France (observations déjà lues conservées en cas d'erreur)"""
+    data = _load_json(body)
+    builder = ObservationBuilder()
+
+    try:
+        if data and 'observations' in data:
+            for obs in data['observations']:
+                builder.append({
+                    'series_id': f"bdf_{series_id}",
+                    'indicator': data.get('title', series_id),
+                    'value': float(obs['value']),
+                    'date': obs['period'],
+                    'source': 'BANQUE_FRANCE',
+                    'unit': data.get('unit', '%'),
+                    'geography': 'France',
+                    'category': category,
+                    'metadata': {
+                        'series_id': series_id,
+                        'last_update': data.get('last_update')
+                    }
+                })
+    except Exception as e:
+        logger.error(f"Erreur parsing BdF {series_id}: {e}")
+
+    return builder.build().with_period_frequencies()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+🧪 Chargement massif - Flux CSV de COPY confronté au schéma economic_data
+Les types des colonnes sont relus dans les migrations Supabase : une ligne
+que Postgres refuserait (période brute dans une colonne DATE, valeur hors
+enum...) fait échouer le test au lieu du chargement COPY
+"""
+
+import csv
+import io
+import json
+import math
+import os
+import re
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from bulk_loader import LOAD_COLUMNS, iter_csv
+from observations import ObservationBatch, period_frequencies
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'supabase', 'migrations')
+
+PERIODS = ['2023', '2024-S2', '2024-Q1', '2024-05', '2024-05-31']
+START_DATES = ['2023-01-01', '2024-07-01', '2024-01-01', '2024-05-01', '2024-05-31']
+
+
+def _migrations() -> str:
+    """Migrations dans l'ordre d'application (hors rollbacks)"""
+    names = sorted(name for name in os.listdir(MIGRATIONS_DIR) if name.endswith('.sql') and '.rollback.' not in name)
+    return '\n'.join(open(os.path.join(MIGRATIONS_DIR, name), encoding='utf-8').read() for name in names)
+
+
+def economic_data_schema():
+    """({colonne: (type, NOT NULL)}, {enum: valeurs}) de economic_data après toutes les migrations"""
+    sql = _migrations()
+
+    enums = {
+        name: set(re.findall(r"'([^']+)'", values))
+        for name, values in re.findall(r"CREATE TYPE (\w+) AS ENUM \(([^)]*)\)", sql)
+    }
+    for name, value in re.findall(r"ALTER TYPE (\w+) ADD VALUE (?:IF NOT EXISTS )?'([^']+)'", sql):
+        enums[name].add(value)
+
+    body = re.search(r"CREATE TABLE economic_data \((.*?)\n\);", sql, re.S).group(1)
+    definitions = [line.strip().rstrip(',') for line in body.splitlines()]
+    for block in re.findall(r"ALTER TABLE economic_data\s+(ADD COLUMN .*?);", sql, re.S):
+        definitions.extend(part.strip() for part in block.split(','))
+
+    columns = {}
+    for definition in definitions:
+        match = re.match(r"(?:ADD COLUMN )?(\w+) (\w+)", definition)
+        if match and match.group(1).upper() not in ('CONSTRAINT', 'PRIMARY', 'UNIQUE'):
+            columns[match.group(1)] = (match.group(2).upper(), 'NOT NULL' in definition or 'PRIMARY KEY' in definition)
+    return columns, {name.upper(): values for name, values in enums.items()}
+
+
+def check_field(column: str, column_type: str, field: str, enums) -> None:
+    """Lever AssertionError si Postgres refuserait ce champ CSV pour ce type"""
+    if column_type == 'INTEGER':
+        int(field)
+    elif column_type == 'DATE':
+        date.fromisoformat(field)
+    elif column_type == 'DECIMAL':
+        assert math.isfinite(float(field)), f"{column}: {field}"
+    elif column_type == 'JSONB':
+        assert isinstance(json.loads(field), dict), f"{column}: {field}"
+    elif column_type in enums:
+        assert field in enums[column_type], f"{column}: {field} absent de l'enum {column_type}"
+
+
+def sample_batch() -> ObservationBatch:
+    dates = np.array(PERIODS * 2, dtype=object)
+    return ObservationBatch.from_columns(
+        np.repeat(['insee_gdp', 'insee_cpi'], len(PERIODS)),
+        np.arange(len(dates), dtype=np.float64) + 0.5,
+        metadata={'dataset': 'test', 'series_key': {'LOCATION': 'FRA'}},
+        indicator='PIB "volume"',
+        date=dates,
+        source='INSEE',
+        unit='Indice',
+        frequency=period_frequencies(pd.Categorical(dates)),
+        geography='France',
+        category='GDP'
+    )
+
+
+def render_rows(batch: ObservationBatch):
+    series_keys = np.arange(1, len(batch.series_ids.categories) + 1, dtype=np.int32)
+    text = ''.join(iter_csv(batch, series_keys, chunk_size=3))
+    return list(csv.reader(io.StringIO(text))), series_keys
+
+
+def test_csv_fields_match_column_types():
+    columns, enums = economic_data_schema()
+    rows, _ = render_rows(sample_batch())
+
+    assert len(rows) == len(PERIODS) * 2
+    for row in rows:
+        assert len(row) == len(LOAD_COLUMNS)
+        for column, field in zip(LOAD_COLUMNS, row):
+            assert column in columns, f"colonne {column} absente de economic_data"
+            column_type, not_null = columns[column]
+            if not field:
+                assert not not_null, f"{column}: NULL dans une colonne NOT NULL"
+                continue
+            check_field(column, column_type, field, enums)
+
+
+def test_dates_are_period_starts_shared_with_rest_records():
+    batch = sample_batch()
+    rows, series_keys = render_rows(batch)
+    date_index = LOAD_COLUMNS.index('date')
+
+    csv_dates = [row[date_index] for row in rows]
+    assert csv_dates == START_DATES * 2
+
+    # Chemin REST : mêmes dates que le flux COPY
+    assert [record['date'] for record in batch.to_records(series_keys)] == csv_dates
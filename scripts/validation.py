@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+🧪 Validation - Détection d'anomalies par série, vectorisée
+Les observations suspectes sont signalées, jamais supprimées
+"""
+
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+from periods import encode_periods
+
+# Colonnes identifiant une série : series_id d'abord (deux séries OCDE d'un même
+# indicateur, zone et unité restent distinctes), les autres colonnes pour les
+# tableaux qui n'en ont pas (les unités et zones ne sont jamais mélangées)
+SERIES_KEY_COLUMNS = ('series_id', 'source', 'indicator', 'geography', 'unit')
+
+# Fenêtre centrée (en variations) de la médiane et du MAD glissants
+ROLLING_WINDOW = 25
+ROLLING_MIN_PERIODS = 5
+
+# Facteur de normalisation du MAD (cohérence avec l'écart-type d'une loi normale)
+MAD_SCALE = 0.6745
+
+FLAG_INVALID_VALUE = 'INVALID_VALUE'
+FLAG_OUTLIER = 'OUTLIER'
+FLAG_LEVEL_SHIFT = 'LEVEL_SHIFT'
+
+_FLAG_LABELS = np.array([None, FLAG_INVALID_VALUE, FLAG_OUTLIER, FLAG_LEVEL_SHIFT], dtype=object)
+
+
+def series_codes(df: pd.DataFrame, columns: Sequence[str]) -> np.ndarray:
+    """Code entier de série par ligne (factorisation colonne par colonne)"""
+    combined = np.zeros(len(df), dtype=np.int64)
+
+    for column in columns:
+        if column not in df.columns:
+            continue
+        codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+        # Refactoriser à chaque colonne pour rester dans les bornes d'int64
+        combined = pd.factorize(combined * (len(uniques) + 1) + codes)[0].astype(np.int64)
+
+    return combined
+
+
+def period_ordinals(dates: pd.Series) -> np.ndarray:
+    """Ordinal de tri des périodes (-1 si illisible), via le codec partagé"""
+    _, keys = encode_periods(dates)
+    return keys.astype(np.int64)
+
+
+def rolling_median(values: np.ndarray, is_first: np.ndarray, window: int, min_periods: int) -> np.ndarray:
+    """
+    Médiane glissante centrée, série par série (lignes triées par série).
+
+    Une bande de NaN d'une demi-fenêtre sépare deux séries consécutives : une
+    seule passe de rolling sur tout le tableau ne mélange jamais deux séries.
+    """
+    half = window // 2
+    # Position de chaque ligne une fois les bandes de séparation insérées
+    positions = np.arange(len(values)) + half * np.cumsum(is_first)
+    padded = np.full(int(positions[-1]) + half + 1, np.nan)
+    padded[positions] = values
+    rolled = pd.Series(padded).rolling(window, min_periods=min_periods, center=True).median()
+    return rolled.to_numpy()[positions]
+
+
+def flag_anomalies(
+    df: pd.DataFrame,
+    group_columns: Sequence[str] = SERIES_KEY_COLUMNS,
+    threshold: float = 5.0,
+    window: int = ROLLING_WINDOW
+) -> np.ndarray:
+    """
+    Signaler les anomalies série par série, sans boucle Python sur les lignes.
+
+    Chaque variation d'une période à l'autre est comparée à la médiane et au
+    MAD des variations voisines de la même série, sur une fenêtre glissante
+    centrée de `window` variations (le MAD est la médiane glissante des écarts
+    à la médiane glissante). Une série dont la volatilité change au fil des
+    décennies est ainsi jugée sur son régime local ; une série trop courte
+    pour la fenêtre est jugée sur ce qui est disponible. Une variation extrême suivie d'un retour en sens
+    inverse est un point aberrant (OUTLIER) ; une variation extrême isolée est
+    une rupture de niveau (LEVEL_SHIFT). Les valeurs non finies sont
+    signalées INVALID_VALUE.
+
+    Retourne un tableau de flags (None si rien à signaler) aligné sur df.
+    """
+    n = len(df)
+    if n == 0:
+        return np.full(0, None, dtype=object)
+
+    values = pd.to_numeric(df['value'], errors='coerce').to_numpy(dtype=np.float64)
+    invalid = ~np.isfinite(values)
+
+    # Tri par série puis par période
+    groups = series_codes(df, group_columns)
+    ordinals = period_ordinals(df['date'])
+    ordinals -= ordinals.min() - 1  # ordinals >= 1, -1 (période illisible) compris
+    order = np.argsort(groups * (int(ordinals.max()) + 1) + ordinals)
+    sorted_groups = groups[order]
+    sorted_values = values[order]
+    del groups, ordinals, values
+
+    is_first = np.empty(n, dtype=bool)
+    is_first[0] = True
+    is_first[1:] = sorted_groups[1:] != sorted_groups[:-1]
+    is_last = np.empty(n, dtype=bool)
+    is_last[-1] = True
+    is_last[:-1] = is_first[1:]
+
+    # Variations au sein de chaque série
+    changes = np.empty(n, dtype=np.float64)
+    changes[0] = np.nan
+    changes[1:] = sorted_values[1:] - sorted_values[:-1]
+    changes[is_first] = np.nan
+    del sorted_values
+
+    # Écart à la médiane glissante de la série, calculé en place
+    min_periods = min(ROLLING_MIN_PERIODS, window)
+    changes -= rolling_median(changes, is_first, window, min_periods)
+    mad = rolling_median(np.abs(changes), is_first, window, min_periods)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.where(mad > 0, MAD_SCALE * changes / mad, 0.0)
+    del changes, mad
+    scores = np.nan_to_num(scores, nan=0.0, posinf=0.0, neginf=0.0)
+
+    extreme = np.abs(scores) > threshold
+    next_scores = np.empty(n, dtype=np.float64)
+    next_scores[:-1] = scores[1:]
+    next_scores[-1] = 0.0
+    next_scores[is_last] = 0.0
+
+    # Saut puis retour de signe opposé : point aberrant isolé
+    spike = extreme & (np.abs(next_scores) > threshold) & (np.sign(scores) != np.sign(next_scores))
+    spike_return = np.zeros(n, dtype=bool)
+    spike_return[1:] = spike[:-1]
+    spike_return[is_first] = False
+    level_shift = extreme & ~spike & ~spike_return
+
+    # Codes entiers pendant le calcul, libellés seulement à la fin
+    sorted_codes = np.zeros(n, dtype=np.int8)
+    sorted_codes[level_shift] = 3
+    sorted_codes[spike] = 2
+
+    codes = np.empty(n, dtype=np.int8)
+    codes[order] = sorted_codes
+    codes[invalid] = 1
+
+    return _FLAG_LABELS[codes]
+
+
+def summarize_flags(flags: np.ndarray) -> Dict[str, int]:
+    """Nombre de lignes par type de flag"""
+    present = flags[flags != None]  # noqa: E711 - comparaison élément par élément
+    if len(present) == 0:
+        return {}
+    labels, counts = np.unique(present.astype(str), return_counts=True)
+    return dict(zip(labels.tolist(), counts.tolist()))
+
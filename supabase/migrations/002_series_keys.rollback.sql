@@ -0,0 +1,23 @@
+-- 🔑 Rollback Series Keys Migration
+-- Removes the series dimension table, the compact keys of economic_data and
+-- the SEMIANNUAL frequency (semester rows are deleted: the type is rebuilt
+-- without the value, which Postgres cannot drop from an enum)
+
+DROP POLICY IF EXISTS "Admins can update series" ON series;
+DROP POLICY IF EXISTS "Admins can insert series" ON series;
+DROP POLICY IF EXISTS "Anyone can view series" ON series;
+
+ALTER TABLE economic_data DROP CONSTRAINT IF EXISTS economic_data_series_period_key;
+ALTER TABLE economic_data DROP COLUMN IF EXISTS period_key;
+ALTER TABLE economic_data DROP COLUMN IF EXISTS series_key;
+
+DROP FUNCTION IF EXISTS purge_superseded_economic_data();
+DROP FUNCTION IF EXISTS economic_period_key(DATE, frequency_type);
+DROP TABLE IF EXISTS series;
+
+DELETE FROM economic_data WHERE frequency::TEXT = 'SEMIANNUAL';
+ALTER TYPE frequency_type RENAME TO frequency_type_old;
+CREATE TYPE frequency_type AS ENUM ('DAILY', 'WEEKLY', 'MONTHLY', 'QUARTERLY', 'YEARLY');
+ALTER TABLE economic_data
+    ALTER COLUMN frequency TYPE frequency_type USING frequency::TEXT::frequency_type;
+DROP TYPE frequency_type_old;
@@ -0,0 +1,106 @@
+-- 🔑 Series Keys Migration
+-- Compact integer keys for economic_data: a `series` dimension table keyed by
+-- a small integer, and observations identified by (series_key, period_key)
+-- instead of long per-row string ids built by the scrapers.
+--
+-- period_key = period ordinal * 8 + frequency code (scripts/periods.py):
+--   YEARLY     year                               code 1
+--   SEMIANNUAL year * 2 + semester - 1            code 2
+--   QUARTERLY  year * 4 + quarter - 1             code 3
+--   MONTHLY    year * 12 + month - 1              code 4
+--   DAILY      proleptic Gregorian day ordinal    code 5
+--
+-- `id` stays as the surrogate primary key used by the web app; the pipeline
+-- no longer sends it and upserts on (series_key, period_key).
+--
+-- Rows stored before this migration (UUID ids, no series id to recover) keep
+-- NULL keys and cannot be backfilled. The keyed rows of the first full refresh
+-- (`--full-refresh`) are inserted next to them, not over them: the pipeline
+-- then calls purge_superseded_economic_data(), which deletes the NULL-key rows
+-- now covered by a keyed row. Rows of series the pipeline does not fetch keep
+-- NULL keys (`WHERE series_key IS NULL` lists them).
+
+-- Semester periods (2024-S1), e.g. BDM series with FREQ=S
+ALTER TYPE frequency_type ADD VALUE IF NOT EXISTS 'SEMIANNUAL' AFTER 'MONTHLY';
+
+-- Series dimension table
+CREATE TABLE series (
+    series_key INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    series_id TEXT UNIQUE NOT NULL,
+    source TEXT,
+    indicator TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Compact keys on observations (NULL for rows entered by hand or demo data)
+ALTER TABLE economic_data
+    ADD COLUMN series_key INTEGER REFERENCES series(series_key),
+    ADD COLUMN period_key INTEGER;
+
+-- Period key of a stored date at a given frequency (rows loaded by hand, ad hoc queries).
+-- Compared as text: the new enum value cannot be used in this transaction
+CREATE OR REPLACE FUNCTION economic_period_key(period DATE, frequency frequency_type)
+RETURNS INTEGER
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT CASE frequency::TEXT
+        WHEN 'YEARLY' THEN EXTRACT(YEAR FROM period)::INTEGER * 8 + 1
+        WHEN 'SEMIANNUAL' THEN (EXTRACT(YEAR FROM period)::INTEGER * 2 + (EXTRACT(MONTH FROM period)::INTEGER - 1) / 6) * 8 + 2
+        WHEN 'QUARTERLY' THEN (EXTRACT(YEAR FROM period)::INTEGER * 4 + (EXTRACT(MONTH FROM period)::INTEGER - 1) / 3) * 8 + 3
+        WHEN 'MONTHLY' THEN (EXTRACT(YEAR FROM period)::INTEGER * 12 + EXTRACT(MONTH FROM period)::INTEGER - 1) * 8 + 4
+        WHEN 'DAILY' THEN (period - DATE '0001-01-01' + 1) * 8 + 5
+    END
+$$;
+
+-- NULL-key rows rewritten by the pipeline: same source, indicator, geography
+-- and period as a keyed row. Returns the number of rows deleted
+CREATE OR REPLACE FUNCTION purge_superseded_economic_data()
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH deleted AS (
+        DELETE FROM economic_data legacy
+        USING economic_data keyed
+        WHERE legacy.series_key IS NULL
+          AND keyed.series_key IS NOT NULL
+          AND keyed.source = legacy.source
+          AND keyed.indicator = legacy.indicator
+          AND keyed.geography IS NOT DISTINCT FROM legacy.geography
+          AND keyed.period_key = economic_period_key(legacy.date, legacy.frequency)
+        RETURNING legacy.id
+    )
+    SELECT COUNT(*)::INTEGER FROM deleted
+$$;
+
+-- Pipeline only (service role)
+REVOKE EXECUTE ON FUNCTION purge_superseded_economic_data() FROM PUBLIC, anon, authenticated;
+
+-- COPY staging table (scripts/bulk_loader.py) is recreated with the new columns
+DROP TABLE IF EXISTS economic_data_staging;
+
+-- Conflict target of pipeline upserts (also serves lookups by series)
+ALTER TABLE economic_data
+    ADD CONSTRAINT economic_data_series_period_key UNIQUE (series_key, period_key);
+
+-- RLS Policies for series (public read, admin write)
+ALTER TABLE series ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can view series" ON series
+    FOR SELECT USING (true);
+
+CREATE POLICY "Admins can insert series" ON series
+    FOR INSERT WITH CHECK (
+        EXISTS (
+            SELECT 1 FROM profiles
+            WHERE id = auth.uid() AND role = 'admin'
+        )
+    );
+
+CREATE POLICY "Admins can update series" ON series
+    FOR UPDATE USING (
+        EXISTS (
+            SELECT 1 FROM profiles
+            WHERE id = auth.uid() AND role = 'admin'
+        )
+    );